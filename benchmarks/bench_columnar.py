@@ -0,0 +1,56 @@
+"""Compare per-cell and columnar encoding of a schema-enforced node file.
+
+Usage: python benchmarks/bench_columnar.py [ROWS]
+"""
+import os
+import sys
+import csv
+import tempfile
+from timeit import default_timer as timer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'redisgraph_bulk_loader'))
+from config import Config
+from label import Label
+
+
+def write_csv(path, rows):
+    with open(path, 'w') as csv_file:
+        out = csv.writer(csv_file)
+        out.writerow([':ID', 'age:INT', 'score:DOUBLE', 'active:BOOL', 'visits:LONG', 'balance:DOUBLE',
+                      'verified:BOOL', 'posts:LONG', 'name:STRING'])
+        for i in range(rows):
+            out.writerow([i, i % 90, i * 0.25, 'true' if i % 3 else 'false', i * 13, i / 7.0,
+                          'false' if i % 5 else 'true', i % 1000, 'person%d' % i])
+
+
+def encode(path, columnar):
+    config = Config(enforce_schema=True, columnar=columnar)
+    label = Label(None, path, 'Person', config)
+    start = timer()
+    binary = [label.pack_props(row) for row in label.reader]
+    elapsed = timer() - start
+    label.infile.close()
+    return binary, elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_csv(path, rows)
+        per_cell, per_cell_time = encode(path, False)
+        columnar, columnar_time = encode(path, True)
+    finally:
+        os.remove(path)
+
+    if per_cell != columnar:
+        sys.exit("Columnar output differs from per-cell output")
+    print("rows: %d" % rows)
+    print("per-cell: %.3f s (%.0f rows/s)" % (per_cell_time, rows / per_cell_time))
+    print("columnar: %.3f s (%.0f rows/s)" % (columnar_time, rows / columnar_time))
+    print("speedup: %.2fx" % (per_cell_time / columnar_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""Micro-benchmarks of the property encoders, row packing, identifier lookups, and bulk update quoting.
+
+Each benchmark runs over generated fields of a realistic column mix, and is
+timed as the best of several repeats. No Redis server is needed.
+
+Results are written as JSON, so they can be committed and compared in review.
+Given the results of an earlier run, the benchmarks that have slowed down by
+more than the tolerance are reported, and the script exits with status 1.
+
+Usage: python benchmarks/bench_encoders.py [--output RESULTS.json] [--compare BASELINE.json]
+"""
+import os
+import sys
+import csv
+import json
+import click
+import random
+import timeit
+import platform
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'redisgraph_bulk_loader'))
+from config import Config
+from label import Label
+from id_map import IdMap
+from bulk_update import BulkUpdate
+from entity_file import Type, inferred_prop_to_binary, typed_prop_to_binary, array_prop_to_binary
+
+# Fields are generated from a fixed seed, so that every run measures the same work.
+SEED = 1234
+
+
+def generate_string(rand):
+    return ''.join(rand.choice('abcdefghijklmnopqrstuvwxyz ') for _ in range(rand.randint(4, 40))).strip() or 'x'
+
+
+def generate_array(rand):
+    return '[%s]' % ', '.join(str(rand.randint(0, 1000)) for _ in range(rand.randint(1, 8)))
+
+
+# Generators of the fields of each kind of column, from a random.Random.
+FIELD_GENERATORS = {
+    'int': lambda rand: str(rand.randint(-10**9, 10**9)),
+    'double': lambda rand: repr(rand.uniform(-1e6, 1e6)),
+    'bool': lambda rand: rand.choice(['true', 'false', 'True']),
+    'string': generate_string,
+    'array': generate_array,
+    'string_array': lambda rand: '[%s]' % ', '.join("'%s'" % generate_string(rand) for _ in range(rand.randint(1, 4))),
+    # An embedding vector of doubles.
+    'vector': lambda rand: '[%s]' % ', '.join(repr(rand.uniform(-1, 1)) for _ in range(64)),
+    'nested_array': lambda rand: '[%s]' % ', '.join(generate_array(rand) for _ in range(rand.randint(1, 3))),
+    # One of a few distinct values, such as a status or country.
+    'category': lambda rand: rand.choice(['active', 'inactive', 'pending', 'suspended', 'closed', 'new', 'archived', 'deleted']),
+    'rating': lambda rand: str(rand.randint(1, 5)),
+    'empty': lambda rand: '',
+}
+
+
+def generate_field(rand, kind):
+    if kind not in FIELD_GENERATORS:
+        raise ValueError(kind)
+    return FIELD_GENERATORS[kind](rand)
+
+
+# Column mixes, as (kind, weight) pairs. The mixed column resembles a typical schemaless property file.
+COLUMN_MIXES = {
+    'int': [('int', 1)],
+    'double': [('double', 1)],
+    'bool': [('bool', 1)],
+    'string': [('string', 1)],
+    'array': [('array', 1)],
+    'mixed': [('int', 4), ('double', 2), ('string', 6), ('bool', 1), ('array', 1), ('empty', 1)],
+}
+
+TYPED_COLUMNS = {
+    'int': Type.LONG,
+    'double': Type.DOUBLE,
+    'bool': Type.BOOL,
+    'string': Type.STRING,
+    'array': Type.ARRAY,
+}
+
+
+def generate_column(mix, count):
+    rand = random.Random(SEED)
+    kinds = [kind for kind, weight in COLUMN_MIXES[mix] for _ in range(weight)]
+    return [generate_field(rand, rand.choice(kinds)) for _ in range(count)]
+
+
+# The header and fields of the rows of a node file, in the kinds of generate_field.
+ROW_SCHEMA = [
+    ('id', 'ID', 'int'),
+    ('name', 'STRING', 'string'),
+    ('age', 'INT', 'int'),
+    ('score', 'DOUBLE', 'double'),
+    ('active', 'BOOL', 'bool'),
+    ('tags', 'ARRAY', 'array'),
+]
+
+# The rows of a node file of mostly string properties, such as names and descriptions.
+STRING_ROW_SCHEMA = [
+    ('id', 'ID', 'int'),
+    ('name', 'STRING', 'string'),
+    ('city', 'STRING', 'string'),
+    ('title', 'STRING', 'string'),
+    ('description', 'STRING', 'string'),
+    ('score', 'DOUBLE', 'double'),
+]
+
+# The rows of a node file of mostly low-cardinality properties, such as statuses, ratings, and flags.
+CATEGORY_ROW_SCHEMA = [
+    ('id', 'ID', 'int'),
+    ('name', 'STRING', 'string'),
+    ('status', 'STRING', 'category'),
+    ('rating', 'INT', 'rating'),
+    ('active', 'BOOL', 'bool'),
+    ('region', 'STRING', 'category'),
+]
+
+
+def write_node_file(directory, count, schema=ROW_SCHEMA):
+    rand = random.Random(SEED)
+    path = os.path.join(directory, 'Node.csv')
+    with open(path, 'w') as csv_file:
+        out = csv.writer(csv_file)
+        out.writerow(['%s:%s' % (name, schema_type) for name, schema_type, _ in schema])
+        for _ in range(count):
+            out.writerow([generate_field(rand, kind) for _, _, kind in schema])
+    return path
+
+
+def time_per_op(function, ops, repeat):
+    """Return the best time of repeated calls of function, in nanoseconds per operation."""
+    return min(timeit.repeat(function, number=1, repeat=repeat)) / ops * 1e9
+
+
+def bench_inferred(count, repeat):
+    for mix in COLUMN_MIXES:
+        fields = generate_column(mix, count)
+        yield 'inferred_prop_to_binary[%s]' % mix, count, \
+            time_per_op(lambda: [inferred_prop_to_binary(field) for field in fields], count, repeat)
+
+
+def bench_typed(count, repeat):
+    for mix, prop_type in TYPED_COLUMNS.items():
+        fields = generate_column(mix, count)
+        yield 'typed_prop_to_binary[%s]' % mix, count, \
+            time_per_op(lambda: [typed_prop_to_binary(field, prop_type) for field in fields], count, repeat)
+
+
+def bench_arrays(count, repeat):
+    rand = random.Random(SEED)
+    for kind in ('array', 'string_array', 'nested_array', 'vector'):
+        fields = [generate_field(rand, kind) for _ in range(count)]
+        yield 'array_prop_to_binary[%s]' % kind, count, \
+            time_per_op(lambda: [array_prop_to_binary("=B", field) for field in fields], count, repeat)
+
+
+def bench_pack_props(count, repeat):
+    # Schemaless columns learn their types, and columns of few distinct fields fill their
+    # value caches, from the first rows packed, so the fastest repeat measures rows
+    # packed once both have settled.
+    variants = [('inferred', ROW_SCHEMA, False), ('typed', ROW_SCHEMA, True),
+                ('inferred strings', STRING_ROW_SCHEMA, False), ('typed strings', STRING_ROW_SCHEMA, True),
+                ('inferred categories', CATEGORY_ROW_SCHEMA, False), ('typed categories', CATEGORY_ROW_SCHEMA, True)]
+    for variant, schema, enforce_schema in variants:
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_node_file(directory, count, schema)
+            config = Config(enforce_schema=enforce_schema, quoting=csv.QUOTE_MINIMAL)
+            label = Label(None, path, 'Node', config)
+            rows = list(label.reader)
+            label.infile.close()
+            yield 'EntityFile.pack_props[%s]' % variant, count, \
+                time_per_op(lambda: [label.pack_props(row) for row in rows], count, repeat)
+
+
+def bench_id_lookups(count, repeat):
+    # Relations resolve both endpoints against the identifier tables, as RelationType.process_rows does.
+    rand = random.Random(SEED)
+    endpoints = [('node_%d' % rand.randrange(count), 'node_%d' % rand.randrange(count)) for _ in range(count)]
+    for backend in ('dict', 'compact'):
+        start_nodes = IdMap(backend).table('Node')
+        for i in range(count):
+            start_nodes.insert('node_%d' % i, i)
+        end_nodes = start_nodes
+
+        def resolve():
+            for src, dest in endpoints:
+                start_nodes[src]
+                end_nodes[dest]
+        yield 'RelationType endpoint lookups[%s]' % backend, count, time_per_op(resolve, count, repeat)
+
+
+def bench_quote_string(count, repeat):
+    update = BulkUpdate('bench', 1, ',', False, None, 'RETURN row', 'row', None)
+    for mix in ('int', 'string', 'mixed'):
+        fields = [field or 'x' for field in generate_column(mix, count)]
+        yield 'BulkUpdate.quote_string[%s]' % mix, count, \
+            time_per_op(lambda: [update.quote_string(field) for field in fields], count, repeat)
+
+
+BENCHMARKS = [bench_inferred, bench_typed, bench_arrays, bench_pack_props, bench_id_lookups, bench_quote_string]
+
+
+def compare(results, baseline, tolerance):
+    """Print the change of every benchmark against a baseline, returning the names of those that regressed."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['ns_per_op'] / baseline[name]['ns_per_op']
+        regressed = ratio > 1 + tolerance
+        print("%-45s %6.2fx%s" % (name, ratio, "  REGRESSION" if regressed else ""))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+@click.command()
+@click.option('--count', default=20_000, help='Number of fields or rows each benchmark encodes (default 20000)')
+@click.option('--repeat', default=5, help='Number of timed runs, of which the fastest is reported (default 5)')
+@click.option('--output', '-o', default=None, help='Path of the JSON file to write the results to')
+@click.option('--compare', 'baseline', default=None, help='Path of the JSON results of an earlier run to compare against')
+@click.option('--tolerance', default=0.1, help='Slowdown relative to the baseline reported as a regression (default 0.1)')
+def main(count, repeat, output, baseline, tolerance):
+    results = {}
+    for benchmark in BENCHMARKS:
+        for name, ops, ns_per_op in benchmark(count, repeat):
+            print("%-45s %10.1f ns/op" % (name, ns_per_op))
+            results[name] = {'ops': ops, 'ns_per_op': round(ns_per_op, 1)}
+
+    if output is not None:
+        with open(output, 'w') as results_file:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'count': count,
+                'repeat': repeat,
+                'results': results,
+            }, results_file, indent=2, sort_keys=True)
+            results_file.write('\n')
+
+    if baseline is not None:
+        with open(baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file)['results'], tolerance)
+        if regressions:
+            sys.exit("%d benchmarks regressed by more than %d%%" % (len(regressions), tolerance * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Compare the memory use and speed of the node identifier map backends.
+
+Each backend is measured in its own process, so that peak RSS is not shared.
+
+Usage: python benchmarks/bench_id_map.py [NODES] [MEMORY_BUDGET_MB]
+"""
+import os
+import sys
+import resource
+import subprocess
+import tracemalloc
+from timeit import default_timer as timer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'redisgraph_bulk_loader'))
+from id_map import IdMap, ID_MAP_BACKENDS
+
+
+def build(backend, nodes, memory_budget):
+    table = IdMap(backend, memory_budget=memory_budget).table('User')
+    for i in range(nodes):
+        # Identifiers are fresh strings, as they are when read from a CSV file.
+        table.insert('user_%d' % i, i)
+    return table
+
+
+def measure(backend, nodes, memory_budget):
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = timer()
+    table = build(backend, nodes, memory_budget)
+    insert_time = timer() - start
+
+    start = timer()
+    for i in range(0, nodes, 3):
+        table['user_%d' % i]
+    lookup_time = timer() - start
+    # ru_maxrss is reported in kilobytes on Linux.
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+    del table
+
+    # Python allocations are traced in a separate run, as tracing slows them down.
+    # Memory-mapped tables allocate almost nothing on the Python heap.
+    tracemalloc.start()
+    table = build(backend, nodes, memory_budget)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The table is only freed once its allocations have been measured.
+    del table
+
+    print("%-8s %6.1f heap bytes/node, %7.1f MB peak RSS growth, %9.0f inserts/s, %9.0f lookups/s"
+          % (backend, allocated / nodes, rss_growth / 1e6, nodes / insert_time, (nodes / 3) / lookup_time))
+
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    memory_budget = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    if len(sys.argv) > 3:
+        measure(sys.argv[3], nodes, memory_budget)
+        return
+
+    print("nodes: %d, mmap memory budget: %d MB" % (nodes, memory_budget))
+    for backend in ID_MAP_BACKENDS:
+        subprocess.run([sys.executable, __file__, str(nodes), str(memory_budget), backend], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""End-to-end benchmark of loading a synthetic graph into the mock GRAPH.BULK server.
+
+A graph is generated by generate_graph.py, and loaded by redisgraph-bulk-insert
+into mock_graph_server.py, each running in its own process. The server decodes
+every query, so the benchmark fails if the loaded graph does not hold exactly
+the generated nodes and relations. No RedisGraph server is needed.
+
+Reported are the load's throughput, the round-trip latency of its queries as
+seen by the loader, and the time the server spent receiving and decoding them.
+
+Usage: python benchmarks/bench_load.py [OPTIONS] [-- LOADER_ARGS...]
+"""
+import os
+import re
+import sys
+import json
+import click
+import redis
+import tempfile
+import subprocess
+from timeit import default_timer as timer
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCHMARK_DIR)
+from generate_graph import GraphSpec, split_columns
+
+BULK_INSERT = os.path.join(BENCHMARK_DIR, '..', 'redisgraph_bulk_loader', 'bulk_insert.py')
+MOCK_SERVER = os.path.join(BENCHMARK_DIR, 'mock_graph_server.py')
+
+
+def percentiles(values):
+    values = sorted(values)
+    return {p: values[min(len(values) - 1, len(values) * p // 100)] for p in (50, 90, 100)}
+
+
+def start_mock_server():
+    server = subprocess.Popen([sys.executable, MOCK_SERVER, '--port', '0'], stdout=subprocess.PIPE)
+    return server, int(server.stdout.readline())
+
+
+@click.command(context_settings={'ignore_unknown_options': True})
+@click.option('--nodes', default=100_000, help='Number of nodes (default 100000)')
+@click.option('--relations', default=500_000, help='Number of relations (default 500000)')
+@click.option('--labels', default=2, help='Number of node labels (default 2)')
+@click.option('--types', default=2, help='Number of relation types (default 2)')
+@click.option('--node-columns', default='string,int,double,bool', callback=split_columns, help='Types of the node property columns')
+@click.option('--relation-columns', default='double', callback=split_columns, help='Types of the relation property columns')
+@click.option('--schema', default=False, is_flag=True, help='Declare column types in the headers and load with --enforce-schema')
+@click.option('--namespaces', default=False, is_flag=True, help='Give every label its own ID namespace (requires --schema)')
+@click.option('--degree', default='uniform', type=click.Choice(['uniform', 'skewed']), help='Distribution of relation sources (default uniform)')
+@click.option('--seed', default=1234, help='Seed of the generated values (default 1234)')
+@click.option('--output', '-o', default=None, help='Path of the JSON file to write the results to')
+@click.argument('loader_args', nargs=-1, type=click.UNPROCESSED)
+def main(nodes, relations, labels, types, node_columns, relation_columns, schema, namespaces, degree, seed, output, loader_args):
+    spec = GraphSpec(nodes, relations, labels, types, node_columns, relation_columns, schema, namespaces, degree, seed=seed)
+    with tempfile.TemporaryDirectory() as directory:
+        node_paths, relation_paths = spec.write(directory)
+        input_bytes = sum(os.path.getsize(path) for path in node_paths + relation_paths)
+
+        server, port = start_mock_server()
+        try:
+            args = [sys.executable, BULK_INSERT, 'bench', '--port', str(port)]
+            args += [arg for path in node_paths for arg in ('--nodes', path)]
+            args += [arg for path in relation_paths for arg in ('--relations', path)]
+            if schema:
+                args.append('--enforce-schema')
+            args += loader_args
+
+            start = timer()
+            loader = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+            elapsed = timer() - start
+            if loader.returncode != 0:
+                sys.exit("The loader failed:\n%s" % loader.stdout)
+            stats = json.loads(redis.Redis(port=port).execute_command('MOCK.STATS'))
+        finally:
+            server.terminate()
+            server.wait()
+
+    loaded = stats['graphs'].get('bench', {'nodes': 0, 'relations': 0})
+    if loaded != {'nodes': nodes, 'relations': relations}:
+        sys.exit("The mock server holds %d nodes and %d relations, rather than %d and %d"
+                 % (loaded['nodes'], loaded['relations'], nodes, relations))
+
+    queries = stats['queries']
+    sent = re.search(r"Sent (\d+) queries \((\d+) bytes\) in ([\d.]+) seconds", loader.stdout)
+    round_trip = float(sent.group(3)) / int(sent.group(1))
+    receive = percentiles([query['receive'] for query in queries])
+    decode = percentiles([query['decode'] for query in queries])
+    query_bytes = sum(query['bytes'] for query in queries)
+
+    print("Loaded %d nodes and %d relations (%.1f MB of CSV) in %.3f seconds"
+          % (nodes, relations, input_bytes / 1e6, elapsed))
+    print("Throughput: %.0f rows/s, %.2f MB/s of CSV, %.2f MB/s of queries"
+          % ((nodes + relations) / elapsed, input_bytes / 1e6 / elapsed, query_bytes / 1e6 / elapsed))
+    print("%d queries, mean round trip %.2f ms" % (len(queries), round_trip * 1e3))
+    print("Server receive ms: p50 %.2f, p90 %.2f, max %.2f" % tuple(receive[p] * 1e3 for p in (50, 90, 100)))
+    print("Server decode ms:  p50 %.2f, p90 %.2f, max %.2f" % tuple(decode[p] * 1e3 for p in (50, 90, 100)))
+
+    if output is not None:
+        with open(output, 'w') as results_file:
+            json.dump({
+                'nodes': nodes,
+                'relations': relations,
+                'input_bytes': input_bytes,
+                'query_bytes': query_bytes,
+                'seconds': elapsed,
+                'queries': len(queries),
+                'round_trip': round_trip,
+                'receive': receive,
+                'decode': decode,
+            }, results_file, indent=2)
+            results_file.write('\n')
+
+
+if __name__ == '__main__':
+    main()
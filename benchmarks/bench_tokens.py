@@ -0,0 +1,159 @@
+"""Compare building binary tokens from per-row bytes objects with packing rows into a bytearray arena.
+
+The Person and KNOWS files of example/ are scaled up by renaming their people,
+and each is encoded into a single token both ways, reporting the time taken
+and the peak memory allocated.
+
+Usage: python benchmarks/bench_tokens.py [SCALE]
+"""
+import os
+import sys
+import csv
+import tempfile
+import tracemalloc
+from timeit import default_timer as timer
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'redisgraph_bulk_loader'))
+from config import Config
+from label import Label
+from relation_type import RelationType
+from query_buffer import QueryBuffer
+
+
+def read_csv(filename):
+    with open(os.path.join(EXAMPLE_DIR, filename)) as csv_file:
+        rows = list(csv.reader(csv_file, skipinitialspace=True))
+    return rows[0], rows[1:]
+
+
+def write_scaled(directory, scale):
+    """Write copies of the example Person and KNOWS files with every person repeated scale times."""
+    person_header, people = read_csv('Person.csv')
+    knows_header, knows = read_csv('KNOWS.csv')
+    person_path = os.path.join(directory, 'Person.csv')
+    knows_path = os.path.join(directory, 'KNOWS.csv')
+    with open(person_path, 'w') as csv_file:
+        out = csv.writer(csv_file)
+        out.writerow(person_header)
+        for i in range(scale):
+            for row in people:
+                out.writerow(['%s %d' % (row[0], i)] + row[1:])
+    with open(knows_path, 'w') as csv_file:
+        out = csv.writer(csv_file)
+        out.writerow(knows_header)
+        for i in range(scale):
+            for row in knows:
+                out.writerow(['%s %d' % (row[0], i), '%s %d' % (row[1], i)] + row[2:])
+    return person_path, knows_path, len(people) * scale, len(knows) * scale
+
+
+def new_query_buffer(config):
+    # No query is sent, so no Redis client is needed.
+    return QueryBuffer('bench', None, config)
+
+
+def encode_rows(entity, pack_row):
+    """Build the token the way the loader did before arenas: a bytes object per row, joined at the end."""
+    binaries = []
+    binary_size = len(entity.packed_header)
+    with entity.progressbar() as reader:
+        for row in reader:
+            entity.validate_row(row)
+            row_binary = pack_row(row)
+            # The loader checked every row against the token size limits.
+            added_size = binary_size + len(row_binary)
+            if added_size >= entity.config.max_token_size or added_size >= entity.config.max_buffer_size:
+                sys.exit("The token limits are too small to hold the scaled files")
+            binary_size = added_size
+            binaries.append(row_binary)
+    return entity.packed_header + b''.join(binaries)
+
+
+def encode_label_rows(config, person_path):
+    query_buffer = new_query_buffer(config)
+    label = Label(query_buffer, person_path, 'Person', config)
+    token = encode_rows(label, label.pack_row)
+    label.infile.close()
+    query_buffer.wait_sender()
+    return token
+
+
+def encode_label_arena(config, person_path):
+    query_buffer = new_query_buffer(config)
+    label = Label(query_buffer, person_path, 'Person', config)
+    label.process_rows()
+    token = label.to_binary()
+    label.infile.close()
+    query_buffer.wait_sender()
+    return token
+
+
+def load_people(config, person_path):
+    query_buffer = new_query_buffer(config)
+    label = Label(query_buffer, person_path, 'Person', config)
+    label.process_entities()
+    return query_buffer
+
+
+def encode_relation_rows(query_buffer, config, knows_path):
+    reltype = RelationType(query_buffer, knows_path, 'KNOWS', config)
+    nodes = query_buffer.nodes.table(None)
+    token = encode_rows(reltype, lambda row: reltype.pack_row(row, nodes[row[0]], nodes[row[1]]))
+    reltype.infile.close()
+    return token
+
+
+def encode_relation_arena(query_buffer, config, knows_path):
+    reltype = RelationType(query_buffer, knows_path, 'KNOWS', config)
+    reltype.process_rows()
+    token = reltype.to_binary()
+    reltype.infile.close()
+    return token
+
+
+def measure(function, *args):
+    """Time a run of function, then trace the memory allocated by a second run, as tracing slows it down."""
+    start = timer()
+    token = function(*args)
+    elapsed = timer() - start
+    del token
+    tracemalloc.start()
+    token = function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return bytes(token), elapsed, peak
+
+
+def report(name, count, rows, arena):
+    (rows_token, rows_time, rows_peak), (arena_token, arena_time, arena_peak) = rows, arena
+    if rows_token != arena_token:
+        sys.exit("%s token built in an arena differs from the joined token" % name)
+    print("%s: %d entities, %d-byte token" % (name, count, len(arena_token)))
+    print("  per-row bytes: %.3f s (%.0f rows/s), peak %.1f MB" % (rows_time, count / rows_time, rows_peak / 1e6))
+    print("  arena:         %.3f s (%.0f rows/s), peak %.1f MB" % (arena_time, count / arena_time, arena_peak / 1e6))
+    print("  speedup %.2fx, peak memory %.2fx" % (rows_time / arena_time, arena_peak / rows_peak))
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    # Tokens are only flushed at their maximum sizes, so that each file is encoded into a single token.
+    config = Config(max_token_size=512, max_buffer_size=1024)
+    with tempfile.TemporaryDirectory() as directory:
+        person_path, knows_path, people, knows = write_scaled(directory, scale)
+        report('Person', people,
+               measure(encode_label_rows, config, person_path),
+               measure(encode_label_arena, config, person_path))
+
+        config = Config(max_token_size=512, max_buffer_size=1024, store_node_identifiers=True)
+
+        # Relations are encoded outside of tracing, after all people have been loaded.
+        query_buffer = load_people(config, person_path)
+        report('KNOWS', knows,
+               measure(encode_relation_rows, query_buffer, config, knows_path),
+               measure(encode_relation_arena, query_buffer, config, knows_path))
+        query_buffer.wait_sender()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Generate node and relation CSV files of a synthetic graph for benchmarking the loader.
+
+Nodes are split evenly between the label files, and relations between the
+relation type files. The relations of type i connect nodes of label i to
+nodes of label i + 1 (wrapping around), with sources picked uniformly or
+from a skewed, power-law-like distribution so that a few nodes have most of
+the relations. All fields are generated from a seed, so files are
+reproducible.
+
+Property columns are given as a comma-separated list of types among int,
+double, bool, string, and array. With --schema, headers carry the types of
+their columns for --enforce-schema, and with --namespaces every label has
+its own ID namespace, so identifiers are reused between labels.
+
+Usage: python benchmarks/generate_graph.py OUTPUT_DIR [OPTIONS]
+"""
+import os
+import csv
+import click
+import random
+
+# Schema types of the property column types.
+SCHEMA_TYPES = {
+    'int': 'INT',
+    'double': 'DOUBLE',
+    'bool': 'BOOL',
+    'string': 'STRING',
+    'array': 'ARRAY',
+}
+
+WORDS = ['graph', 'node', 'edge', 'redis', 'bulk', 'loader', 'query', 'token', 'label', 'type']
+
+
+def generate_value(rand, column_type):
+    if column_type == 'int':
+        return rand.randint(-10**6, 10**6)
+    if column_type == 'double':
+        return round(rand.uniform(-1e3, 1e3), 4)
+    if column_type == 'bool':
+        return rand.choice(['true', 'false'])
+    if column_type == 'string':
+        return ' '.join(rand.choice(WORDS) for _ in range(rand.randint(1, 5)))
+    if column_type == 'array':
+        return '[%s]' % ', '.join(str(rand.randint(0, 100)) for _ in range(rand.randint(1, 5)))
+    raise click.BadParameter("Unknown column type '%s'" % column_type)
+
+
+class GraphSpec(object):
+    """Describes the files of a synthetic graph."""
+    def __init__(self, nodes, relations, labels=1, types=1, node_columns=('string', 'int'), relation_columns=('double',),
+                 schema=False, namespaces=False, degree='uniform', skew=2.0, seed=1234):
+        if namespaces and not schema:
+            raise click.BadParameter("ID namespaces are only declared in headers with --schema")
+        self.nodes = nodes
+        self.relations = relations
+        self.labels = ['Label%d' % i for i in range(labels)]
+        self.types = ['TYPE%d' % i for i in range(types)]
+        self.node_columns = list(node_columns)
+        self.relation_columns = list(relation_columns)
+        self.schema = schema
+        self.namespaces = namespaces
+        self.degree = degree
+        self.skew = skew
+        self.seed = seed
+
+    def split(self, total, parts):
+        return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+    def identifier(self, label, idx):
+        # Identifiers are only unique within their label when each label has its own namespace.
+        return str(idx) if self.namespaces else '%s_%d' % (label, idx)
+
+    def pick(self, rand, count):
+        if self.degree == 'uniform':
+            return rand.randrange(count)
+        # Raising a uniform variable to a power concentrates picks on the first nodes.
+        return int(count * rand.random() ** self.skew)
+
+    def node_header(self, label):
+        if not self.schema:
+            return ['id'] + ['%s_%d' % (column, i) for i, column in enumerate(self.node_columns)]
+        id_column = 'id:ID(%s)' % label if self.namespaces else 'id:ID'
+        return [id_column] + ['%s_%d:%s' % (column, i, SCHEMA_TYPES[column]) for i, column in enumerate(self.node_columns)]
+
+    def relation_header(self, src_label, dest_label):
+        properties = ['%s_%d' % (column, i) for i, column in enumerate(self.relation_columns)]
+        if not self.schema:
+            return ['src', 'dest'] + properties
+        if self.namespaces:
+            endpoints = [':START_ID(%s)' % src_label, ':END_ID(%s)' % dest_label]
+        else:
+            endpoints = [':START_ID', ':END_ID']
+        return endpoints + ['%s:%s' % (name, SCHEMA_TYPES[column]) for name, column in zip(properties, self.relation_columns)]
+
+    def write(self, directory):
+        """Write the files of the graph to directory, returning the paths of the node and relation files."""
+        rand = random.Random(self.seed)
+        node_counts = self.split(self.nodes, len(self.labels))
+        node_paths = []
+        for label, count in zip(self.labels, node_counts):
+            path = os.path.join(directory, label + '.csv')
+            with open(path, 'w') as csv_file:
+                out = csv.writer(csv_file)
+                out.writerow(self.node_header(label))
+                for idx in range(count):
+                    out.writerow([self.identifier(label, idx)] + [generate_value(rand, column) for column in self.node_columns])
+            node_paths.append(path)
+
+        relation_paths = []
+        for idx, (reltype, count) in enumerate(zip(self.types, self.split(self.relations, len(self.types)))):
+            src = idx % len(self.labels)
+            dest = (idx + 1) % len(self.labels)
+            if count and not (node_counts[src] and node_counts[dest]):
+                raise click.BadParameter("Relations of type %s connect labels without nodes" % reltype)
+            path = os.path.join(directory, reltype + '.csv')
+            with open(path, 'w') as csv_file:
+                out = csv.writer(csv_file)
+                out.writerow(self.relation_header(self.labels[src], self.labels[dest]))
+                for _ in range(count):
+                    out.writerow([self.identifier(self.labels[src], self.pick(rand, node_counts[src])),
+                                  self.identifier(self.labels[dest], rand.randrange(node_counts[dest]))] +
+                                 [generate_value(rand, column) for column in self.relation_columns])
+            relation_paths.append(path)
+        return node_paths, relation_paths
+
+
+def split_columns(ctx, param, value):
+    columns = [column.strip() for column in value.split(',') if column.strip()]
+    for column in columns:
+        if column not in SCHEMA_TYPES:
+            raise click.BadParameter("Unknown column type '%s'" % column)
+    return columns
+
+
+@click.command()
+@click.argument('output_dir')
+@click.option('--nodes', default=100_000, help='Number of nodes (default 100000)')
+@click.option('--relations', default=500_000, help='Number of relations (default 500000)')
+@click.option('--labels', default=1, help='Number of node labels, each written to its own file (default 1)')
+@click.option('--types', default=1, help='Number of relation types, each written to its own file (default 1)')
+@click.option('--node-columns', default='string,int', callback=split_columns, help='Types of the node property columns (default string,int)')
+@click.option('--relation-columns', default='double', callback=split_columns, help='Types of the relation property columns (default double)')
+@click.option('--schema', default=False, is_flag=True, help='Declare column types in the headers, for --enforce-schema')
+@click.option('--namespaces', default=False, is_flag=True, help='Give every label its own ID namespace (requires --schema)')
+@click.option('--degree', default='uniform', type=click.Choice(['uniform', 'skewed']), help='Distribution of relation sources (default uniform)')
+@click.option('--skew', default=2.0, help='Exponent of the skewed distribution; higher values concentrate relations on fewer nodes (default 2)')
+@click.option('--seed', default=1234, help='Seed of the generated values (default 1234)')
+def main(output_dir, nodes, relations, labels, types, node_columns, relation_columns, schema, namespaces, degree, skew, seed):
+    os.makedirs(output_dir, exist_ok=True)
+    spec = GraphSpec(nodes, relations, labels, types, node_columns, relation_columns, schema, namespaces, degree, skew, seed)
+    node_paths, relation_paths = spec.write(output_dir)
+    args = ['--nodes %s' % path for path in node_paths] + ['--relations %s' % path for path in relation_paths]
+    if schema:
+        args.append('--enforce-schema')
+    print("Wrote %d nodes and %d relations. Load them with:" % (nodes, relations))
+    print("redisgraph-bulk-insert GRAPH %s" % ' '.join(args))
+
+
+if __name__ == '__main__':
+    main()
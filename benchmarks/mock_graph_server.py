@@ -0,0 +1,247 @@
+"""A local RESP server that stands in for RedisGraph when benchmarking the loader.
+
+GRAPH.BULK queries are decoded in full: every label and relation type
+token is parsed, the entity counts are checked against the query's
+arguments, and relation endpoints are checked against the nodes created.
+Valid queries are answered with the statistics RedisGraph returns, which
+the loader's sender parses; invalid ones with an error. The commands the
+loader sends before a load (MODULE LIST, EXISTS) and index creation
+queries are also answered.
+
+MOCK.STATS returns a JSON summary of the queries received: their count,
+size, and the time spent receiving and decoding each.
+
+Usage: python benchmarks/mock_graph_server.py [--port PORT]
+"""
+import sys
+import json
+import click
+import struct
+import threading
+import socketserver
+from timeit import default_timer as timer
+
+# Property type tags of the binary format.
+NULL, BOOL, DOUBLE, STRING, LONG, ARRAY = 0, 1, 2, 3, 4, 5
+U32 = struct.Struct('=I')
+I64 = struct.Struct('=q')
+ENDPOINTS = struct.Struct('=QQ')
+# The size in bytes of each fixed-size property value.
+VALUE_SIZES = {BOOL: 1, DOUBLE: 8, LONG: 8}
+
+
+class BulkFormatError(Exception):
+    pass
+
+
+def read_string(token, offset):
+    end = token.find(b'\x00', offset)
+    if end < 0:
+        raise BulkFormatError("unterminated string at offset %d" % offset)
+    return bytes(token[offset:end]), end + 1
+
+
+def skip_value(token, offset):
+    """Return the offset following the property value at offset."""
+    if offset >= len(token):
+        raise BulkFormatError("truncated property at offset %d" % offset)
+    tag = token[offset]
+    offset += 1
+    if tag == NULL:
+        return offset
+    if tag in VALUE_SIZES:
+        return offset + VALUE_SIZES[tag]
+    if tag == STRING:
+        return read_string(token, offset)[1]
+    if tag == ARRAY:
+        (length,) = I64.unpack_from(token, offset)
+        offset += I64.size
+        for _ in range(length):
+            offset = skip_value(token, offset)
+        return offset
+    raise BulkFormatError("unknown property type %d at offset %d" % (tag, offset - 1))
+
+
+def decode_header(token):
+    """Return the name, property count, and size of the header of a label or relation type token."""
+    name, offset = read_string(token, 0)
+    (prop_count,) = U32.unpack_from(token, offset)
+    offset += U32.size
+    for _ in range(prop_count):
+        offset = read_string(token, offset)[1]
+    return name, prop_count, offset
+
+
+def count_entities(token, relations, node_limit):
+    """Count the entities of a token, checking that relation endpoints are below node_limit."""
+    _, prop_count, offset = decode_header(token)
+    count = 0
+    while offset < len(token):
+        if relations:
+            if offset + ENDPOINTS.size > len(token):
+                raise BulkFormatError("truncated relation at offset %d" % offset)
+            src, dest = ENDPOINTS.unpack_from(token, offset)
+            if src >= node_limit or dest >= node_limit:
+                raise BulkFormatError("relation endpoint (%d, %d) refers to a node that was not created" % (src, dest))
+            offset += ENDPOINTS.size
+        for _ in range(prop_count):
+            offset = skip_value(token, offset)
+        count += 1
+    if offset != len(token):
+        raise BulkFormatError("entity overruns the end of its token")
+    return count
+
+
+class MockGraphServer(socketserver.ThreadingTCPServer):
+    """Serves the mock RedisGraph; graphs hold only their node and relation counts."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        super(MockGraphServer, self).__init__(address, RespHandler)
+        self.lock = threading.Lock()
+        self.graphs = {}  # Graph name: [node count, relation count]
+        self.queries = [] # (bytes, seconds receiving, seconds decoding) of every GRAPH.BULK query
+
+    def bulk(self, args, size, receive_time):
+        start = timer()
+        graph = args[0].decode()
+        args = args[1:]
+        begin = args[0] == b'BEGIN'
+        if begin:
+            args = args[1:]
+        node_count, relation_count, label_count, reltype_count = (int(arg) for arg in args[:4])
+        tokens = args[4:]
+        if len(tokens) != label_count + reltype_count:
+            raise BulkFormatError("expected %d tokens, received %d" % (label_count + reltype_count, len(tokens)))
+
+        with self.lock:
+            if begin == (graph in self.graphs):
+                raise BulkFormatError("graph '%s' already exists" % graph if begin else "graph '%s' does not exist" % graph)
+            nodes_before = self.graphs[graph][0] if graph in self.graphs else 0
+
+        # Relations may refer to the nodes created by the same query.
+        nodes = sum(count_entities(token, False, 0) for token in tokens[:label_count])
+        relations = sum(count_entities(token, True, nodes_before + nodes) for token in tokens[label_count:])
+        if nodes != node_count or relations != relation_count:
+            raise BulkFormatError("query declares %d nodes and %d relations, but holds %d and %d"
+                                  % (node_count, relation_count, nodes, relations))
+
+        with self.lock:
+            counts = self.graphs.setdefault(graph, [0, 0])
+            counts[0] += nodes
+            counts[1] += relations
+            self.queries.append((size, receive_time, timer() - start))
+        return b'%d nodes created, %d relations created' % (nodes, relations)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'graphs': {graph: {'nodes': counts[0], 'relations': counts[1]} for graph, counts in self.graphs.items()},
+                'queries': [{'bytes': size, 'receive': receive, 'decode': decode} for size, receive, decode in self.queries],
+            }
+
+
+def encode_reply(reply):
+    if isinstance(reply, BulkFormatError):
+        return b'-ERR %s\r\n' % str(reply).encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(encode_reply(item) for item in reply)
+    return b'+%s\r\n' % reply.encode()
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    # Reads are buffered, so that large tokens arrive in few system calls.
+    rbufsize = 1 << 20
+
+    def read_command(self):
+        """Return the arguments of the next command, its size in bytes, and the seconds spent receiving it."""
+        line = self.rfile.readline()
+        if not line:
+            return None, 0, 0.0
+        start = timer()
+        if line[:1] != b'*':
+            # Inline commands, as sent by redis-cli or telnet.
+            return line.split(), len(line), 0.0
+        args = []
+        size = 0
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+            size += length
+        return args, size, timer() - start
+
+    def handle(self):
+        while True:
+            args, size, receive_time = self.read_command()
+            if args is None:
+                return
+            try:
+                reply = self.execute(args, size, receive_time)
+            except (BulkFormatError, struct.error, ValueError, IndexError) as e:
+                reply = BulkFormatError("invalid GRAPH.BULK query: %s" % e)
+            self.wfile.write(encode_reply(reply))
+
+    def execute(self, args, size, receive_time):
+        """Return the reply to a command."""
+        command = args[0].upper()
+        if command == b'GRAPH.BULK':
+            return self.server.bulk(args[1:], size, receive_time)
+        if command not in COMMANDS:
+            return BulkFormatError("unknown command '%s'" % command.decode())
+        return COMMANDS[command](self.server, args[1:])
+
+
+def exists(server, args):
+    with server.lock:
+        return sum(arg.decode() in server.graphs for arg in args)
+
+
+def flushall(server, args):
+    with server.lock:
+        server.graphs.clear()
+        del server.queries[:]
+    return 'OK'
+
+
+# Replies to the commands other than GRAPH.BULK, from the server and the command's arguments, by command.
+COMMANDS = {
+    b'MODULE': lambda server, args: [[b'name', b'graph', b'ver', 29999]],
+    b'EXISTS': exists,
+    # Index creation; no index is built.
+    b'GRAPH.QUERY': lambda server, args: [[b'Indices created: 1']],
+    b'MOCK.STATS': lambda server, args: json.dumps(server.stats()).encode(),
+    b'PING': lambda server, args: 'PONG',
+    b'CLIENT': lambda server, args: 'OK',
+    b'SELECT': lambda server, args: 'OK',
+    b'FLUSHALL': flushall,
+}
+
+
+def start_server(address=('127.0.0.1', 0)):
+    """Start a mock server in a background thread, returning it. Its address is server.server_address."""
+    server = MockGraphServer(address)
+    threading.Thread(target=server.serve_forever, name='mock-graph-server', daemon=True).start()
+    return server
+
+
+@click.command()
+@click.option('--host', '-h', default='127.0.0.1', help='Address to listen on (default 127.0.0.1)')
+@click.option('--port', '-p', default=6379, help='Port to listen on; 0 picks a free port (default 6379)')
+def main(host, port):
+    server = MockGraphServer((host, port))
+    # The port is printed first, so that a parent process can connect to a server started on any free port.
+    print(server.server_address[1])
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
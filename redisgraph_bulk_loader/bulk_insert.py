@@ -10,6 +10,12 @@ from config import Config
 from query_buffer import QueryBuffer
 from label import Label
 from relation_type import RelationType
+from parallel import ParallelEncoder
+from bundle import BundleWriter, NullSink
+from checkpoint import Checkpoint
+from metrics import Metrics
+from profiling import Profiler, profile_stage
+from streams import is_stdin
 
 
 def parse_schemas(cls, query_buf, path_to_csv, csv_tuples, config):
@@ -27,69 +33,68 @@ def parse_schemas(cls, query_buf, path_to_csv, csv_tuples, config):
 
 # For each input file, validate contents and convert to binary format.
 # If any buffer limits have been reached, flush all enqueued inserts to Redis.
-def process_entities(entities):
+# If an encoder is given, the files are encoded by its worker processes,
+# except for streams, which the workers cannot open, and which are encoded here.
+# If metrics are given, the processing of each file is timed.
+def process_entities(entities, encoder=None, metrics=None):
+    encoded = encoder.encode([entity for entity in entities if not entity.streamed]) if encoder else None
     for entity in entities:
-        entity.process_entities()
+        chunks = next(encoded) if encoded is not None and not entity.streamed else None
+        start_time = timer()
+        if metrics is not None:
+            if chunks is None:
+                metrics.instrument(entity)
+            else:
+                chunks = metrics.timed_iter(chunks, 'workers')
+        if chunks is None:
+            entities_created = entity.process_entities()
+        else:
+            entities_created = entity.process_entities(chunks)
+        if metrics is not None:
+            metrics.record_input(entity, entities_created, timer() - start_time)
         added_size = entity.binary_size
         # Check to see if the addition of this data will exceed the buffer's capacity
         if (entity.query_buffer.buffer_size + added_size >= entity.config.max_buffer_size
-                or entity.query_buffer.redis_token_count + len(entity.binary_entities) >= entity.config.max_token_count):
-            # Send and flush the buffer if appropriate
-            entity.query_buffer.send_buffer()
+                or entity.query_buffer.redis_token_count + entity.binary_count >= entity.config.max_token_count):
+            # Send and flush the buffer if appropriate; a load resumed after it continues with the next file.
+            entity.query_buffer.send_buffer((entity.index + 1, 0))
         # Add binary data to list and update all counts
-        entity.query_buffer.redis_token_count += len(entity.binary_entities)
+        entity.query_buffer.redis_token_count += entity.binary_count
         entity.query_buffer.buffer_size += added_size
 
 
-################################################################################
-# Bulk loader
-################################################################################
-# Command-line arguments
-@click.command()
-@click.argument('graph')
-# Redis server connection settings
-@click.option('--host', '-h', default='127.0.0.1', help='Redis server host')
-@click.option('--port', '-p', default=6379, help='Redis server port')
-@click.option('--password', '-a', default=None, help='Redis server password')
-@click.option('--user', '-w', default=None, help='Username for Redis ACL')
-@click.option('--unix-socket-path', '-u', default=None, help='Redis server unix socket path')
-@click.option('--ssl-keyfile', '-k', default=None, help='SSL keyfile')
-@click.option('--ssl-certfile', '-l', default=None, help='SSL certfile')
-@click.option('--ssl-ca-certs', '-m', default=None, help='SSL CA certs')
-# CSV file paths
-@click.option('--nodes', '-n', multiple=True, help='Path to node csv file')
-@click.option('--nodes-with-label', '-N', nargs=2, multiple=True, help='Label string followed by path to node csv file')
-@click.option('--relations', '-r', multiple=True, help='Path to relation csv file')
-@click.option('--relations-with-type', '-R', nargs=2, multiple=True, help='Relation type string followed by path to relation csv file')
-@click.option('--separator', '-o', default=',', help='Field token separator in csv file')
-# Schema options
-@click.option('--enforce-schema', '-d', default=False, is_flag=True, help='Enforce the schema described in CSV header rows')
-@click.option('--id-type', '-j', default='STRING', help='The data type of unique node ID properties (either STRING or INTEGER)')
-@click.option('--skip-invalid-nodes', '-s', default=False, is_flag=True, help='ignore nodes that use previously defined IDs')
-@click.option('--skip-invalid-edges', '-e', default=False, is_flag=True, help='ignore invalid edges, print an error message and continue loading (True), or stop loading after an edge loading failure (False)')
-@click.option('--quote', '-q', default=0, help='the quoting format used in the CSV file. QUOTE_MINIMAL=0,QUOTE_ALL=1,QUOTE_NONNUMERIC=2,QUOTE_NONE=3')
-@click.option('--escapechar', '-x', default='\\', help='the escape char used for the CSV reader (default \\). Use "none" for None.')
-# Buffer size restrictions
-@click.option('--max-token-count', '-c', default=1024, help='max number of processed CSVs to send per query (default 1024)')
-@click.option('--max-buffer-size', '-b', default=64, help='max buffer size in megabytes (default 64, max 1024)')
-@click.option('--max-token-size', '-t', default=64, help='max size of each token in megabytes (default 64, max 512)')
-@click.option('--index', '-i', multiple=True, help='Label:Propery on which to create an index')
-@click.option('--full-text-index', '-f', multiple=True, help='Label:Propery on which to create an full text search index')
-def bulk_insert(graph, host, port, password, user, unix_socket_path, ssl_keyfile, ssl_certfile, ssl_ca_certs, nodes, nodes_with_label, relations, relations_with_type, separator, enforce_schema, id_type, skip_invalid_nodes, skip_invalid_edges, escapechar, quote, max_token_count, max_buffer_size, max_token_size, index, full_text_index):
-    if sys.version_info.major < 3 or sys.version_info.minor < 6:
-        raise Exception("Python >= 3.6 is required for the RedisGraph bulk loader.")
-
+# Verify that the input files can be read: at least one node file is given, and
+# standard input is read as at most one file, whose label or type is given.
+def check_input_files(nodes, nodes_with_label, relations, relations_with_type):
     if not (any(nodes) or any(nodes_with_label)):
         raise Exception("At least one node file must be specified.")
 
-    start_time = timer()
+    if any(is_stdin(path) for path in nodes + relations):
+        raise Exception("Standard input must be given a label or relationship type, with --nodes-with-label or --relations-with-type.")
 
-    # If relations are being built, we must store unique node identifiers to later resolve endpoints.
-    store_node_identifiers = any(relations) or any(relations_with_type)
+    if sum(is_stdin(path) for label, path in nodes_with_label + relations_with_type) > 1:
+        raise Exception("Standard input can only be read as one input file.")
 
-    # Initialize configurations with command-line arguments
-    config = Config(max_token_count, max_buffer_size, max_token_size, enforce_schema, id_type, skip_invalid_nodes, skip_invalid_edges, separator, int(quote), store_node_identifiers, escapechar)
 
+# Return the sink that the queries are sent to, which is the bundle file if one is to be compiled.
+def select_sink(sink, bundle, checkpoint, resume):
+    if resume and checkpoint is None:
+        raise Exception("--resume requires the --checkpoint of the load to resume.")
+
+    if bundle is not None:
+        if sink == 'null':
+            raise Exception("--compile cannot be used with --sink null.")
+        sink = 'file'
+    elif sink == 'file':
+        raise Exception("--sink file requires the path of the bundle to write, given by --compile.")
+
+    if checkpoint is not None and sink != 'redis':
+        raise Exception("--checkpoint can only be used when loading into Redis.")
+    return sink
+
+
+# Create a Redis client from the connection settings and verify that the RedisGraph module is loaded.
+def connect(host, port, password, user, unix_socket_path, ssl_keyfile, ssl_certfile, ssl_ca_certs):
     kwargs = {
         'host': host,
         'port': port,
@@ -128,29 +133,94 @@ def bulk_insert(graph, host, port, password, user, unix_socket_path, ssl_keyfile
         # Ignore check if the connected server does not support the "MODULE LIST" command
         pass
 
-    # Verify that the graph name is not already used in the Redis database
+    return client
+
+
+# Verify that the graph name is not already used in the Redis database,
+# or, if the load is resumed, that the graph it was loading exists.
+def check_graph_name(client, graph, resume=False):
     key_exists = client.execute_command("EXISTS", graph)
-    if key_exists:
+    if resume:
+        if not key_exists:
+            print("Graph with name '%s' could not be resumed, as Redis key '%s' does not exist." % (graph, graph))
+            sys.exit(1)
+    elif key_exists:
         print("Graph with name '%s', could not be created, as Redis key '%s' already exists." % (graph, graph))
         sys.exit(1)
 
-    query_buf = QueryBuffer(graph, client, config)
 
-    # Read the header rows of each input CSV and save its schema.
-    labels = parse_schemas(Label, query_buf, nodes, nodes_with_label, config)
-    reltypes = parse_schemas(RelationType, query_buf, relations, relations_with_type, config)
+# Start exporting metrics of the load to the given path, if any, returning the Metrics.
+def start_metrics(path, graph, interval, query_buf):
+    if path is None:
+        return None
+    metrics = Metrics(path, graph, interval)
+    metrics.attach(query_buf)
+    metrics.start()
+    return metrics
 
-    process_entities(labels)
-    process_entities(reltypes)
 
-    # Send all remaining tokens to Redis
-    query_buf.send_buffer()
-    query_buf.wait_pool()
+# Restore the progress of an interrupted load from its checkpoint, loading the rest of the file
+# it was interrupted in, and return the label and relation files that remain to be loaded.
+def resume_load(query_buf, graph, labels, reltypes, profiler, metrics):
+    entities = labels + reltypes
+    resume_index, resume_line = query_buf.resume(entities)
+    print("Resuming the load of graph '%s' from input %d of %d" % (graph, resume_index + 1, len(entities)))
+    for entity in entities[:resume_index]:
+        entity.infile.close()
+    if resume_line:
+        # The file that was being loaded continues from its first row that was not sent.
+        entity = entities[resume_index]
+        entity.skip_to_line(resume_line)
+        with profile_stage(profiler, 'resume'):
+            process_entities([entity], metrics=metrics)
+        resume_index += 1
+    return labels[resume_index:], reltypes[max(resume_index - len(labels), 0):]
 
-    end_time = timer()
-    query_buf.report_completion(end_time - start_time)
 
-    # Add in Graph Indices after graph creation
+# Start the worker processes that encode the entity files of a stage of the load, if --workers
+# asks for several and there are files to encode. Relation files are only encoded by workers
+# that can inherit the identifier map, id_map, and so are forked once it is complete.
+# Worker processes are started outside of profiled stages, so that they do not inherit the profiler of the stage.
+def start_encoder(stage, has_entities, config, profiler, id_map=None):
+    if config.workers > 1 and has_entities and (id_map is None or ParallelEncoder.can_share_id_map()):
+        return ParallelEncoder(config.workers, id_map, profiler.worker_path(stage) if profiler else None)
+    return None
+
+
+# Process the entity files of a stage of the load, with the worker processes of encoder if given.
+def process_stage(stage, entities, profiler, metrics, encoder=None):
+    try:
+        with profile_stage(profiler, stage):
+            process_entities(entities, encoder, metrics)
+    finally:
+        if encoder is not None:
+            encoder.close()
+
+
+# Report a load whose queries were written to a bundle or discarded rather than sent to Redis.
+def report_compilation(query_buf, sink, bundle, elapsed, indices):
+    if sink == 'file':
+        query_buf.report_compilation(bundle, elapsed)
+    else:
+        query_buf.report_encoding(elapsed)
+    query_buf.report_throughput(elapsed)
+    if indices:
+        print("Indices are only created when loading into Redis; pass them to redisgraph-bulk-replay instead.")
+
+
+# Write the metrics and profiles of the load, if they were recorded.
+def stop_instrumentation(metrics, profiler, profile_dir):
+    if metrics is not None:
+        metrics.stop()
+        print("Metrics of the load written to '%s'" % metrics.path)
+
+    if profiler is not None:
+        profiler.dump()
+        print("Profiles of the load written to '%s'" % profile_dir)
+
+
+# Add in Graph Indices after graph creation
+def create_indices(client, graph, index, full_text_index):
     for i in index:
         l, p = i.split(":")
         print("Creating Index on Label: %s, Property: %s" % (l, p))
@@ -176,5 +246,136 @@ def bulk_insert(graph, host, port, password, user, unix_socket_path, ssl_keyfile
             print("Unknown Error: Unable to create Full Text Search Index on Label: %s, Property %s" % (l, p))
 
 
+################################################################################
+# Bulk loader
+################################################################################
+# Command-line arguments
+@click.command()
+@click.argument('graph')
+# Redis server connection settings
+@click.option('--host', '-h', default='127.0.0.1', help='Redis server host')
+@click.option('--port', '-p', default=6379, help='Redis server port')
+@click.option('--password', '-a', default=None, help='Redis server password')
+@click.option('--user', '-w', default=None, help='Username for Redis ACL')
+@click.option('--unix-socket-path', '-u', default=None, help='Redis server unix socket path')
+@click.option('--ssl-keyfile', '-k', default=None, help='SSL keyfile')
+@click.option('--ssl-certfile', '-l', default=None, help='SSL certfile')
+@click.option('--ssl-ca-certs', '-m', default=None, help='SSL CA certs')
+# CSV file paths
+@click.option('--nodes', '-n', multiple=True, help='Path to node csv file')
+@click.option('--nodes-with-label', '-N', nargs=2, multiple=True, help='Label string followed by path to node csv file, or - for standard input')
+@click.option('--relations', '-r', multiple=True, help='Path to relation csv file')
+@click.option('--relations-with-type', '-R', nargs=2, multiple=True, help='Relation type string followed by path to relation csv file, or - for standard input')
+@click.option('--separator', '-o', default=',', help='Field token separator in csv file')
+# Schema options
+@click.option('--enforce-schema', '-d', default=False, is_flag=True, help='Enforce the schema described in CSV header rows')
+@click.option('--field-type', multiple=True, help='FIELD:TYPE or LABEL.FIELD:TYPE giving the type of a column of Parquet or JSON Lines input files, such as id:ID(User)')
+@click.option('--id-type', '-j', default='STRING', help='The data type of unique node ID properties (either STRING or INTEGER)')
+@click.option('--id-map', default='dict', help='Backend of the node identifier map used to resolve relations (dict, compact, or mmap)')
+@click.option('--id-map-dir', default=None, help='Directory for the files of the mmap identifier map (default: system temporary directory)')
+@click.option('--id-map-memory', default=256, help='Memory budget in megabytes of the mmap identifier map (default 256)')
+@click.option('--skip-invalid-nodes', '-s', default=False, is_flag=True, help='ignore nodes that use previously defined IDs')
+@click.option('--skip-invalid-edges', '-e', default=False, is_flag=True, help='ignore invalid edges, print an error message and continue loading (True), or stop loading after an edge loading failure (False)')
+@click.option('--quote', '-q', default=0, help='the quoting format used in the CSV file. QUOTE_MINIMAL=0,QUOTE_ALL=1,QUOTE_NONNUMERIC=2,QUOTE_NONE=3')
+@click.option('--escapechar', '-x', default='\\', help='the escape char used for the CSV reader (default \\). Use "none" for None.')
+@click.option('--single-pass', default=False, is_flag=True, help='Read each input file once, reporting progress in bytes rather than rows')
+@click.option('--workers', default=1, help='Number of processes encoding input files in parallel (default 1)')
+@click.option('--chunk-size', default=64, help='Size in megabytes of the chunks input files are split into for --workers (default 64)')
+@click.option('--columnar', default=False, is_flag=True, help='Encode typed property columns in blocks of rows (requires --enforce-schema and NumPy)')
+# Buffer size restrictions
+@click.option('--max-token-count', '-c', default=1024, help='max number of processed CSVs to send per query (default 1024)')
+@click.option('--max-buffer-size', '-b', default=64, help='max buffer size in megabytes (default 64, max 1024)')
+@click.option('--max-inflight-size', default=128, help='max size in megabytes of the queries awaiting a reply from Redis (default 128)')
+@click.option('--max-token-size', '-t', default=64, help='max size of each token in megabytes (default 64, max 512)')
+@click.option('--checkpoint', default=None, help='Path of a file in which to record the progress of the load, so that it can be resumed')
+@click.option('--resume', default=False, is_flag=True, help='Resume a failed load from the file given by --checkpoint')
+@click.option('--compile', 'bundle', default=None, help='Write the queries to a bundle file for redisgraph-bulk-replay instead of sending them to Redis')
+@click.option('--sink', default='redis', type=click.Choice(['redis', 'null', 'file']), help='Where to send the queries: Redis, nowhere, or the bundle file given by --compile (default redis)')
+@click.option('--metrics', default=None, help='Path of a file to export load metrics to, in the Prometheus text format if it ends in .prom and as JSON otherwise')
+@click.option('--metrics-interval', default=0.0, help='Seconds between exports of the metrics during the load (default 0: only once it completes)')
+@click.option('--profile', 'profile_dir', default=None, help='Directory to write a cProfile profile of each stage of the load to')
+@click.option('--index', '-i', multiple=True, help='Label:Propery on which to create an index')
+@click.option('--full-text-index', '-f', multiple=True, help='Label:Propery on which to create an full text search index')
+def bulk_insert(graph, host, port, password, user, unix_socket_path, ssl_keyfile, ssl_certfile, ssl_ca_certs, nodes, nodes_with_label, relations, relations_with_type, separator, enforce_schema, field_type, id_type, id_map, id_map_dir, id_map_memory, skip_invalid_nodes, skip_invalid_edges, escapechar, workers, chunk_size, columnar, single_pass, quote, max_token_count, max_buffer_size, max_inflight_size, max_token_size, checkpoint, resume, bundle, sink, metrics, metrics_interval, profile_dir, index, full_text_index):
+    if sys.version_info.major < 3 or sys.version_info.minor < 6:
+        raise Exception("Python >= 3.6 is required for the RedisGraph bulk loader.")
+
+    check_input_files(nodes, nodes_with_label, relations, relations_with_type)
+    sink = select_sink(sink, bundle, checkpoint, resume)
+
+    start_time = timer()
+
+    # If relations are being built, we must store unique node identifiers to later resolve endpoints.
+    store_node_identifiers = any(relations) or any(relations_with_type)
+
+    # Initialize configurations with command-line arguments
+    config = Config(max_token_count, max_buffer_size, max_token_size, enforce_schema, id_type, skip_invalid_nodes, skip_invalid_edges, separator, int(quote), store_node_identifiers, escapechar, columnar, single_pass, id_map, id_map_dir, id_map_memory, workers, chunk_size, max_inflight_size, field_type)
+
+    if sink == 'redis':
+        client = connect(host, port, password, user, unix_socket_path, ssl_keyfile, ssl_certfile, ssl_ca_certs)
+        check_graph_name(client, graph, resume)
+        connection = None
+    else:
+        # Other sinks need no Redis server, so the MODULE LIST and EXISTS checks are skipped.
+        # Bundles are loaded later by redisgraph-bulk-replay; the null sink discards every query.
+        client = None
+        connection = BundleWriter(bundle) if sink == 'file' else NullSink()
+
+    if checkpoint is not None:
+        checkpoint = Checkpoint(checkpoint, graph)
+
+    profiler = Profiler(profile_dir) if profile_dir is not None else None
+
+    # The node workers are forked before the sender, metrics, and decompression threads start,
+    # so that no worker starts with a copy of a lock held by one of them.
+    node_encoder = start_encoder('nodes', any(nodes) or any(nodes_with_label), config, profiler)
+
+    query_buf = QueryBuffer(graph, client, config, connection, checkpoint, profiler)
+
+    metrics = start_metrics(metrics, graph, metrics_interval, query_buf)
+
+    # Read the header rows of each input CSV and save its schema.
+    with profile_stage(profiler, 'schemas'):
+        labels = parse_schemas(Label, query_buf, nodes, nodes_with_label, config)
+        reltypes = parse_schemas(RelationType, query_buf, relations, relations_with_type, config)
+
+    # Checkpoints refer to input files by their position among all inputs.
+    entities = labels + reltypes
+    for idx, entity in enumerate(entities):
+        entity.index = idx
+
+    if resume:
+        labels, reltypes = resume_load(query_buf, graph, labels, reltypes, profiler, metrics)
+    elif checkpoint is not None:
+        checkpoint.start(entities)
+
+    process_stage('nodes', labels, profiler, metrics, node_encoder)
+    # The identifier map is complete, so relation files can be encoded in parallel.
+    # Their workers are forked while the threads of the load run, so they only use the
+    # identifier map and the entities they are sent, never the objects those threads lock.
+    relation_encoder = start_encoder('relations', reltypes, config, profiler, query_buf.nodes)
+    process_stage('relations', reltypes, profiler, metrics, relation_encoder)
+
+    # Send all remaining tokens to Redis
+    with profile_stage(profiler, 'send'):
+        query_buf.send_buffer((len(entities), 0))
+        query_buf.wait_sender()
+
+    # The load is complete, so there is nothing left to resume.
+    if checkpoint is not None:
+        checkpoint.remove()
+
+    end_time = timer()
+    if sink != 'redis':
+        report_compilation(query_buf, sink, bundle, end_time - start_time, index or full_text_index)
+    else:
+        query_buf.report_completion(end_time - start_time)
+        with profile_stage(profiler, 'indices'):
+            create = metrics.timed('index', create_indices) if metrics is not None else create_indices
+            create(client, graph, index, full_text_index)
+
+    stop_instrumentation(metrics, profiler, profile_dir)
+
+
 if __name__ == '__main__':
     bulk_insert()
@@ -0,0 +1,58 @@
+import os
+import sys
+import click
+from timeit import default_timer as timer
+
+sys.path.append(os.path.dirname(__file__))
+from bulk_insert import connect, check_graph_name, create_indices
+from bundle import read_bundle
+from resp import RespConnection
+from sender import BulkSender
+
+
+################################################################################
+# Bundle replay
+################################################################################
+# Command-line arguments
+@click.command()
+@click.argument('graph')
+@click.argument('bundle')
+# Redis server connection settings
+@click.option('--host', '-h', default='127.0.0.1', help='Redis server host')
+@click.option('--port', '-p', default=6379, help='Redis server port')
+@click.option('--password', '-a', default=None, help='Redis server password')
+@click.option('--user', '-w', default=None, help='Username for Redis ACL')
+@click.option('--unix-socket-path', '-u', default=None, help='Redis server unix socket path')
+@click.option('--ssl-keyfile', '-k', default=None, help='SSL keyfile')
+@click.option('--ssl-certfile', '-l', default=None, help='SSL certfile')
+@click.option('--ssl-ca-certs', '-m', default=None, help='SSL CA certs')
+@click.option('--max-inflight-size', default=128, help='max size in megabytes of the queries awaiting a reply from Redis (default 128)')
+@click.option('--index', '-i', multiple=True, help='Label:Propery on which to create an index')
+@click.option('--full-text-index', '-f', multiple=True, help='Label:Propery on which to create an full text search index')
+def bulk_replay(graph, bundle, host, port, password, user, unix_socket_path, ssl_keyfile, ssl_certfile, ssl_ca_certs, max_inflight_size, index, full_text_index):
+    """Build GRAPH from the queries in a BUNDLE compiled by redisgraph-bulk-insert --compile."""
+    start_time = timer()
+
+    client = connect(host, port, password, user, unix_socket_path, ssl_keyfile, ssl_certfile, ssl_ca_certs)
+    check_graph_name(client, graph)
+
+    # Queries are read from the bundle as the sender makes room for them, and sent unchanged.
+    connection = RespConnection(client)
+    sender = BulkSender(connection, graph, max_inflight_size * 1_000_000)
+    try:
+        for args in read_bundle(bundle):
+            sender.submit(args, sum(len(arg) for arg in args))
+    finally:
+        try:
+            sender.close()
+        finally:
+            connection.close()
+
+    end_time = timer()
+    sender.report_completion(end_time - start_time)
+
+    create_indices(client, graph, index, full_text_index)
+
+
+if __name__ == '__main__':
+    bulk_replay()
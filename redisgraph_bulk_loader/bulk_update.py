@@ -1,3 +1,4 @@
+import os
 import sys
 import csv
 import redis
@@ -5,6 +6,9 @@ import click
 from redisgraph import Graph
 from timeit import default_timer as timer
 
+sys.path.append(os.path.dirname(__file__))
+from profiling import Profiler, profile_stage
+
 
 def utf8len(s):
     return len(s.encode('utf-8'))
@@ -118,7 +122,8 @@ class BulkUpdate:
 @click.option('--no-header', '-n', default=False, is_flag=True, help='If set, the CSV file has no header')
 # Buffer size restrictions
 @click.option('--max-token-size', '-t', default=500, help='Max size of each token in megabytes (default 500, max 512)')
-def bulk_update(graph, host, port, password, user, unix_socket_path, query, variable_name, csv, separator, no_header, max_token_size):
+@click.option('--profile', 'profile_dir', default=None, help='Directory to write a cProfile profile of each stage of the update to')
+def bulk_update(graph, host, port, password, user, unix_socket_path, query, variable_name, csv, separator, no_header, max_token_size, profile_dir):
     if sys.version_info[0] < 3:
         raise Exception("Python 3 is required for the RedisGraph bulk updater.")
 
@@ -144,9 +149,13 @@ def bulk_update(graph, host, port, password, user, unix_socket_path, query, vari
         # Ignore check if the connected server does not support the "MODULE LIST" command
         pass
 
+    profiler = Profiler(profile_dir) if profile_dir is not None else None
+
     updater = BulkUpdate(graph, max_token_size, separator, no_header, csv, query, variable_name, client)
-    updater.validate_query()
-    updater.process_update_csv()
+    with profile_stage(profiler, 'validate'):
+        updater.validate_query()
+    with profile_stage(profiler, 'update'):
+        updater.process_update_csv()
 
     end_time = timer()
 
@@ -154,6 +163,10 @@ def bulk_update(graph, host, port, password, user, unix_socket_path, query, vari
         print(key + ": " + repr(value))
     print("Update of graph '%s' complete in %f seconds" % (graph, end_time - start_time))
 
+    if profiler is not None:
+        profiler.dump()
+        print("Profiles of the update written to '%s'" % profile_dir)
+
 
 if __name__ == '__main__':
     bulk_update()
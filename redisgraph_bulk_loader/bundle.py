@@ -0,0 +1,81 @@
+import io
+import struct
+from exceptions import SchemaError
+
+# Bundles start with this signature, which includes the version of the format.
+BUNDLE_MAGIC = b'RGBUNDL\x01'
+# Each batch is framed by its argument count, and each argument by its length.
+ARG_COUNT = struct.Struct('<I')
+ARG_LENGTH = struct.Struct('<Q')
+
+
+def bulk_reply(args):
+    """Return the reply RedisGraph would give to a GRAPH.BULK query with the given arguments."""
+    # Arguments: the command, the graph name, an optional BEGIN token, then the node and relation counts.
+    counts = args[3:5] if args[2] in ('BEGIN', b'BEGIN') else args[2:4]
+    return b'%d nodes created, %d relations created' % (int(counts[0]), int(counts[1]))
+
+
+class BundleWriter(object):
+    """Writes the arguments of GRAPH.BULK queries to a bundle file rather than sending them to Redis.
+
+    Stands in for a Redis connection: execute_command frames the arguments that
+    follow the command and graph name, and returns the reply RedisGraph would
+    have sent. A bundle can be replayed against any graph name later.
+    """
+    def __init__(self, path):
+        self.file = io.open(path, 'wb')
+        self.file.write(BUNDLE_MAGIC)
+
+    def execute_command(self, *args):
+        write = self.file.write
+        write(ARG_COUNT.pack(len(args) - 2))
+        for arg in args[2:]:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif isinstance(arg, int):
+                arg = str(arg).encode()
+            write(ARG_LENGTH.pack(len(arg)))
+            write(arg)
+        return bulk_reply(args)
+
+    def close(self):
+        self.file.close()
+
+
+class NullSink(object):
+    """Stands in for a Redis connection, discarding GRAPH.BULK queries.
+
+    Replies as RedisGraph would, so that a load can be run to measure the
+    throughput of the loader alone.
+    """
+    def execute_command(self, *args):
+        return bulk_reply(args)
+
+    def close(self):
+        pass
+
+
+def read_bundle(path):
+    """Yield the arguments of each GRAPH.BULK query in a bundle, following the command and graph name."""
+    with io.open(path, 'rb') as bundle:
+        if bundle.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+            raise SchemaError("%s is not a bulk loader bundle" % path)
+        while True:
+            header = bundle.read(ARG_COUNT.size)
+            if not header:
+                return
+            if len(header) != ARG_COUNT.size:
+                raise SchemaError("%s is truncated" % path)
+            args = []
+            for _ in range(ARG_COUNT.unpack(header)[0]):
+                length = ARG_LENGTH.unpack(read_exactly(bundle, ARG_LENGTH.size, path))[0]
+                args.append(read_exactly(bundle, length, path))
+            yield args
+
+
+def read_exactly(bundle, size, path):
+    data = bundle.read(size)
+    if len(data) != size:
+        raise SchemaError("%s is truncated" % path)
+    return data
@@ -0,0 +1,126 @@
+import io
+import os
+import json
+import struct
+from exceptions import SchemaError
+
+# Journal entries hold a node ID and the lengths of its namespace and identifier, followed by both in UTF-8.
+JOURNAL_ENTRY = struct.Struct('<QHI')
+
+
+class Checkpoint(object):
+    """Records the progress of a load, so that a load interrupted by a failure can be resumed.
+
+    Once a GRAPH.BULK query has been acknowledged, the position in the input
+    files from which a resumed load continues is saved to a JSON file, along
+    with the number of nodes and relations created so far. The nodes created
+    are numbered in order, so their count is also the next node ID.
+
+    Node identifiers are appended to a journal as they are stored, and the
+    journal is synced before each query is sent. A resumed load rebuilds its
+    identifier map from the journaled identifiers of the nodes created.
+    """
+    def __init__(self, path, graph):
+        self.path = path
+        self.journal_path = path + '.ids'
+        self.graph = graph
+        self.inputs = None
+        self.journal = None
+
+    def track(self, entities):
+        # Input files are identified by their label or type, path, and size; streams have no size.
+        self.inputs = [[entity.entity_str, entity.filename, None if entity.streamed else os.path.getsize(entity.filename)]
+                       for entity in entities]
+
+    def start(self, entities):
+        """Begin recording the progress of a new load of the given input files."""
+        self.track(entities)
+        self.journal = io.open(self.journal_path, 'wb')
+
+    def resume(self, entities, id_map):
+        """Load the last checkpoint of a load of the given input files and restore its identifier map, returning its state."""
+        self.track(entities)
+        try:
+            with io.open(self.path) as checkpoint:
+                state = json.load(checkpoint)
+        except FileNotFoundError:
+            raise SchemaError("No checkpoint found at '%s' to resume from" % self.path)
+        if state['graph'] != self.graph or state['inputs'] != self.inputs:
+            raise SchemaError("Checkpoint '%s' was written by a load of other inputs or another graph" % self.path)
+
+        self.journal = io.open(self.journal_path, 'r+b')
+        if id_map is not None:
+            self.restore_id_map(id_map, state['nodes_created'])
+        # Identifiers of nodes that were not created are discarded.
+        self.journal.truncate()
+        return state
+
+    def restore_id_map(self, id_map, node_count):
+        journal = self.journal
+        while True:
+            entry = journal.read(JOURNAL_ENTRY.size)
+            if len(entry) < JOURNAL_ENTRY.size:
+                break
+            node_id, namespace_len, identifier_len = JOURNAL_ENTRY.unpack(entry)
+            if node_id >= node_count:
+                break
+            namespace = journal.read(namespace_len).decode() or None
+            id_map.table(namespace).insert(journal.read(identifier_len).decode(), node_id)
+        journal.seek(-len(entry), io.SEEK_CUR)
+
+    def record_node(self, namespace, identifier, node_id):
+        namespace = namespace.encode() if namespace is not None else b''
+        identifier = identifier.encode()
+        self.journal.write(JOURNAL_ENTRY.pack(node_id, len(namespace), len(identifier)) + namespace + identifier)
+
+    def sync(self):
+        """Make the journal durable. Called before a query is sent, so that it covers every node in the query."""
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def save(self, resume_point, nodes_created, relations_created):
+        """Record that every query up to the resume point (input index, line) was acknowledged."""
+        state = {
+            'graph': self.graph,
+            'inputs': self.inputs,
+            'resume_point': resume_point,
+            'nodes_created': nodes_created,
+            'relations_created': relations_created,
+        }
+        # The checkpoint is replaced atomically, so a failure while saving leaves the previous one intact.
+        temp_path = self.path + '.tmp'
+        with io.open(temp_path, 'w') as checkpoint:
+            json.dump(state, checkpoint)
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        """Delete the checkpoint and journal once the load is complete."""
+        self.journal.close()
+        for path in (self.path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class ResumedReader(object):
+    """Wraps a CSV reader to skip the rows sent before a load was interrupted.
+
+    The rows that end before line_num were sent; iteration starts at the row
+    that ends at line_num. Other attributes are those of the wrapped reader.
+    """
+    def __init__(self, reader, line_num):
+        self.reader = reader
+        self.first_line = line_num
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+    def __iter__(self):
+        reader = self.reader
+        rows = iter(reader)
+        for row in rows:
+            if reader.line_num >= self.first_line:
+                yield row
+                break
+        yield from rows
@@ -0,0 +1,101 @@
+import io
+import csv
+
+# Size of the blocks in which input files are scanned for chunk boundaries.
+SCAN_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def split_file(filename, chunk_size):
+    """Split a file into ranges of about chunk_size bytes that each end at a newline.
+
+    Returns a list of (start, end, lines before start) triples, in which the last
+    range has an end of None, and the number of lines in the file.
+    """
+    chunks = []
+    start = 0
+    lines_before = 0
+    lines = 0    # Newlines before the current block
+    offset = 0   # Offset of the current block
+    boundary = chunk_size
+    last_byte = b'\n'
+    with io.open(filename, 'rb') as infile:
+        while True:
+            block = infile.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            block_end = offset + len(block)
+            # Each range ends at the first newline after its start plus chunk_size.
+            while boundary < block_end:
+                newline = block.find(b'\n', max(boundary - offset, 0))
+                if newline == -1:
+                    break
+                end = offset + newline + 1
+                chunks.append((start, end, lines_before))
+                start = end
+                lines_before = lines + block.count(b'\n', 0, newline + 1)
+                boundary = end + chunk_size
+            lines += block.count(b'\n')
+            last_byte = block[-1:]
+            offset = block_end
+    # A final line without a newline is still a line.
+    if last_byte != b'\n':
+        lines += 1
+    chunks.append((start, None, lines_before))
+    return chunks, lines
+
+
+class FileRange(io.RawIOBase):
+    """Raw binary stream over the bytes of a file from start up to end (or the end of the file if None)."""
+    def __init__(self, filename, start, end):
+        self.name = filename
+        self.file = io.open(filename, 'rb', buffering=0)
+        self.file.seek(start)
+        self.remaining = None if end is None else end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        if self.remaining is None:
+            return self.file.readinto(buf)
+        if self.remaining <= 0:
+            return 0
+        read = self.file.readinto(memoryview(buf)[:self.remaining])
+        self.remaining -= read
+        return read
+
+    def close(self):
+        self.file.close()
+        super(FileRange, self).close()
+
+
+class ChunkReader(object):
+    """CSV reader over a chunk of a file, numbering lines as a reader of the whole file would.
+
+    If the last record of the chunk continues past its end, as a quoted or escaped
+    newline would make it, `split_record` is set once that record has been read.
+    """
+    def __init__(self, infile, line_offset, **kwargs):
+        self.exhausted = False
+        self.split_record = False
+        self.line_offset = line_offset
+        self.reader = csv.reader(self.lines(infile), **kwargs)
+
+    def lines(self, infile):
+        yield from infile
+        # The CSV reader only asks for more input after the last line if it is starting a new
+        # record (in which case it stops) or if the record it is reading is incomplete.
+        self.exhausted = True
+
+    @property
+    def line_num(self):
+        return self.reader.line_num + self.line_offset
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self.reader)
+        if self.exhausted:
+            self.split_record = True
+        return row
@@ -0,0 +1,155 @@
+import itertools
+from entity_file import Type
+from exceptions import SchemaError
+
+# NumPy is only required when the columnar encoding mode is enabled.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Number of rows read and encoded together.
+BLOCK_SIZE = 4096
+
+# Property types with a fixed-width encoding, mapped to the type tag they are
+# sent with and the NumPy format of their value (matching struct's "=q", "=d" and "=?").
+FIXED_WIDTH_TYPES = {
+    Type.LONG: (Type.LONG.value, '=i8'),
+    Type.ID_INTEGER: (Type.LONG.value, '=i8'),
+    Type.DOUBLE: (Type.DOUBLE.value, '=f8'),
+    Type.BOOL: (Type.BOOL.value, '?'),
+}
+
+BOOL_FIELDS = {'true': True, 'false': False}
+
+
+class FixedWidthRun(object):
+    """A sequence of adjacent fixed-width property columns, encoded as one packed record per row."""
+    def __init__(self, columns):
+        self.columns = columns # (column index, Type, position in entity.prop_converters) triples
+        fields = []
+        for field, (idx, col_type, position) in enumerate(columns):
+            tag, value_format = FIXED_WIDTH_TYPES[col_type]
+            fields.append(('t%d' % field, 'u1'))
+            fields.append(('v%d' % field, value_format))
+        self.dtype = np.dtype(fields) # Packed, as struct's "=" formats are unaligned
+
+    @staticmethod
+    def convert(values, col_type):
+        """Convert a column of CSV fields, raising ValueError if any field needs the per-cell path."""
+        count = len(values)
+        if col_type == Type.BOOL:
+            # Fields other than 'true' and 'false' raise KeyError.
+            return np.fromiter(map(BOOL_FIELDS.__getitem__, map(str.lower, map(str.strip, values))), np.bool_, count)
+        if col_type == Type.DOUBLE:
+            # float() and int() ignore surrounding whitespace, as the per-cell path does.
+            converted = np.fromiter(map(float, values), np.float64, count)
+            # Non-finite values are rejected by the per-cell path.
+            if not np.isfinite(converted).all():
+                raise ValueError("non-finite field")
+            return converted
+        return np.fromiter(map(int, values), np.int64, count)
+
+    def encode(self, rows, columns, converters):
+        records = np.empty(len(rows), dtype=self.dtype)
+        try:
+            for field, (idx, col_type, position) in enumerate(self.columns):
+                records['v%d' % field] = self.convert(columns[idx], col_type)
+                records['t%d' % field] = FIXED_WIDTH_TYPES[col_type][0]
+        except (ValueError, OverflowError, KeyError):
+            # Empty, malformed, or out-of-range fields are encoded (or rejected) one cell at a time.
+            cells = [(idx, converters[position][1]) for idx, col_type, position in self.columns]
+            return [b''.join([convert(row[idx]) for idx, convert in cells]) for row in rows]
+        buf = records.tobytes()
+        stride = self.dtype.itemsize
+        return [buf[offset:offset + stride] for offset in range(0, len(buf), stride)]
+
+
+class VariableWidthColumn(object):
+    """A string, array, or other variable-width property column, encoded one cell at a time."""
+    def __init__(self, idx, position):
+        self.idx = idx
+        self.position = position # Position of the column in entity.prop_converters
+
+    def encode(self, rows, columns, converters):
+        return list(map(converters[self.position][1], columns[self.idx]))
+
+
+class ColumnarReader(object):
+    """Wrapper around a CSV reader that encodes schema-enforced rows a block at a time.
+
+    Rows are yielded one by one as with the wrapped reader, and line_num tracks the
+    most recently yielded row. After each row is yielded, `binary` holds its
+    encoded properties, or None if the row must be packed by the per-cell path
+    (which then reports any errors it contains).
+
+    Columns are encoded by the entity's current converters, which are looked up
+    for each block, as a column's value cache replaces itself with the converter
+    it wraps once it stops paying off.
+    """
+    def __init__(self, reader, entity, block_size=BLOCK_SIZE):
+        if np is None:
+            raise ImportError("The columnar encoding mode requires NumPy to be installed.")
+        self.reader = reader
+        self.block_size = block_size
+        self.column_count = entity.column_count
+        self.entity = entity
+        self.segments = self.build_segments(entity)
+
+        self.line_num = reader.line_num
+        self.row = None
+        self.binary = None
+
+    @staticmethod
+    def build_segments(entity):
+        """Group property columns into runs of fixed-width columns and individual variable-width columns."""
+        segments = []
+        run = []
+        for position, (idx, convert) in enumerate(entity.prop_converters):
+            col_type = entity.types[idx]
+            if col_type in FIXED_WIDTH_TYPES:
+                run.append((idx, col_type, position))
+                continue
+            if run:
+                segments.append(FixedWidthRun(run))
+                run = []
+            segments.append(VariableWidthColumn(idx, position))
+        if run:
+            segments.append(FixedWidthRun(run))
+        return segments
+
+    def __iter__(self):
+        while True:
+            rows, line_nums = self.read_block()
+            if not rows:
+                return
+            for row, binary, line_num in zip(rows, self.encode_block(rows), line_nums):
+                self.row = row
+                self.binary = binary
+                self.line_num = line_num
+                yield row
+
+    def read_block(self):
+        rows = []
+        line_nums = []
+        reader = self.reader
+        for row in itertools.islice(reader, self.block_size):
+            rows.append(row)
+            line_nums.append(reader.line_num)
+        return rows, line_nums
+
+    def encode_block(self, rows):
+        # Malformed rows are left to the per-row path, which reports them.
+        if any(len(row) != self.column_count for row in rows):
+            return [None] * len(rows)
+        if not self.segments:
+            return [b''] * len(rows)
+        columns = list(zip(*rows))
+        converters = self.entity.prop_converters
+        try:
+            encoded = [segment.encode(rows, columns, converters) for segment in self.segments]
+        except SchemaError:
+            return [None] * len(rows)
+        if len(encoded) == 1:
+            return encoded[0]
+        return [b''.join(parts) for parts in zip(*encoded)]
@@ -0,0 +1,111 @@
+import io
+import os
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+from streams import StreamFile, is_stream
+
+# zstandard is only required to read files compressed with Zstandard.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Extensions of the compressed files that can be read directly.
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst')
+
+# Size of the blocks decompressed at a time, and the number of blocks decompressed ahead of the reader.
+DECOMPRESS_BLOCK_SIZE = 1024 * 1024
+DECOMPRESS_AHEAD = 8
+
+
+def compression_extension(filename):
+    """Return the compression extension of filename, or None if the file is not compressed."""
+    extension = os.path.splitext(filename)[1].lower()
+    return extension if extension in COMPRESSED_EXTENSIONS else None
+
+
+def strip_compression_extension(filename):
+    """Return filename without its compression extension, if any."""
+    if compression_extension(filename) is None:
+        return filename
+    return os.path.splitext(filename)[0]
+
+
+def open_decompressor(extension, compressed):
+    if extension == '.gz':
+        return gzip.GzipFile(fileobj=compressed, mode='rb')
+    if extension == '.bz2':
+        return bz2.BZ2File(compressed)
+    if extension == '.xz':
+        return lzma.LZMAFile(compressed)
+    if zstandard is None:
+        raise ImportError("Reading files compressed with Zstandard requires zstandard to be installed.")
+    # Files written by parallel compressors hold several frames.
+    return zstandard.ZstdDecompressor().stream_reader(compressed, read_across_frames=True)
+
+
+class DecompressedFile(io.RawIOBase):
+    """Raw binary stream over the decompressed contents of a compressed file.
+
+    The file is decompressed by a background thread up to DECOMPRESS_AHEAD
+    blocks ahead of the reader; the decompressors release the GIL, so this
+    overlaps with parsing the decompressed rows. compressed_position()
+    reports how far into the compressed file decompression has reached.
+    Compressed named pipes are read as streams.
+    """
+    def __init__(self, filename):
+        self.name = filename
+        self.file = StreamFile(filename) if is_stream(filename) else io.open(filename, 'rb')
+        self.decompressor = open_decompressor(compression_extension(filename), self.file)
+        self.blocks = queue.Queue(DECOMPRESS_AHEAD) # Decompressed blocks, an empty block at the end of the file, or an error
+        self.block = memoryview(b'')                 # Unread part of the current block
+        self.closing = False
+        self.thread = threading.Thread(target=self.decompress, name='decompress', daemon=True)
+        self.thread.start()
+
+    def decompress(self):
+        try:
+            while not self.closing:
+                block = self.decompressor.read(DECOMPRESS_BLOCK_SIZE)
+                self.blocks.put(block)
+                if not block:
+                    return
+        except Exception as e:
+            self.blocks.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        if not self.block:
+            block = self.blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                # Further reads see the end of the file too.
+                self.blocks.put(block)
+                return 0
+            self.block = memoryview(block)
+        read = min(len(buf), len(self.block))
+        buf[:read] = self.block[:read]
+        self.block = self.block[read:]
+        return read
+
+    def compressed_position(self):
+        return self.file.tell()
+
+    def close(self):
+        if not self.closed:
+            # Unblock the background thread if it is waiting for room in the queue.
+            self.closing = True
+            while self.thread.is_alive():
+                try:
+                    self.blocks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.decompressor.close()
+            self.file.close()
+        super(DecompressedFile, self).close()
@@ -1,8 +1,9 @@
 from exceptions import SchemaError
+from id_map import ID_MAP_BACKENDS
 
 
 class Config:
-    def __init__(self, max_token_count=1024 * 1023, max_buffer_size=64, max_token_size=64, enforce_schema=False, id_type='STRING', skip_invalid_nodes=False, skip_invalid_edges=False, separator=',', quoting=3, store_node_identifiers=False, escapechar='\\'):
+    def __init__(self, max_token_count=1024 * 1023, max_buffer_size=64, max_token_size=64, enforce_schema=False, id_type='STRING', skip_invalid_nodes=False, skip_invalid_edges=False, separator=',', quoting=3, store_node_identifiers=False, escapechar='\\', columnar=False, single_pass=False, id_map='dict', id_map_dir=None, id_map_memory=256, workers=1, chunk_size=64, max_inflight_size=128, field_types=()):
         """Settings for this run of the bulk loader"""
         # Maximum number of tokens per query
         # 1024 * 1024 is the hard-coded Redis maximum. We'll set a slightly lower limit so
@@ -14,6 +15,8 @@ class Config:
         # Maximum size in bytes per token
         # 512 megabytes is a hard-coded Redis maximum
         self.max_token_size = min(max_token_size * 1_000_000, 512 * 1_000_000, self.max_buffer_size)
+        # Maximum size in bytes of the queries sent to Redis that have not yet been acknowledged
+        self.max_inflight_size = max_inflight_size * 1_000_000
 
         self.enforce_schema = enforce_schema
         id_type = str.upper(id_type)
@@ -28,3 +31,43 @@ class Config:
 
         # True if we are building relations as well as nodes
         self.store_node_identifiers = store_node_identifiers
+
+        # Encode property columns in blocks rather than one cell at a time.
+        # Only typed columns can be encoded this way.
+        if columnar and not enforce_schema:
+            raise SchemaError("The --columnar option requires --enforce-schema")
+        self.columnar = columnar
+
+        # Read each input file once, reporting progress by bytes rather than rows.
+        self.single_pass = single_pass
+
+        # Backend of the node identifier map used to resolve relation endpoints.
+        id_map = str.lower(id_map)
+        if id_map not in ID_MAP_BACKENDS:
+            raise SchemaError("Specified invalid argument for --id-map, expected one of: %s" % ", ".join(ID_MAP_BACKENDS))
+        self.id_map = id_map
+        # Directory and memory budget in megabytes of the memory-mapped ('mmap') identifier map.
+        self.id_map_dir = id_map_dir
+        self.id_map_memory = id_map_memory
+
+        # Number of worker processes encoding input files; 1 encodes them in this process.
+        if workers < 1:
+            raise SchemaError("Specified invalid argument for --workers, expected a positive number of processes")
+        self.workers = workers
+        # Size in bytes of the chunks that input files are split into for parallel encoding.
+        if chunk_size <= 0:
+            raise SchemaError("Specified invalid argument for --chunk-size, expected a positive size in megabytes")
+        self.chunk_size = int(chunk_size * 1_000_000)
+
+        # Types of the fields of Parquet and JSON Lines files, overriding those of their values, given as
+        # FIELD:TYPE, or LABEL.FIELD:TYPE to apply to the files of one label or relation type only.
+        self.field_types = {}
+        for field_type in field_types:
+            field, sep, type_name = field_type.partition(':')
+            if not field or not type_name:
+                raise SchemaError("Specified invalid argument for --field-type, expected FIELD:TYPE but got '%s'" % field_type)
+            self.field_types[field.strip()] = type_name.strip()
+
+    def field_type(self, entity_str, field):
+        """Return the type given to a field of the files of a label or relation type, or None if it has none."""
+        return self.field_types.get(entity_str + '.' + field, self.field_types.get(field))
@@ -1,12 +1,20 @@
 import os
 import io
 import csv
+import re
 import ast
 import sys
+import copy
 import math
+import click
 import struct
 from enum import Enum
 from exceptions import CSVError, SchemaError
+from progress import ByteProgressBar, stream_progressbar
+from chunks import split_file, FileRange, ChunkReader
+from checkpoint import ResumedReader
+from compression import DecompressedFile, compression_extension, strip_compression_extension
+from streams import StreamFile, is_stream
 
 #csv.field_size_limit(sys.maxsize) # Don't limit the size of user input fields.
 
@@ -45,7 +53,171 @@ def convert_schema_type(in_type):
             raise SchemaError("Encountered invalid field type '%s'" % in_type)
 
 
+# Convert a bracket-interpolated array literal into a binary stream.
+# Each element is encoded as its text would be by inferred_prop_to_binary.
 def array_prop_to_binary(format_str, prop_val):
+    binary = number_vector_to_binary(format_str, prop_val)
+    if binary is None:
+        binary = scan_array_literal(format_str, prop_val)
+    if binary is None:
+        # Literals in any other syntax are evaluated, or rejected, by Python.
+        binary = evaluated_array_to_binary(format_str, prop_val)
+    return binary
+
+
+# Integer literals with leading zeros, such as '007', which are not valid Python literals.
+LEADING_ZERO = re.compile(r'(?<![0-9_])0[0-9_]*[1-9]')
+
+
+def number_vector_to_binary(format_str, prop_val):
+    """Encode an array literal of only floats, or only integers, converting all its elements at once.
+
+    Such literals, like embedding vectors, are split at their commas, and
+    their elements packed with a single format. Returns None for literals
+    of any other elements, or with elements that Python would evaluate
+    differently from float() or int().
+    """
+    # float() and int() accept non-ASCII digits and control characters as whitespace, unlike Python literals.
+    if not prop_val.isascii() or not prop_val.isprintable():
+        return None
+    inner = prop_val[1:-1]
+    tokens = inner.split(',')
+    if 'e' in inner or 'E' in inner:
+        is_float = all('.' in token or 'e' in token or 'E' in token for token in tokens)
+    else:
+        # No token with more than one point can be parsed, so every token has one if there are as many points as tokens.
+        is_float = inner.count('.') == len(tokens)
+    try:
+        if is_float:
+            values = list(map(float, tokens))
+            # A sum is only finite if each value is, or the sum overflowed.
+            if not math.isfinite(sum(values)) and not all(map(math.isfinite, values)):
+                return None
+            return pack_vector(format_str, DOUBLE_TAG, "d", values)
+        if '.' in inner or LEADING_ZERO.search(inner):
+            return None
+        return pack_vector(format_str, LONG_TAG, "q", list(map(int, tokens)))
+    except (ValueError, struct.error):
+        return None
+
+
+def pack_vector(format_str, tag, value_format, values):
+    count = len(values)
+    args = [tag] * (2 * count)
+    args[1::2] = values
+    return struct.pack(format_str + "q" + ("B" + value_format) * count, Type.ARRAY.value, count, *args)
+
+
+# Tokens of the array literals read by scan_array_literal, with the spaces around them.
+ARRAY_TOKEN = re.compile(r"""[ \t]*(?:
+    (?P<open>\[)
+  | (?P<close>\])
+  | '(?P<single>[^'\\\r\n]*)'
+  | "(?P<double>[^"\\\r\n]*)"
+  | (?P<float>[+-]?(?:(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|[0-9]+[eE][+-]?[0-9]+))
+  | (?P<int>[+-]?(?:0|[1-9][0-9]*))
+  | (?P<word>True|False|None)
+)[ \t]*""", re.VERBOSE)
+ARRAY_SPACES = re.compile(r"[ \t]*")
+
+
+def float_element_to_binary(token):
+    value = float(token)
+    if math.isnan(value) or math.isinf(value):
+        return None
+    return DOUBLE_STRUCT.pack(DOUBLE_TAG, value)
+
+
+def int_element_to_binary(token):
+    try:
+        return LONG_STRUCT.pack(LONG_TAG, int(token))
+    except struct.error:
+        return None
+
+
+def string_element_to_binary(token):
+    # The text of strings is inferred, so that '1' is encoded as an integer.
+    return learned_string_to_binary(token)
+
+
+def word_element_to_binary(word):
+    if word == 'True':
+        return TRUE_BINARY
+    if word == 'False':
+        return FALSE_BINARY
+    return STRING_PREFIX + b'None\x00'
+
+
+# Encoders of the scalar tokens of array literals. Each returns None for an element
+# that it cannot encode as Python's evaluation of the literal would be.
+ARRAY_ELEMENT_ENCODERS = {
+    'single': string_element_to_binary,
+    'double': string_element_to_binary,
+    'float': float_element_to_binary,
+    'int': int_element_to_binary,
+    'word': word_element_to_binary,
+}
+
+
+# Deepest nesting of arrays that Python's parser accepts. Deeper literals are left to
+# ast.literal_eval, which rejects them.
+MAX_ARRAY_DEPTH = 200
+
+
+def scan_array_literal(format_str, prop_val):
+    """Encode an array literal element by element, without evaluating it.
+
+    The literals scanned are those of nested arrays, quoted strings without
+    escapes, decimal numbers, and True, False, and None, separated by commas
+    and spaces. Returns None for any other literal, or one with an element
+    that cannot be encoded as it would be once the literal was evaluated.
+    """
+    match = ARRAY_TOKEN.match(prop_val)
+    if match is None or match.lastgroup != 'open':
+        # The literal is not an array.
+        return None
+    value, pos = scan_array_elements(format_str, prop_val, match.end(), 1)
+    return value if pos == len(prop_val) else None
+
+
+def scan_array_elements(format_str, prop_val, pos, depth):
+    """Encode the elements of the array opened before pos, nested depth arrays deep.
+
+    Returns the encoded array and the position after its closing bracket, or
+    None and the position reached if the array cannot be scanned.
+    """
+    if depth > MAX_ARRAY_DEPTH:
+        return None, pos
+    elements = []
+    while True:
+        match = ARRAY_TOKEN.match(prop_val, pos)
+        if match is None:
+            return None, pos
+        kind = match.lastgroup
+        if kind == 'close':
+            # The array is empty, or ends with a comma.
+            pos = match.end()
+            break
+        if kind == 'open':
+            value, pos = scan_array_elements(format_str, prop_val, match.end(), depth + 1)
+        else:
+            value = ARRAY_ELEMENT_ENCODERS[kind](match.group(kind))
+            pos = match.end()
+        if value is None:
+            return None, pos
+        elements.append(value)
+        # Each element is followed by a comma, or by the end of its array.
+        if prop_val.startswith(',', pos):
+            pos += 1
+            continue
+        if not prop_val.startswith(']', pos):
+            return None, pos
+        pos = ARRAY_SPACES.match(prop_val, pos + 1).end()
+        break
+    return struct.pack(format_str + "q", Type.ARRAY.value, len(elements)) + b''.join(elements), pos
+
+
+def evaluated_array_to_binary(format_str, prop_val):
     # Evaluate the array to convert its elements.
     # (This allows us to handle nested arrays.)
     array_val = ast.literal_eval(prop_val)
@@ -58,82 +230,140 @@ def array_prop_to_binary(format_str, prop_val):
     return array_to_send
 
 
-# Convert a property field with an enforced type into a binary stream.
-# Supported property types are string, integer, float, and boolean.
-def typed_prop_to_binary(prop_val, prop_type):
-    # All format strings start with an unsigned char to represent our prop_type enum
-    format_str = "=B"
+# Precompiled formats for property values.
+# All formats start with an unsigned char to represent our prop_type enum.
+LONG_STRUCT = struct.Struct("=Bq")
+DOUBLE_STRUCT = struct.Struct("=Bd")
+BOOL_STRUCT = struct.Struct("=B?")
 
-    # Remove leading and trailing whitespace
+# Type tags, resolved once rather than on every field.
+LONG_TAG = Type.LONG.value
+DOUBLE_TAG = Type.DOUBLE.value
+BOOL_TAG = Type.BOOL.value
+
+# An empty string indicates a NULL property.
+# TODO This is not allowed in Cypher, consider how to handle it here rather than in-module.
+NULL_BINARY = struct.pack("=B", 0)
+FALSE_BINARY = BOOL_STRUCT.pack(BOOL_TAG, False)
+TRUE_BINARY = BOOL_STRUCT.pack(BOOL_TAG, True)
+# Strings are sent as the type tag followed by the null-terminated string.
+STRING_PREFIX = struct.pack("=B", Type.STRING.value)
+
+
+def unparsable_prop_error(prop_val, prop_type):
+    return SchemaError("unable to parse [" + prop_val + "] with type [" + repr(prop_type) + "]")
+
+
+# Converters for each enforced property type.
+# Each receives a raw CSV field and returns its binary representation.
+def long_prop_to_binary(prop_val):
+    prop_val = prop_val.strip()
+    if prop_val == "":
+        return NULL_BINARY
+    try:
+        return LONG_STRUCT.pack(LONG_TAG, int(prop_val))
+    except (ValueError, struct.error):
+        raise SchemaError("Could not parse '%s' as a long" % prop_val)
+
+
+def id_integer_prop_to_binary(prop_val):
+    prop_val = prop_val.strip()
+    if prop_val == "":
+        return NULL_BINARY
+    try:
+        return LONG_STRUCT.pack(LONG_TAG, int(prop_val))
+    except (ValueError, struct.error):
+        pass
+    raise unparsable_prop_error(prop_val, Type.ID_INTEGER)
+
+
+def double_prop_to_binary(prop_val):
     prop_val = prop_val.strip()
+    if prop_val == "":
+        return NULL_BINARY
+    try:
+        numeric_prop = float(prop_val)
+    except ValueError:
+        raise SchemaError("Could not parse '%s' as a double" % prop_val)
+    if not math.isnan(numeric_prop) and not math.isinf(numeric_prop): # Don't accept non-finite values.
+        return DOUBLE_STRUCT.pack(DOUBLE_TAG, numeric_prop)
+    raise unparsable_prop_error(prop_val, Type.DOUBLE)
+
 
+def bool_prop_to_binary(prop_val):
+    prop_val = prop_val.strip()
     if prop_val == "":
-        # An empty string indicates a NULL property.
-        # TODO This is not allowed in Cypher, consider how to handle it here rather than in-module.
-        return struct.pack(format_str, 0)
+        return NULL_BINARY
+    # If field is 'false' or 'true', it is a boolean
+    lowered = prop_val.lower()
+    if lowered == 'false':
+        return FALSE_BINARY
+    elif lowered == 'true':
+        return TRUE_BINARY
+    raise SchemaError("Could not parse '%s' as a boolean" % prop_val)
 
-    if prop_type == Type.ID_INTEGER or prop_type == Type.LONG:
-        try:
-            numeric_prop = int(prop_val)
-            return struct.pack(format_str + "q", Type.LONG.value, numeric_prop)
-        except (ValueError, struct.error):
-            # TODO ugly, rethink
-            if prop_type == Type.LONG:
-                raise SchemaError("Could not parse '%s' as a long" % prop_val)
-
-    elif prop_type == Type.DOUBLE:
-        try:
-            numeric_prop = float(prop_val)
-            if not math.isnan(numeric_prop) and not math.isinf(numeric_prop): # Don't accept non-finite values.
-                return struct.pack(format_str + "d", Type.DOUBLE.value, numeric_prop)
-        except (ValueError, struct.error):
-            # TODO ugly, rethink
-            if prop_type == Type.DOUBLE:
-                raise SchemaError("Could not parse '%s' as a double" % prop_val)
-
-    elif prop_type == Type.BOOL:
-        # If field is 'false' or 'true', it is a boolean
-        if prop_val.lower() == 'false':
-            return struct.pack(format_str + '?', Type.BOOL.value, False)
-        elif prop_val.lower() == 'true':
-            return struct.pack(format_str + '?', Type.BOOL.value, True)
-        else:
-            raise SchemaError("Could not parse '%s' as a boolean" % prop_val)
 
-    elif prop_type == Type.ID_STRING or prop_type == Type.STRING:
-        # If we've reached this point, the property is a string
-        encoded_str = str.encode(prop_val) # struct.pack requires bytes objects as arguments
-        # Encoding len+1 adds a null terminator to the string
-        format_str += "%ds" % (len(encoded_str) + 1)
-        return struct.pack(format_str, Type.STRING.value, encoded_str)
+def string_prop_to_binary(prop_val):
+    prop_val = prop_val.strip()
+    if prop_val == "":
+        return NULL_BINARY
+    return STRING_PREFIX + prop_val.encode() + b'\x00'
+
+
+def array_typed_prop_to_binary(prop_val):
+    prop_val = prop_val.strip()
+    if prop_val == "":
+        return NULL_BINARY
+    if prop_val[0] != '[' or prop_val[-1] != ']':
+        raise SchemaError("Could not parse '%s' as an array" % prop_val)
+    return array_prop_to_binary("=B", prop_val)
+
 
-    elif prop_type == Type.ARRAY:
-        if prop_val[0] != '[' or prop_val[-1] != ']':
-            raise SchemaError("Could not parse '%s' as an array" % prop_val)
-        return array_prop_to_binary(format_str, prop_val)
+TYPED_CONVERTERS = {
+    Type.LONG: long_prop_to_binary,
+    Type.ID_INTEGER: id_integer_prop_to_binary,
+    Type.DOUBLE: double_prop_to_binary,
+    Type.BOOL: bool_prop_to_binary,
+    Type.STRING: string_prop_to_binary,
+    Type.ID_STRING: string_prop_to_binary,
+    Type.ARRAY: array_typed_prop_to_binary,
+}
 
-    # If it hasn't returned by this point, it is trying to set it to a type that it can't adopt
-    raise SchemaError("unable to parse [" + prop_val + "] with type [" + repr(prop_type) + "]")
+
+def typed_converter(prop_type):
+    """Return the function that converts fields of the given type into a binary stream."""
+    try:
+        return TYPED_CONVERTERS[prop_type]
+    except KeyError:
+        pass
+
+    # Fields of any other type can only be NULL.
+    def convert(prop_val):
+        prop_val = prop_val.strip()
+        if prop_val == "":
+            return NULL_BINARY
+        raise unparsable_prop_error(prop_val, prop_type)
+    return convert
+
+
+# Convert a property field with an enforced type into a binary stream.
+# Supported property types are string, integer, float, boolean, and array.
+def typed_prop_to_binary(prop_val, prop_type):
+    return typed_converter(prop_type)(prop_val)
 
 
 # Convert a single CSV property field with an inferred type into a binary stream.
 # Supported property types are string, integer, float, boolean, and (erroneously) null.
 def inferred_prop_to_binary(prop_val):
-    # All format strings start with an unsigned char to represent our prop_type enum
-    format_str = "=B"
-
     # Remove leading and trailing whitespace
     prop_val = prop_val.strip()
 
     if prop_val == "":
-        # An empty string indicates a NULL property.
-        # TODO This is not allowed in Cypher, consider how to handle it here rather than in-module.
-        return struct.pack(format_str, 0)
+        return NULL_BINARY
 
     # Try to parse value as an integer.
     try:
-        numeric_prop = int(prop_val)
-        return struct.pack(format_str + "q", Type.LONG.value, numeric_prop)
+        return LONG_STRUCT.pack(LONG_TAG, int(prop_val))
     except (ValueError, struct.error):
         pass
 
@@ -141,28 +371,238 @@ def inferred_prop_to_binary(prop_val):
     try:
         numeric_prop = float(prop_val)
         if not math.isnan(numeric_prop) and not math.isinf(numeric_prop): # Don't accept non-finite values.
-            return struct.pack(format_str + "d", Type.DOUBLE.value, numeric_prop)
-    except (ValueError, struct.error):
+            return DOUBLE_STRUCT.pack(DOUBLE_TAG, numeric_prop)
+    except ValueError:
         pass
 
     # If field is 'false' or 'true', it is a boolean.
-    if prop_val.lower() == 'false':
-        return struct.pack(format_str + '?', Type.BOOL.value, False)
-    elif prop_val.lower() == 'true':
-        return struct.pack(format_str + '?', Type.BOOL.value, True)
+    lowered = prop_val.lower()
+    if lowered == 'false':
+        return FALSE_BINARY
+    elif lowered == 'true':
+        return TRUE_BINARY
 
     # If the property string is bracket-interpolated, it is an array.
     if prop_val[0] == '[' and prop_val[-1] == ']':
         try:
-            return array_prop_to_binary(format_str, prop_val)
+            return array_prop_to_binary("=B", prop_val)
         except:
             pass
 
     # If we've reached this point, the property is a string.
-    encoded_str = str.encode(prop_val) # struct.pack requires bytes objects as arguments
-    # Encoding len+1 adds a null terminator to the string
-    format_str += "%ds" % (len(encoded_str) + 1)
-    return struct.pack(format_str, Type.STRING.value, encoded_str)
+    return STRING_PREFIX + prop_val.encode() + b'\x00'
+
+
+# Fast paths for schemaless columns whose fields have all been inferred to have one type.
+# Each converts the fields it can identify without trying other types first, and passes
+# any other field to inferred_prop_to_binary, so that its output is always the same.
+
+# First characters of the fields that may be parsed as numbers, or as arrays.
+NUMERIC_STARTS = frozenset('+-.[')
+# First characters of 'true' and 'false', in either case.
+BOOL_STARTS = frozenset('tTfF')
+
+
+def learned_string_to_binary(prop_val):
+    prop_val = prop_val.strip()
+    # Fields that start with any other character (and are not booleans) cannot be numbers,
+    # since int() and float() only parse decimal digits, signs, points, and 'inf' or 'nan',
+    # which are not finite and so are strings too.
+    if prop_val:
+        first = prop_val[0]
+        if (first not in NUMERIC_STARTS and not first.isdecimal()
+                and (first not in BOOL_STARTS or prop_val.lower() not in ('true', 'false'))):
+            return STRING_PREFIX + prop_val.encode() + b'\x00'
+    return inferred_prop_to_binary(prop_val)
+
+
+def learned_double_to_binary(prop_val):
+    prop_val = prop_val.strip()
+    # Fields with a decimal point or exponent cannot be parsed as integers.
+    if '.' in prop_val or 'e' in prop_val or 'E' in prop_val:
+        try:
+            numeric_prop = float(prop_val)
+            if not math.isnan(numeric_prop) and not math.isinf(numeric_prop):
+                return DOUBLE_STRUCT.pack(DOUBLE_TAG, numeric_prop)
+        except ValueError:
+            pass
+    return inferred_prop_to_binary(prop_val)
+
+
+def learned_bool_to_binary(prop_val):
+    lowered = prop_val.strip().lower()
+    if lowered == 'false':
+        return FALSE_BINARY
+    elif lowered == 'true':
+        return TRUE_BINARY
+    return inferred_prop_to_binary(prop_val)
+
+
+def learned_array_to_binary(prop_val):
+    prop_val = prop_val.strip()
+    # Fields in brackets cannot be parsed as numbers or booleans.
+    if prop_val and prop_val[0] == '[' and prop_val[-1] == ']':
+        try:
+            return array_prop_to_binary("=B", prop_val)
+        except Exception:
+            # Literals that cannot be evaluated, such as malformed, unhashable, or
+            # too deeply nested ones, are stored as strings, as by inference.
+            return STRING_PREFIX + prop_val.encode() + b'\x00'
+    return inferred_prop_to_binary(prop_val)
+
+
+# Converters of schemaless columns by the type tag of all their sampled fields.
+# Integers are tried first by inferred_prop_to_binary, which needs no fast path.
+LEARNED_CONVERTERS = {
+    Type.LONG.value: inferred_prop_to_binary,
+    Type.DOUBLE.value: learned_double_to_binary,
+    Type.BOOL.value: learned_bool_to_binary,
+    Type.STRING.value: learned_string_to_binary,
+    Type.ARRAY.value: learned_array_to_binary,
+}
+
+# Number of distinct fields of a schemaless column that are inferred before its type is learned.
+TYPE_SAMPLE_SIZE = 1000
+
+
+class ColumnTypeLearner(object):
+    """Converter of the first fields of a schemaless column, which learns the column's type from them.
+
+    Fields are converted by inferred_prop_to_binary, and the types they are
+    inferred to have are recorded. The learner of a CSV column is wrapped by
+    the column's value cache, so it sees only the fields the cache does not
+    hold: repeated fields add nothing to the types recorded, and a column of
+    few distinct fields remains cached rather than learned. After
+    TYPE_SAMPLE_SIZE such fields, the learner
+    replaces itself among the entity's prop_converters with the fast path of
+    the one type of all the fields that were not empty, or if they had several
+    types, with inferred_prop_to_binary.
+    """
+    def __init__(self, entity, position):
+        self.entity = entity
+        self.position = position # Index of the column in entity.prop_converters
+        self.count = 0
+        self.tags = set()
+
+    def __call__(self, prop_val):
+        binary = inferred_prop_to_binary(prop_val)
+        self.tags.add(binary[0])
+        self.count += 1
+        if self.count == TYPE_SAMPLE_SIZE:
+            self.tags.discard(NULL_BINARY[0])
+            convert = LEARNED_CONVERTERS.get(self.tags.pop()) if len(self.tags) == 1 else None
+            self.entity.replace_converter(self.position, self, convert or inferred_prop_to_binary)
+        return binary
+
+
+# Number of distinct fields of a column whose encodings are cached.
+VALUE_CACHE_SIZE = 1024
+# Length of the longest field whose encoding is cached, which bounds the memory of a cache.
+VALUE_CACHE_FIELD_SIZE = 64
+
+
+class ValueCache(object):
+    """Converter of the fields of a property column that caches the encodings of its distinct fields.
+
+    Columns of few distinct values, such as codes, statuses, and flags, repeat
+    the same fields, whose encodings are then looked up rather than parsed and
+    packed again. Up to VALUE_CACHE_SIZE fields are cached; fields longer than
+    VALUE_CACHE_FIELD_SIZE characters, such as descriptions, take up room in
+    the cache without being stored, which bounds the memory it holds. Once the
+    cache is full, if its lookups have missed more often than they hit, the
+    column has too many distinct values to benefit from it: the cache is
+    disabled, and replaces itself among the entity's prop_converters with the
+    converter it wraps.
+    """
+    def __init__(self, entity, position, convert):
+        self.entity = entity
+        self.position = position # Index of the column in entity.prop_converters
+        self.convert = convert
+        self.values = {}
+        self.capacity = VALUE_CACHE_SIZE # Number of fields that may still be cached
+        self.hits = 0
+        self.misses = 0
+        self.disabled = False
+
+    def __call__(self, prop_val):
+        binary = self.values.get(prop_val)
+        if binary is not None:
+            self.hits += 1
+            return binary
+        binary = self.convert(prop_val)
+        self.misses += 1
+        if self.capacity > 0:
+            self.capacity -= 1
+            if len(prop_val) <= VALUE_CACHE_FIELD_SIZE:
+                self.values[prop_val] = binary
+        elif self.misses > self.hits and not self.disabled:
+            # Callers that still hold the cache, such as the rest of a columnar block, no longer fill it.
+            self.disabled = True
+            self.capacity = 0
+            self.values = {}
+            self.entity.replace_converter(self.position, self, self.convert)
+        return binary
+
+
+# Convert a property value that was decoded with its type, rather than read from CSV, into a binary stream.
+# Supported values are None (null), booleans, integers, floats, strings, and lists of these.
+def value_to_binary(value):
+    if value is None:
+        return NULL_BINARY
+    # Booleans are integers too, so they are checked first.
+    if isinstance(value, bool):
+        return TRUE_BINARY if value else FALSE_BINARY
+    if isinstance(value, int):
+        try:
+            return LONG_STRUCT.pack(LONG_TAG, value)
+        except struct.error:
+            raise SchemaError("Could not parse '%s' as a long" % value)
+    if isinstance(value, float):
+        if not math.isnan(value) and not math.isinf(value): # Don't accept non-finite values.
+            return DOUBLE_STRUCT.pack(DOUBLE_TAG, value)
+        raise unparsable_prop_error(str(value), Type.DOUBLE)
+    if isinstance(value, str):
+        return STRING_PREFIX + value.encode() + b'\x00'
+    if isinstance(value, (list, tuple)):
+        return list_value_to_binary(value)
+    raise SchemaError("Could not convert value of type '%s' to a property" % type(value).__name__)
+
+
+# Convert a decoded list, whose elements may themselves be lists, into an array.
+def list_value_to_binary(values):
+    return struct.pack("=Bq", Type.ARRAY.value, len(values)) + b''.join([value_to_binary(elem) for elem in values])
+
+
+def typed_value_converter(prop_type):
+    """Return the function that converts decoded values of a column with an enforced type into a binary stream.
+
+    Lists are converted as arrays; other values are converted as their text would be if read from CSV.
+    """
+    convert = typed_converter(prop_type)
+
+    def convert_value(value):
+        if value is None:
+            return NULL_BINARY
+        if isinstance(value, str):
+            return convert(value)
+        if prop_type == Type.ARRAY and isinstance(value, list):
+            return value_to_binary(value)
+        return convert(str(value))
+    return convert_value
+
+
+# Formats of input files that are not CSV, by extension.
+INPUT_FORMATS = {
+    '.parquet': 'parquet',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+
+def input_format(filename):
+    """Return the format of an input file, as given by its extension."""
+    extension = os.path.splitext(strip_compression_extension(filename))[1].lower()
+    return INPUT_FORMATS.get(extension, 'csv')
 
 
 class EntityFile(object):
@@ -175,30 +615,232 @@ class EntityFile(object):
         if label:
             self.entity_str = label
         else:
-            self.entity_str = os.path.splitext(os.path.basename(filename))[0]
+            self.entity_str = os.path.splitext(os.path.basename(strip_compression_extension(filename)))[0]
         # Input file handling
-        self.infile = io.open(filename, 'rt')
-
-        # Initialize CSV reader that ignores leading whitespace in each field
-        # and does not modify input quote characters
-        self.reader = csv.reader(self.infile, delimiter=config.separator, skipinitialspace=True, quoting=config.quoting, escapechar=config.escapechar)
+        self.filename = filename
+        self.compression = compression_extension(filename) # Extension of a compressed file, which is decompressed as it is read
+        self.input_format = input_format(filename)
+        self.streamed = is_stream(filename) # True for standard input and named pipes, which are read once, in order
+        if self.streamed and self.input_format == 'parquet':
+            raise SchemaError("Parquet file '%s' cannot be read as a stream" % filename)
+        # Parquet and JSON Lines values carry their types, and their fields are given types by the
+        # header their reader makes, so their schema is always enforced.
+        self.enforce_schema = config.enforce_schema or self.input_format != 'csv'
+        # True if the reader encodes the properties of rows itself, leaving those of each row in reader.binary.
+        self.block_encoded = config.columnar or self.input_format != 'csv'
+        self.index = None # Position of the file among all inputs, by which checkpoints refer to it
+        self.open_input()
 
         self.packed_header = b''
-        self.binary_entities = []
+        self.token = bytearray() # binary token: the packed header followed by the entities packed into it
+        self.token_exported = False # True once to_binary() has handed out the token, which must then not change
+        self.binary_count = 0 # number of entities in binary token
         self.binary_size = 0 # size of binary token
 
         self.convert_header() # Extract data from header row.
-        self.count_entities() # Count number of entities/row in file.
-        next(self.reader) # Skip the header row.
+        # Byte ranges of the file encoded separately by parallel workers, as (start, end, lines before start).
+        self.chunks = [(0, None, 0)]
+        if self.input_format == 'parquet':
+            # Parquet files record their number of rows, and are split into chunks of row groups.
+            self.entities_count = self.reader.row_count
+            if config.workers > 1:
+                self.chunks = self.reader.split_row_groups(config.chunk_size)
+        elif config.single_pass or self.compression is not None or self.streamed:
+            # Progress is reported by bytes read, so the file is not counted in advance.
+            # Compressed files cannot be counted cheaply, nor split into chunks, and streams can only be read once.
+            self.entities_count = None
+        elif config.workers > 1:
+            self.split_input() # Count number of entities/row in file while splitting it into chunks.
+        else:
+            self.count_entities() # Count number of entities/row in file.
+        self.skip_header()
+
+    def open_input(self):
+        if self.input_format == 'parquet':
+            from parquet_reader import ParquetReader
+            self.infile = io.open(self.filename, 'rb')
+            self.reader = ParquetReader(self.infile, self)
+            return
+
+        if self.compression is not None:
+            self.infile = io.TextIOWrapper(io.BufferedReader(DecompressedFile(self.filename)))
+        elif self.streamed:
+            self.infile = io.TextIOWrapper(io.BufferedReader(StreamFile(self.filename)))
+        else:
+            self.infile = io.open(self.filename, 'rt')
+
+        if self.input_format == 'jsonl':
+            from jsonl_reader import JsonLinesReader
+            self.reader = JsonLinesReader(self.infile, self)
+            return
+
+        if self.streamed:
+            # Streams are not rewound to read their header again, so their lines are
+            # numbered from one more, matching the lines of files.
+            self.reader = ChunkReader(self.infile, 1, delimiter=self.config.separator, skipinitialspace=True, quoting=self.config.quoting, escapechar=self.config.escapechar)
+            return
+
+        # Initialize CSV reader that ignores leading whitespace in each field
+        # and does not modify input quote characters
+        self.reader = csv.reader(self.infile, delimiter=self.config.separator, skipinitialspace=True, quoting=self.config.quoting, escapechar=self.config.escapechar)
+
+    # Position the reader on the first row after the header. The header is read again from
+    # the start of the file, so reader.line_num counts it twice, as it always has.
+    def skip_header(self):
+        if self.input_format == 'parquet':
+            # The header of a Parquet file is its schema, which is not read as a row.
+            return
+        if self.streamed:
+            # Streams cannot be rewound, and are read on from the end of their header,
+            # or from the first of the JSON Lines records read to find their fields.
+            if self.input_format == 'csv':
+                self.wrap_reader()
+            return
+        if self.compression is not None:
+            # Compressed files are not rewound, but opened again.
+            self.infile.close()
+            self.open_input()
+        else:
+            self.infile.seek(0)
+        if self.input_format == 'jsonl':
+            # The lines read to find the fields of a JSON Lines file are read again as records.
+            self.reader.restart()
+            return
+        next(self.reader)
+        self.wrap_reader()
+
+    def wrap_reader(self):
+        # Encode schema-enforced rows in blocks of columns if requested.
+        if self.config.columnar:
+            from columnar import ColumnarReader
+            self.reader = ColumnarReader(self.reader, self)
+
+    # Open a chunk of the input file, positioning the reader on its first row.
+    # Returns the ChunkReader, which reports whether the chunk's last record was split.
+    def open_chunk(self, chunk):
+        start, end, lines_before = chunk
+        if self.input_format == 'parquet':
+            # Chunks of Parquet files are ranges of row groups.
+            from parquet_reader import ParquetReader
+            self.infile = io.open(self.filename, 'rb')
+            self.reader = ParquetReader(self.infile, self, start, end, lines_before)
+            return self.reader
+        if self.compression is not None:
+            # A compressed file is a single chunk.
+            self.infile = io.TextIOWrapper(io.BufferedReader(DecompressedFile(self.filename)))
+        else:
+            self.infile = io.TextIOWrapper(io.BufferedReader(FileRange(self.filename, start, end)))
+        if self.input_format == 'jsonl':
+            # Every line of a JSON Lines file is a record, so no record continues past the end of a chunk.
+            from jsonl_reader import JsonLinesReader
+            self.reader = JsonLinesReader(self.infile, self, lines_before)
+            return self.reader
+        # Lines are numbered as by the reader of the whole file, which counts the header twice.
+        chunk_reader = ChunkReader(self.infile, lines_before + 1, delimiter=self.config.separator, skipinitialspace=True, quoting=self.config.quoting, escapechar=self.config.escapechar)
+        self.reader = chunk_reader
+        if start == 0:
+            next(self.reader) # Skip the header row.
+        self.wrap_reader()
+        return chunk_reader
+
+    def encode_chunk(self, chunk, *args):
+        """Encode the rows of a chunk of the input file as EncodedRows. Runs in parallel encoding workers."""
+        chunk_reader = self.open_chunk(chunk)
+        try:
+            encoded = self.encode_rows(*args)
+        finally:
+            self.infile.close()
+        encoded.chunk = chunk
+        # The last chunk ends with the file, so its final record cannot continue elsewhere.
+        encoded.split_record = chunk_reader.split_record and chunk[1] is not None
+        return encoded
+
+    # Yield the EncodedRows of each chunk in order. If a chunk's last record continued into
+    # the next chunk, that chunk was parsed from the middle of a record, so the two are
+    # encoded again as one.
+    def join_chunks(self, chunks, *args):
+        split = None
+        for encoded in chunks:
+            if split is not None:
+                start, end, lines_before = split.chunk
+                encoded = copy.copy(self).encode_chunk((start, encoded.chunk[1], lines_before), *args)
+            if encoded.split_record:
+                split = encoded
+                continue
+            split = None
+            # The value caches of chunks encoded again here counted their own lookups.
+            if encoded.value_cache is not None:
+                self.add_value_cache_counts(encoded.value_cache)
+            yield encoded
+
+    # Entities are sent to parallel encoding workers without their open input, pending output,
+    # or node identifier table, which only the parent process updates.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attr in ('infile', 'reader', 'query_buffer', 'checkpoint', 'token', 'node_table'):
+            state.pop(attr, None)
+        return state
 
     # Count number of rows in file.
     def count_entities(self):
         self.entities_count = 0
         self.entities_count = sum(1 for line in self.infile)
+        if self.input_format == 'jsonl':
+            # Lines read to find the fields of the file are counted too.
+            self.entities_count += len(self.reader.pending)
         # seek back
         self.infile.seek(0)
         return self.entities_count
 
+    # Split the file into chunks for parallel workers, counting its lines in the same pass.
+    def split_input(self):
+        self.chunks, lines = split_file(self.filename, self.config.chunk_size)
+        if self.input_format == 'jsonl':
+            # Every line of a JSON Lines file is a record.
+            self.entities_count = lines
+        else:
+            # Only the header has been read, so reader.line_num is its number of lines.
+            self.entities_count = lines - self.reader.line_num
+        return self.entities_count
+
+    # Size in bytes of the input file or, for streams, of the part read so far.
+    def input_size(self):
+        if not self.streamed:
+            return os.path.getsize(self.filename)
+        raw = self.infile.buffer.raw
+        return raw.compressed_position() if self.compression is not None else raw.tell()
+
+    # Skip the rows that were sent before an interrupted load, resuming at the row that ends at line_num.
+    def skip_to_line(self, line_num):
+        self.reader = ResumedReader(self.reader, line_num)
+
+    # Progress bar wrapping the rows of the file, measured in rows or, in single-pass mode and for compressed files, in bytes.
+    # Streams have no size, so the rows and bytes read from them are shown instead.
+    def progressbar(self):
+        if self.entities_count is not None:
+            return click.progressbar(self.reader, length=self.entities_count, label=self.entity_str, update_min_steps=100)
+        if self.compression is not None:
+            # Progress through compressed files is measured in compressed bytes.
+            position = self.infile.buffer.raw.compressed_position
+            if self.streamed:
+                return stream_progressbar(self.reader, position, self.entity_str)
+            return ByteProgressBar(self.reader, position, os.path.getsize(self.filename), self.entity_str)
+        if self.streamed:
+            return stream_progressbar(self.reader, self.infile.buffer.tell, self.entity_str)
+        return ByteProgressBar(self.reader, self.infile.buffer.tell, os.path.getsize(self.infile.name), self.entity_str)
+
+    # Progress bar over the encoded chunks of the file, measured in rows or, in single-pass mode, in bytes.
+    def chunk_progressbar(self):
+        if self.entities_count is None:
+            return click.progressbar(length=os.path.getsize(self.filename), label=self.entity_str)
+        return click.progressbar(length=self.entities_count, label=self.entity_str)
+
+    def chunk_progress(self, encoded):
+        if self.entities_count is None:
+            start, end, lines_before = encoded.chunk
+            return (end if end is not None else os.path.getsize(self.filename)) - start
+        return len(encoded)
+
     # Simple input validations for each row of a CSV file
     def validate_row(self, row):
         # Each row should have the same number of fields
@@ -208,9 +850,18 @@ class EntityFile(object):
 
     # If part of a CSV file was sent to Redis, delete the processed entities and update the binary size
     def reset_partial_binary(self):
-        self.binary_entities = []
+        self.token = bytearray(self.packed_header)
+        self.token_exported = False
+        self.binary_count = 0
         self.binary_size = len(self.packed_header)
 
+    # Return the token for entities to be packed onto, copying it first if to_binary() has handed it out.
+    def writable_token(self):
+        if self.token_exported:
+            self.token = bytearray(self.token)
+            self.token_exported = False
+        return self.token
+
     # Convert property keys from a CSV file header into a binary string
     def pack_header(self):
         # String format
@@ -256,11 +907,11 @@ class EntityFile(object):
             self.types[idx] = col_type
 
     def convert_header(self):
-        header = next(self.reader)
+        header = next(self.reader) if self.input_format == 'csv' else self.reader.read_header()
         self.column_count = len(header)
         self.column_names = [None] * self.column_count   # Property names of every column; None if column does not update graph.
 
-        if self.config.enforce_schema:
+        if self.enforce_schema:
             # Use generic logic to convert the header with schema.
             self.convert_header_with_schema(header)
             # The subclass will perform post-processing.
@@ -272,19 +923,81 @@ class EntityFile(object):
         # The number of properties is equal to the number of non-skipped columns.
         self.prop_count = self.column_count - self.column_names.count(None)
         self.packed_header = self.pack_header()
+        self.token += self.packed_header
         self.binary_size += len(self.packed_header)
+        self.compile_row_encoder()
 
-    # Convert a list of properties into a binary string
-    def pack_props(self, line):
-        props = []
-        for idx, field in enumerate(line):
+    # Resolve the converter of every property column once, so that packing a row
+    # requires no per-field checks of the schema or column names.
+    def compile_row_encoder(self):
+        self.prop_converters = [] # (column index, converter) for every column that is stored as a property
+        self.value_caches = [] # Cache of the encoded fields of every property column of a CSV file
+        for idx in range(self.column_count):
             if not self.column_names[idx]:
                 continue
-            if self.config.enforce_schema:
-                props.append(typed_prop_to_binary(field, self.types[idx]))
+            position = len(self.prop_converters)
+            if self.enforce_schema:
+                convert = typed_converter(self.types[idx])
             else:
-                props.append(inferred_prop_to_binary(field))
-        return b''.join(p for p in props)
+                # The types of schemaless columns are learned from their first distinct fields.
+                convert = ColumnTypeLearner(self, position)
+            if self.input_format == 'csv':
+                # The properties of other formats are encoded by their readers.
+                convert = ValueCache(self, position, convert)
+                self.value_caches.append(convert)
+            self.prop_converters.append((idx, convert))
+
+    # Replace the converter of a property column with another, within the column's value cache if it is still in use.
+    def replace_converter(self, position, old, new):
+        idx, convert = self.prop_converters[position]
+        if convert is old:
+            self.prop_converters[position] = (idx, new)
+        elif isinstance(convert, ValueCache) and convert.convert is old:
+            convert.convert = new
+
+    # Hits, misses, and whether the cache was disabled, for the value cache of every property column.
+    def value_cache_counts(self):
+        return [(cache.hits, cache.misses, cache.disabled) for cache in self.value_caches]
+
+    # Add the counts of the value caches of a chunk encoded by a worker process.
+    def add_value_cache_counts(self, counts):
+        for cache, (hits, misses, disabled) in zip(self.value_caches, counts):
+            cache.hits += hits
+            cache.misses += misses
+            cache.disabled = cache.disabled or disabled
+
+    # Lookups and hits of the value cache of every property column that was looked up, by property name.
+    def value_cache_stats(self):
+        stats = {}
+        for (idx, convert), cache in zip(self.prop_converters, self.value_caches):
+            lookups = cache.hits + cache.misses
+            if lookups:
+                stats[self.column_names[idx]] = {'lookups': lookups, 'hits': cache.hits, 'disabled': cache.disabled}
+        return stats
+
+    # Print the hit rates of the value caches that remained in use.
+    def report_value_caches(self, description):
+        stats = self.value_cache_stats()
+        rates = ["%s %.1f%%" % (name, 100.0 * stat['hits'] / stat['lookups']) for name, stat in stats.items() if not stat['disabled']]
+        if rates:
+            print("Value cache hit rates for %s: %s" % (description, ", ".join(rates)))
 
+    # Convert a list of properties into a binary string
+    def pack_props(self, line):
+        # Use the binary already produced by the columnar or Parquet reader if available.
+        if self.block_encoded and line is self.reader.row and self.reader.binary is not None:
+            return self.reader.binary
+        return b''.join([convert(line[idx]) for idx, convert in self.prop_converters])
+
+    # Pack a list of properties onto the end of a token
+    def pack_props_into(self, token, line):
+        if self.block_encoded and line is self.reader.row and self.reader.binary is not None:
+            token += self.reader.binary
+            return
+        for idx, convert in self.prop_converters:
+            token += convert(line[idx])
+
+    # Return the token without copying it. Entities packed later are added to a copy.
     def to_binary(self):
-        return self.packed_header + b''.join(self.binary_entities)
+        self.token_exported = True
+        return memoryview(self.token)
@@ -0,0 +1,319 @@
+import os
+import sys
+import mmap
+import zlib
+import tempfile
+from array import array
+from exceptions import SchemaError
+
+# Maximum load factor of a compact table before it is resized.
+MAX_LOAD = 0.75
+# Key references pack the key's offset in the key arena above its length.
+KEY_LENGTH_BITS = 24
+KEY_LENGTH_MASK = (1 << KEY_LENGTH_BITS) - 1
+
+# Default memory budget of memory-mapped tables, in megabytes.
+DEFAULT_MEMORY_BUDGET = 256
+# Upper bound on the memory an insert or lookup maps in: it touches a page of each slot
+# array and of the key arena, and the kernel may map up to 64 KiB around each faulting page.
+BYTES_PER_OPERATION = 4 * 64 * 1024
+# Initial size of the key arena of a memory-mapped table.
+INITIAL_KEY_CAPACITY = 1 << 20
+
+
+class DictIdTable(dict):
+    """Identifier -> node ID table backed by a Python dict."""
+    def insert(self, identifier, node_id):
+        """Map identifier to node_id, returning True if the identifier was already present."""
+        present = identifier in self
+        self[identifier] = node_id
+        return present
+
+    def reserve(self, count):
+        pass
+
+    def nbytes(self):
+        # The dict itself plus the key and value objects it holds.
+        return (sys.getsizeof(self)
+                + sum(sys.getsizeof(key) for key in self)
+                + sum(sys.getsizeof(value) for value in self.values()))
+
+
+class CompactIdTable(object):
+    """Identifier -> node ID table using open addressing over typed arrays.
+
+    Each slot holds a 32-bit hash of the identifier, a reference to its UTF-8
+    encoding in a shared byte arena, and the 64-bit node ID, so an entry costs
+    about 20 bytes per slot plus the identifier's length rather than a
+    Python str and int object per node.
+    """
+    def __init__(self, capacity=1024):
+        self.count = 0
+        # Offset 0 is never used, so that a key reference of 0 marks an empty slot.
+        self.keys = bytearray(b'\0')
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.threshold = int(capacity * MAX_LOAD)
+        self.hashes = array('I', [0]) * capacity
+        self.refs = array('Q', [0]) * capacity
+        self.values = array('Q', [0]) * capacity
+
+    def __len__(self):
+        return self.count
+
+    def nbytes(self):
+        return (self.hashes.itemsize * self.capacity + self.refs.itemsize * self.capacity
+                + self.values.itemsize * self.capacity + len(self.keys))
+
+    def find(self, key, key_hash):
+        """Return the slot holding key, or the empty slot where it should be inserted."""
+        hashes = self.hashes
+        refs = self.refs
+        keys = self.keys
+        mask = self.mask
+        slot = key_hash & mask
+        while True:
+            ref = refs[slot]
+            if ref == 0:
+                return slot
+            if hashes[slot] == key_hash:
+                offset = ref >> KEY_LENGTH_BITS
+                if keys[offset:offset + (ref & KEY_LENGTH_MASK)] == key:
+                    return slot
+            slot = (slot + 1) & mask
+
+    def insert(self, identifier, node_id):
+        """Map identifier to node_id, returning True if the identifier was already present."""
+        key = identifier.encode()
+        key_hash = zlib.crc32(key)
+        slot = self.find(key, key_hash)
+        if self.refs[slot]:
+            self.values[slot] = node_id
+            return True
+
+        if len(key) > KEY_LENGTH_MASK:
+            raise SchemaError("Node identifier of %d bytes exceeds the maximum identifier length" % len(key))
+        self.refs[slot] = (self.store_key(key) << KEY_LENGTH_BITS) | len(key)
+        self.hashes[slot] = key_hash
+        self.values[slot] = node_id
+        self.count += 1
+        if self.count > self.threshold:
+            self.resize(self.capacity * 2)
+        return False
+
+    def store_key(self, key):
+        """Append key to the key arena and return its offset."""
+        offset = len(self.keys)
+        self.keys += key
+        return offset
+
+    def __getitem__(self, identifier):
+        key = identifier.encode()
+        slot = self.find(key, zlib.crc32(key))
+        if self.refs[slot] == 0:
+            raise KeyError(identifier)
+        return self.values[slot]
+
+    def reserve(self, count):
+        """Grow the table ahead of time to hold count entries without further resizing."""
+        capacity = self.capacity
+        while int(capacity * MAX_LOAD) < count:
+            capacity *= 2
+        if capacity != self.capacity:
+            self.resize(capacity)
+
+    def resize(self, capacity):
+        hashes = self.hashes
+        refs = self.refs
+        values = self.values
+        self.allocate(capacity)
+        new_hashes = self.hashes
+        new_refs = self.refs
+        new_values = self.values
+        mask = self.mask
+        # Entries are unique, so they can be placed in the first empty slot without comparing keys.
+        for old_slot, ref in enumerate(refs):
+            if ref == 0:
+                continue
+            key_hash = hashes[old_slot]
+            slot = key_hash & mask
+            while new_refs[slot]:
+                slot = (slot + 1) & mask
+            new_hashes[slot] = key_hash
+            new_refs[slot] = ref
+            new_values[slot] = values[old_slot]
+
+
+def mapped_resident_bytes():
+    """Return the file-backed memory resident in this process, or None if it cannot be determined."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[2]) * mmap.PAGESIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryBudget(object):
+    """Caps the resident memory of memory-mapped tables.
+
+    Table operations can only map in BYTES_PER_OPERATION each, so the resident
+    size is checked whenever enough operations have run to fill the budget.
+    If it is exceeded (or cannot be measured), the pages of all tables are
+    released back to the page cache; subsequent accesses fault them back in.
+    """
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+        self.interval = max(1, nbytes // BYTES_PER_OPERATION)
+        self.countdown = self.interval
+        self.tables = []
+
+    def touch(self, operations=1):
+        self.countdown -= operations
+        if self.countdown <= 0:
+            self.countdown = self.interval
+            resident = mapped_resident_bytes()
+            if resident is None or resident > self.nbytes:
+                self.release()
+
+    def release(self):
+        for table in self.tables:
+            table.release()
+
+
+def create_mapped_file(directory, size):
+    """Create a zero-filled file of the given size and map it into memory.
+
+    The file is unlinked immediately, so it is removed when the loader exits.
+    """
+    fd, path = tempfile.mkstemp(prefix='redisgraph-id-map-', dir=directory)
+    try:
+        os.ftruncate(fd, size)
+        mapping = mmap.mmap(fd, size)
+    finally:
+        os.close(fd)
+        os.unlink(path)
+    return mapping
+
+
+class MmapIdTable(CompactIdTable):
+    """Compact identifier table whose slot arrays and key arena live in memory-mapped files on disk.
+
+    Resident memory is bounded by a MemoryBudget shared by all tables of a map,
+    so the map can hold more identifiers than fit in RAM.
+    """
+    def __init__(self, directory=None, budget=None, capacity=1024):
+        self.directory = directory
+        self.budget = budget if budget is not None else MemoryBudget(DEFAULT_MEMORY_BUDGET * 1_000_000)
+        self.budget.tables.append(self)
+        self.slot_map = None
+        self.keys = create_mapped_file(directory, INITIAL_KEY_CAPACITY)
+        self.keys_end = 1 # Offset 0 is never used, so that a key reference of 0 marks an empty slot.
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        # Slots are laid out as consecutive hash, key reference, and node ID arrays.
+        self.slot_map = create_mapped_file(self.directory, capacity * 20)
+        slots = memoryview(self.slot_map)
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.threshold = int(capacity * MAX_LOAD)
+        self.hashes = slots[:capacity * 4].cast('I')
+        self.refs = slots[capacity * 4:capacity * 12].cast('Q')
+        self.values = slots[capacity * 12:].cast('Q')
+
+    def nbytes(self):
+        return len(self.slot_map) + len(self.keys)
+
+    def store_key(self, key):
+        offset = self.keys_end
+        end = offset + len(key)
+        if end > len(self.keys):
+            size = len(self.keys)
+            while size < end:
+                size *= 2
+            self.keys.resize(size)
+        self.keys[offset:end] = key
+        self.keys_end = end
+        return offset
+
+    def insert(self, identifier, node_id):
+        self.budget.touch()
+        return super(MmapIdTable, self).insert(identifier, node_id)
+
+    def __getitem__(self, identifier):
+        self.budget.touch()
+        return super(MmapIdTable, self).__getitem__(identifier)
+
+    def release(self):
+        """Drop this table's pages from the process; their contents remain in the mapped files."""
+        if hasattr(self.slot_map, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+            self.slot_map.madvise(mmap.MADV_DONTNEED)
+            self.keys.madvise(mmap.MADV_DONTNEED)
+
+    def resize(self, capacity):
+        old_map = self.slot_map
+        hashes = self.hashes
+        refs = self.refs
+        values = self.values
+        self.allocate(capacity)
+        new_hashes = self.hashes
+        new_refs = self.refs
+        new_values = self.values
+        mask = self.mask
+        for old_slot in range(len(refs)):
+            ref = refs[old_slot]
+            if ref == 0:
+                continue
+            key_hash = hashes[old_slot]
+            slot = key_hash & mask
+            while new_refs[slot]:
+                slot = (slot + 1) & mask
+            new_hashes[slot] = key_hash
+            new_refs[slot] = ref
+            new_values[slot] = values[old_slot]
+            # Moving an entry touches one page of each of the old and new slot arrays.
+            self.budget.touch(2)
+        for view in (hashes, refs, values):
+            view.release()
+        old_map.close()
+
+
+# Table implementations selectable with --id-map.
+ID_MAP_BACKENDS = {
+    'dict': DictIdTable,
+    'compact': CompactIdTable,
+    'mmap': MmapIdTable,
+}
+
+
+class IdMap(object):
+    """Map from node identifiers to node IDs, holding a separate table for each ID namespace."""
+    def __init__(self, backend='dict', directory=None, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.table_class = ID_MAP_BACKENDS[backend]
+        self.tables = {}
+        # Memory-mapped tables are created in the given directory and share one memory budget.
+        self.directory = directory
+        self.budget = MemoryBudget(memory_budget * 1_000_000)
+
+    def new_table(self):
+        if self.table_class is MmapIdTable:
+            return MmapIdTable(self.directory, self.budget)
+        return self.table_class()
+
+    def table(self, namespace):
+        """Return the table for the given namespace (None for identifiers without one)."""
+        try:
+            return self.tables[namespace]
+        except KeyError:
+            table = self.tables[namespace] = self.new_table()
+            return table
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def nbytes(self):
+        return sum(table.nbytes() for table in self.tables.values())
@@ -0,0 +1,116 @@
+import json
+import itertools
+from entity_file import Type, value_to_binary, typed_value_converter
+from exceptions import CSVError, SchemaError
+
+# orjson decodes records several times faster than the json module, and is used if it is installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Number of records read to find the fields of a file.
+FIELD_SAMPLE_SIZE = 1000
+
+# Fields whose values are stored or looked up as node identifiers.
+KEY_TYPES = (Type.ID_STRING, Type.ID_INTEGER, Type.START_ID, Type.END_ID)
+
+
+def decoder():
+    """Return the function that decodes a JSON record."""
+    return orjson.loads if orjson is not None else json.loads
+
+
+class JsonLinesReader(object):
+    """Reader of the records of a JSON Lines file, one JSON object per line.
+
+    The fields of the file are those found in its first FIELD_SAMPLE_SIZE
+    records, in the order they are first seen; read_header() records them as
+    the entity's `fields`, which later readers of the file use. A field has
+    the type given to it by --field-type, or else is UNKNOWN: its values are
+    encoded by their JSON type, so that numbers, booleans, strings, and lists
+    are not parsed again from text. Absent and null fields are NULL.
+
+    Rows are yielded as lists that hold only their identifier and endpoint
+    fields, as strings; after each row is yielded, `binary` holds its encoded
+    properties. line_num is one more than the number of the record's line,
+    as for a CSV file with a header.
+    """
+    def __init__(self, infile, entity, lines_before=0):
+        self.infile = infile
+        self.name = infile.name
+        self.entity = entity
+        self.pending = [] # Lines read to find the fields of the file, which are yielded first
+
+        self.line_num = lines_before + 1
+        self.row = None
+        self.binary = None
+        # Records never continue past the end of a line, so neither do they past a chunk.
+        self.split_record = False
+
+    def read_header(self):
+        """Find the fields of the file, returning its header."""
+        entity = self.entity
+        loads = decoder()
+        fields = {}
+        self.pending = list(itertools.islice(self.infile, FIELD_SAMPLE_SIZE))
+        for line_num, line in enumerate(self.pending, 1):
+            if line.strip():
+                fields.update(dict.fromkeys(self.decode(loads, line, line_num)))
+        entity.fields = list(fields)
+
+        header = []
+        for field in entity.fields:
+            if ':' in field:
+                raise SchemaError("%s: Field name '%s' contains a colon" % (self.name, field))
+            header.append(field + ':' + (entity.config.field_type(entity.entity_str, field) or 'UNKNOWN'))
+        return header
+
+    def restart(self):
+        """Read the file again from its first record, once it has been rewound."""
+        self.pending = []
+        self.line_num = 1
+
+    def decode(self, loads, line, line_num):
+        try:
+            record = loads(line)
+        except ValueError as e:
+            raise CSVError("%s:%d Could not decode JSON record: %s" % (self.name, line_num, str(e)))
+        if not isinstance(record, dict):
+            raise CSVError("%s:%d Expected a JSON object, encountered '%s'" % (self.name, line_num, line.strip()))
+        return record
+
+    def __iter__(self):
+        entity = self.entity
+        fields = entity.fields
+        known_fields = set(fields)
+        key_fields = [(idx, fields[idx]) for idx, col_type in enumerate(entity.types) if col_type in KEY_TYPES]
+        prop_fields = [(fields[idx], value_to_binary if entity.types[idx] == Type.UNKNOWN else typed_value_converter(entity.types[idx]))
+                       for idx, convert in entity.prop_converters]
+        column_count = entity.column_count
+        loads = decoder()
+
+        lines = itertools.chain(self.pending, self.infile)
+        self.pending = []
+        for line in lines:
+            self.line_num += 1
+            if not line.strip():
+                continue
+            record = self.decode(loads, line, self.line_num - 1)
+            if not record.keys() <= known_fields:
+                unknown = [field for field in record if field not in known_fields]
+                raise CSVError("%s:%d Encountered fields not found in the first %d records: %s"
+                               % (self.name, self.line_num - 1, FIELD_SAMPLE_SIZE, ", ".join(unknown)))
+
+            row = [None] * column_count
+            for idx, field in key_fields:
+                value = record.get(field)
+                # Identifiers are stored and looked up as strings, as they are read from CSV.
+                row[idx] = '' if value is None else value if isinstance(value, str) else str(value)
+            try:
+                binary = b''.join([convert(record.get(field)) for field, convert in prop_fields])
+            except SchemaError as e:
+                raise SchemaError("%s:%d %s" % (self.name, self.line_num - 1, str(e)))
+            self.row = row
+            self.binary = binary
+            yield row
@@ -1,8 +1,9 @@
 import re
+import csv
 import sys
-import click
 from entity_file import Type, EntityFile
-from exceptions import SchemaError
+from exceptions import CSVError, SchemaError
+from parallel import EncodedRows
 
 
 class Label(EntityFile):
@@ -44,50 +45,126 @@ class Label(EntityFile):
         if match:
             self.id_namespace = match.group(1)
 
-    def update_node_dictionary(self, identifier):
-        """Add identifier->ID pair to dictionary if we are building relations"""
-        if identifier in self.query_buffer.nodes:
+    def update_node_dictionary(self, identifier, line_num):
+        """Add identifier->ID pair to the namespace's table if we are building relations"""
+        if self.checkpoint is not None:
+            self.checkpoint.record_node(self.id_namespace, identifier, self.query_buffer.top_node_id)
+        if self.node_table.insert(identifier, self.query_buffer.top_node_id):
+            if self.id_namespace is not None:
+                identifier = self.id_namespace + '.' + identifier
             sys.stderr.write("Node identifier '%s' was used multiple times - second occurrence at %s:%d\n"
-                             % (identifier, self.infile.name, self.reader.line_num))
+                             % (identifier, self.infile.name, line_num))
             if self.config.skip_invalid_nodes is False:
                 sys.exit(1)
-        self.query_buffer.nodes[identifier] = self.query_buffer.top_node_id
         self.query_buffer.top_node_id += 1
 
-    def process_entities(self):
+    def pack_row(self, row):
+        try:
+            return self.pack_props(row)
+        except SchemaError as e:
+            # TODO why is line_num off by one?
+            raise SchemaError("%s:%d %s" % (self.infile.name, self.reader.line_num - 1, str(e)))
+
+    def pack_row_into(self, token, row):
+        start = len(token)
+        try:
+            self.pack_props_into(token, row)
+        except SchemaError as e:
+            del token[start:]
+            raise SchemaError("%s:%d %s" % (self.infile.name, self.reader.line_num - 1, str(e)))
+
+    def encode_rows(self):
+        """Validate and encode every row, returning them as EncodedRows. Used by parallel encoding workers."""
+        encoded = EncodedRows()
+        try:
+            for row in self.reader:
+                self.validate_row(row)
+                encoded.line_nums.append(self.reader.line_num)
+                if self.config.store_node_identifiers:
+                    encoded.identifiers.append(row[self.id])
+                encoded.binaries.append(self.pack_row(row))
+        except (CSVError, SchemaError, csv.Error) as e:
+            encoded.error = e
+        return encoded
+
+    def process_entities(self, chunks=None):
+        """Add all rows to the query buffer, encoding them here unless chunks encoded by worker processes are given."""
+        if self.config.store_node_identifiers:
+            self.node_table = self.query_buffer.nodes.table(self.id_namespace)
+            self.checkpoint = self.query_buffer.checkpoint
+            if self.entities_count is not None:
+                self.node_table.reserve(len(self.node_table) + self.entities_count)
+        if chunks is None:
+            entities_created = self.process_rows()
+        else:
+            entities_created = self.process_encoded_rows(chunks)
+        self.query_buffer.labels.append(self.to_binary())
+        self.infile.close()
+        print("%d nodes created with label '%s'" % (entities_created, self.entity_str))
+        self.report_value_caches("label '%s'" % self.entity_str)
+        return entities_created
+
+    def process_rows(self):
         entities_created = 0
-        with click.progressbar(self.reader, length=self.entities_count, label=self.entity_str, update_min_steps=100) as reader:
+        with self.progressbar() as reader:
             for row in reader:
                 self.validate_row(row)
 
-                # Update the node identifier dictionary if necessary
+                # Update the node identifier map if necessary
                 if self.config.store_node_identifiers:
-                    id_field = row[self.id]
-                    if self.id_namespace is not None:
-                        id_field = self.id_namespace + '.' + str(id_field)
-                    self.update_node_dictionary(id_field)
-
-                try:
-                    row_binary = self.pack_props(row)
-                except SchemaError as e:
-                    # TODO why is line_num off by one?
-                    raise SchemaError("%s:%d %s" % (self.infile.name, self.reader.line_num - 1, str(e)))
-                row_binary_len = len(row_binary)
-                # If the addition of this entity will make the binary token grow too large,
-                # send the buffer now.
-                # TODO how much of this can be made uniform w/ relations and moved to Querybuffer?
-                added_size = self.binary_size + row_binary_len
-                if added_size >= self.config.max_token_size or self.query_buffer.buffer_size + added_size >= self.config.max_buffer_size:
-                    self.query_buffer.labels.append(self.to_binary())
-                    self.query_buffer.send_buffer()
-                    self.reset_partial_binary()
-                    # Push the label onto the query buffer again, as there are more entities to process.
-                    self.query_buffer.labels.append(self.to_binary())
-
-                self.query_buffer.node_count += 1
+                    self.update_node_dictionary(row[self.id], self.reader.line_num)
+
+                # Pack the entity straight onto the binary token.
+                token = self.writable_token()
+                start = len(token)
+                self.pack_row_into(token, row)
+                self.commit_entity(start, self.reader.line_num)
                 entities_created += 1
-                self.binary_size += row_binary_len
-                self.binary_entities.append(row_binary)
+        return entities_created
+
+    def process_encoded_rows(self, chunks):
+        entities_created = 0
+        store_node_identifiers = self.config.store_node_identifiers
+        with self.chunk_progressbar() as bar:
+            for encoded in self.join_chunks(chunks):
+                for idx, row_binary in enumerate(encoded.binaries):
+                    if store_node_identifiers:
+                        self.update_node_dictionary(encoded.identifiers[idx], encoded.line_nums[idx])
+                    self.add_entity(row_binary, encoded.line_nums[idx])
+                entities_created += len(encoded)
+                bar.update(self.chunk_progress(encoded))
+                if encoded.error is not None:
+                    # A row whose properties could not be encoded still had its identifier stored.
+                    if store_node_identifiers and len(encoded.identifiers) > len(encoded):
+                        self.update_node_dictionary(encoded.identifiers[-1], encoded.line_nums[-1])
+                    raise encoded.error
+        return entities_created
+
+    def add_entity(self, row_binary, line_num):
+        token = self.writable_token()
+        start = len(token)
+        token += row_binary
+        self.commit_entity(start, line_num)
+
+    # Account for the entity packed onto the binary token from offset start, read from the row ending at line_num.
+    def commit_entity(self, start, line_num):
+        row_binary_len = len(self.token) - start
+        # If the addition of this entity will make the binary token grow too large,
+        # send the buffer now.
+        # TODO how much of this can be made uniform w/ relations and moved to Querybuffer?
+        added_size = self.binary_size + row_binary_len
+        if added_size >= self.config.max_token_size or self.query_buffer.buffer_size + added_size >= self.config.max_buffer_size:
+            # Move the entity out of the token being sent.
+            row_binary = bytes(self.token[start:])
+            del self.token[start:]
             self.query_buffer.labels.append(self.to_binary())
-        self.infile.close()
-        print("%d nodes created with label '%s'" % (entities_created, self.entity_str))
+            # A load resumed after this query continues from this entity's row.
+            self.query_buffer.send_buffer((self.index, line_num))
+            self.reset_partial_binary()
+            # Push the label onto the query buffer again, as there are more entities to process.
+            self.query_buffer.labels.append(self.to_binary())
+            self.writable_token().extend(row_binary)
+
+        self.query_buffer.node_count += 1
+        self.binary_size += row_binary_len
+        self.binary_count += 1
@@ -0,0 +1,231 @@
+import os
+import io
+import json
+import threading
+from timeit import default_timer as timer
+
+# Stages of a load, timed exclusively of one another on the loader's main thread.
+STAGES = (
+    'read',       # Parsing rows from CSV files
+    'validate',   # Checking rows against their file's header
+    'encode',     # Converting properties to their binary representation
+    'id_insert',  # Storing node identifiers
+    'id_lookup',  # Resolving relation endpoints
+    'assemble',   # Adding entities to tokens and queries
+    'send_wait',  # Waiting for room among the queries in flight, and for the last to be sent
+    'workers',    # Waiting for rows encoded by --workers processes
+    'index',      # Creating indices after the load
+)
+
+# Upper bounds in seconds of the buckets of the GRAPH.BULK latency histogram.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class TimedReader(object):
+    """Wraps a CSV reader to time the parsing of its rows. Other attributes are those of the wrapped reader."""
+    def __init__(self, reader, metrics):
+        self.reader = reader
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+    def __iter__(self):
+        return self.metrics.timed_iter(self.reader, 'read')
+
+
+class TimedTable(object):
+    """Wraps a table of the node identifier map to time lookups."""
+    def __init__(self, table, metrics):
+        self.table = table
+        self.lookup = metrics.timed('id_lookup', table.__getitem__)
+
+    def __getitem__(self, identifier):
+        return self.lookup(identifier)
+
+
+class Metrics(object):
+    """Records where the time of a load goes, and exports it as JSON or a Prometheus textfile.
+
+    Stage times are exclusive: time spent in a stage nested in another (such
+    as waiting to send a query while adding an entity) only counts towards
+    the inner stage. Entity files encoded in the main process are
+    instrumented; for files encoded by --workers, only the wait for their
+    rows is timed. Queries are sent on another thread, so the time spent on
+    GRAPH.BULK is reported alongside the stages rather than among them.
+    """
+    def __init__(self, path, graph, interval=0):
+        self.path = path
+        self.graph = graph
+        self.interval = interval
+        self.prometheus = path.endswith('.prom')
+
+        self.start_time = timer()
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.nested = 0.0   # Time spent in the stages nested in the one being timed
+        self.inputs = []    # Rows, bytes, and seconds of every input file processed
+        self.sender = None  # The BulkSender of the load, which records every query
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def timed(self, stage, function):
+        """Return function, timed as the given stage."""
+        stages = self.stages
+
+        def timed_function(*args, **kwargs):
+            outer = self.nested
+            self.nested = 0.0
+            start = timer()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = timer() - start
+                stages[stage] += elapsed - self.nested
+                self.nested = outer + elapsed
+        return timed_function
+
+    def timed_iter(self, iterable, stage):
+        """Yield the items of iterable, timing their retrieval as the given stage."""
+        items = iter(iterable)
+        advance = self.timed(stage, next)
+        while True:
+            try:
+                item = advance(items)
+            except StopIteration:
+                return
+            yield item
+
+    def attach(self, query_buffer):
+        """Record the queries of a load, timing the waits for them to be sent."""
+        self.sender = query_buffer.sender
+        query_buffer.send_buffer = self.timed('send_wait', query_buffer.send_buffer)
+        query_buffer.wait_sender = self.timed('send_wait', query_buffer.wait_sender)
+
+    def instrument(self, entity):
+        """Time the stages of processing an entity file in the main process."""
+        entity.reader = TimedReader(entity.reader, self)
+        entity.validate_row = self.timed('validate', entity.validate_row)
+        entity.pack_row_into = self.timed('encode', entity.pack_row_into)
+        entity.commit_entity = self.timed('assemble', entity.commit_entity)
+        if hasattr(entity, 'update_node_dictionary'):
+            entity.update_node_dictionary = self.timed('id_insert', entity.update_node_dictionary)
+        if hasattr(entity, 'endpoint_tables'):
+            endpoint_tables = entity.endpoint_tables
+            entity.endpoint_tables = lambda: tuple(TimedTable(table, self) for table in endpoint_tables())
+
+    def record_input(self, entity, rows, seconds):
+        self.inputs.append({
+            'kind': 'label' if hasattr(entity, 'update_node_dictionary') else 'reltype',
+            'name': entity.entity_str,
+            'file': entity.filename,
+            'rows': rows,
+            'bytes': entity.input_size(),
+            'seconds': seconds,
+            'value_cache': entity.value_cache_stats(),
+        })
+
+    def snapshot(self):
+        """Return the metrics recorded so far."""
+        inputs = [dict(record) for record in self.inputs]
+        for record in inputs:
+            record['rows_per_second'] = record['rows'] / record['seconds'] if record['seconds'] else 0.0
+            record['bytes_per_second'] = record['bytes'] / record['seconds'] if record['seconds'] else 0.0
+
+        sender = self.sender
+        latencies = list(sender.latencies) if sender is not None else []
+        buckets = [sum(1 for latency in latencies if latency <= bound) for bound in LATENCY_BUCKETS]
+        return {
+            'graph': self.graph,
+            'elapsed': timer() - self.start_time,
+            'stages': dict(self.stages),
+            'inputs': inputs,
+            'queries': {
+                'count': len(latencies),
+                'bytes': sender.bytes_sent if sender is not None else 0,
+                'nodes_created': sender.nodes_created if sender is not None else 0,
+                'relations_created': sender.relations_created if sender is not None else 0,
+                'graph_bulk_seconds': sender.send_time if sender is not None else 0.0,
+                'latency_histogram': {
+                    'buckets': [[bound, count] for bound, count in zip(LATENCY_BUCKETS, buckets)],
+                    'count': len(latencies),
+                    'sum': sum(latencies),
+                },
+            },
+        }
+
+    def export(self):
+        """Write the metrics recorded so far, replacing the file atomically so that it is never read half-written."""
+        snapshot = self.snapshot()
+        temp_path = self.path + '.tmp'
+        with io.open(temp_path, 'w') as out:
+            if self.prometheus:
+                out.write(to_prometheus(snapshot))
+            else:
+                json.dump(snapshot, out, indent=2)
+                out.write('\n')
+        os.replace(temp_path, self.path)
+
+    def start(self):
+        """Begin exporting the metrics every interval seconds, if an interval was given."""
+        if self.interval > 0:
+            self.thread = threading.Thread(target=self.run, name='metrics-exporter', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.export()
+
+    def stop(self):
+        """Stop exporting at intervals, and export the final metrics."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.export()
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(snapshot):
+    """Format a snapshot in the Prometheus text exposition format."""
+    graph = escape_label(snapshot['graph'])
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s %s' % (name, metric_type))
+        for labels, value in samples:
+            labels = ','.join(['graph="%s"' % graph] + ['%s="%s"' % (key, escape_label(val)) for key, val in labels])
+            lines.append('%s{%s} %s' % (name, labels, repr(float(value))))
+
+    queries = snapshot['queries']
+    metric('redisgraph_bulk_elapsed_seconds', 'gauge', 'Seconds since the load started.',
+           [([], snapshot['elapsed'])])
+    metric('redisgraph_bulk_stage_seconds', 'counter', 'Seconds the loader spent in each stage.',
+           [([('stage', stage)], seconds) for stage, seconds in snapshot['stages'].items()])
+    for field, help_text in (('rows', 'Rows loaded from each input file.'),
+                             ('bytes', 'Size in bytes of each input file.'),
+                             ('seconds', 'Seconds spent processing each input file.')):
+        metric('redisgraph_bulk_input_%s' % field, 'gauge', help_text,
+               [([('kind', record['kind']), ('name', record['name']), ('file', record['file'])], record[field])
+                for record in snapshot['inputs']])
+    for field, help_text in (('lookups', 'Fields of each property column looked up in its cache of encoded values.'),
+                             ('hits', 'Fields of each property column whose encoding was found in its cache.')):
+        metric('redisgraph_bulk_value_cache_%s' % field, 'counter', help_text,
+               [([('kind', record['kind']), ('name', record['name']), ('property', prop)], stat[field])
+                for record in snapshot['inputs'] for prop, stat in record['value_cache'].items()])
+    metric('redisgraph_bulk_entities_created', 'counter', 'Entities created by acknowledged queries.',
+           [([('kind', 'node')], queries['nodes_created']), ([('kind', 'relation')], queries['relations_created'])])
+    metric('redisgraph_bulk_query_bytes', 'counter', 'Bytes of entities in acknowledged queries.',
+           [([], queries['bytes'])])
+
+    histogram = queries['latency_histogram']
+    name = 'redisgraph_bulk_query_latency_seconds'
+    metric(name, 'histogram', 'Seconds from sending each GRAPH.BULK query to receiving its reply.', [])
+    for bound, count in histogram['buckets'] + [['+Inf', histogram['count']]]:
+        lines.append('%s_bucket{graph="%s",le="%s"} %d' % (name, graph, bound, count))
+    lines.append('%s_sum{graph="%s"} %s' % (name, graph, repr(float(histogram['sum']))))
+    lines.append('%s_count{graph="%s"} %d' % (name, graph, histogram['count']))
+    return '\n'.join(lines) + '\n'
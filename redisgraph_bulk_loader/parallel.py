@@ -0,0 +1,146 @@
+import dill # nosec B403 - workers only load the entities pickled by their parent process
+import itertools
+import collections
+import multiprocess
+from array import array
+from profiling import run_profiled
+
+# Node identifier map of the parent process, inherited by forked relation encoding workers.
+shared_id_map = None
+
+
+class EncodedRows(object):
+    """The rows of an input file as validated and encoded by a worker process, in file order.
+
+    If a row could not be encoded, `error` holds the exception it raised. Its line
+    number (and, for node files, its identifier) is still recorded when the
+    failure came from its properties, so that the parent process can handle
+    the row as far as a serial run would before raising the error.
+    """
+    def __init__(self):
+        self.binaries = []            # Encoded entity of every row
+        self.line_nums = array('L')   # Line number of every row, for error messages
+        self.identifiers = []         # Node identifier of every row, if identifiers are stored
+        self.messages = []            # Reports of skipped rows, to be printed by the parent process
+        self.error = None
+        self.chunk = None             # The (start, end, lines before start) range of the file encoded
+        self.split_record = False     # True if the chunk's last record continues past its end
+        self.value_cache = None       # Counts of the value caches of the file's columns, from a worker process
+
+    def __len__(self):
+        return len(self.binaries)
+
+    # Pickling a list of many small objects is slow, so each list is sent
+    # to the parent process as one joined buffer and the lengths of its items.
+    def __getstate__(self):
+        return {
+            'binaries': (b''.join(self.binaries), array('L', map(len, self.binaries))),
+            'identifiers': (''.join(self.identifiers), array('L', map(len, self.identifiers))),
+            'line_nums': self.line_nums,
+            'messages': self.messages,
+            'error': self.error,
+            'chunk': self.chunk,
+            'split_record': self.split_record,
+            'value_cache': self.value_cache,
+        }
+
+    def __setstate__(self, state):
+        self.binaries = split_joined(*state['binaries'])
+        self.identifiers = split_joined(*state['identifiers'])
+        self.line_nums = state['line_nums']
+        self.messages = state['messages']
+        self.error = state['error']
+        self.chunk = state['chunk']
+        self.split_record = state['split_record']
+        self.value_cache = state['value_cache']
+
+
+def split_joined(joined, lengths):
+    """Split a joined buffer into items of the given lengths."""
+    items = []
+    end = 0
+    for length in lengths:
+        start = end
+        end += length
+        items.append(joined[start:end])
+    return items
+
+
+def encode_chunk(entity, chunk):
+    """Encode a chunk of a pickled node file. Runs in a worker process."""
+    entity = dill.loads(entity) # nosec B301 - pickled by the parent process
+    encoded = entity.encode_chunk(chunk)
+    encoded.value_cache = entity.value_cache_counts()
+    return encoded
+
+
+def encode_relation_chunk(entity, chunk):
+    """Encode a chunk of a pickled relation file against the inherited identifier map. Runs in a worker process."""
+    entity = dill.loads(entity) # nosec B301 - pickled by the parent process
+    encoded = entity.encode_chunk(chunk, shared_id_map)
+    encoded.value_cache = entity.value_cache_counts()
+    return encoded
+
+
+class ParallelEncoder(object):
+    """Pool of worker processes that parse and encode chunks of entity files.
+
+    Chunks are encoded concurrently, but their results are consumed in file
+    order, so that entities are created and node IDs assigned exactly as in a
+    serial run. At most `window` chunks are submitted ahead of the one being
+    consumed, which bounds the memory held by encoded results.
+
+    If profile_path is given, every worker profiles its tasks into the file
+    given by the template, formatted with the worker's process ID.
+    """
+    def __init__(self, workers, id_map=None, profile_path=None):
+        global shared_id_map
+        self.window = 2 * workers
+        self.profile_path = profile_path
+        if id_map is None:
+            self.pool = multiprocess.Pool(workers)
+            self.worker = encode_chunk
+            return
+        # Workers that resolve relation endpoints are forked once all nodes have been processed,
+        # so they inherit the identifier map rather than receiving a pickled copy of it.
+        # The pages of compact and memory-mapped tables are shared with the parent process;
+        # Python dicts are gradually copied as their entries' reference counts change.
+        # The pool is created from the fork context itself, whatever the platform's default
+        # start method, as pathos only passes a context to its pools from version 0.3.1.
+        shared_id_map = id_map
+        self.pool = multiprocess.get_context('fork').Pool(workers)
+        self.worker = encode_relation_chunk
+
+    @staticmethod
+    def can_share_id_map():
+        """Return True if worker processes can inherit the node identifier map on this platform."""
+        return 'fork' in multiprocess.get_all_start_methods()
+
+    def encode(self, entities):
+        """For each entity in order, yield an iterator over the EncodedRows of its chunks.
+
+        Each iterator must be exhausted before the next one is used.
+        """
+        results = self.results(entities)
+        for entity in entities:
+            yield itertools.islice(results, len(entity.chunks))
+
+    def results(self, entities):
+        pending = collections.deque()
+        for entity in entities:
+            # Tasks are pickled by a background thread, so the entity is pickled here,
+            # before the parent process modifies it while merging its chunks.
+            pickled = dill.dumps(entity)
+            for chunk in entity.chunks:
+                if self.profile_path is None:
+                    pending.append(self.pool.apply_async(self.worker, (pickled, chunk)))
+                else:
+                    pending.append(self.pool.apply_async(run_profiled, (self.profile_path, self.worker, pickled, chunk)))
+                if len(pending) > self.window:
+                    yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
@@ -0,0 +1,240 @@
+from entity_file import Type, NULL_BINARY, STRING_PREFIX, typed_value_converter
+from columnar import FIXED_WIDTH_TYPES, np
+from exceptions import SchemaError
+
+# pyarrow is only required to read Parquet files.
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Number of rows read and encoded together.
+BATCH_SIZE = 16384
+
+# Key of the field metadata that gives a column its type, as in a CSV header (such as b'ID(User)').
+FIELD_TYPE_KEY = b'redisgraph.type'
+
+# Columns whose values are stored or looked up as node identifiers.
+KEY_TYPES = (Type.ID_STRING, Type.ID_INTEGER, Type.START_ID, Type.END_ID)
+
+
+def arrow_type_name(arrow_type):
+    """Return the name of the property type of an Arrow type, or None if it has no equivalent."""
+    types = pyarrow.types
+    if types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    if types.is_boolean(arrow_type):
+        return 'BOOL'
+    if types.is_integer(arrow_type):
+        return 'LONG'
+    if types.is_floating(arrow_type):
+        return 'DOUBLE'
+    if types.is_string(arrow_type) or types.is_large_string(arrow_type):
+        return 'STRING'
+    if types.is_list(arrow_type) or types.is_large_list(arrow_type) or types.is_fixed_size_list(arrow_type):
+        return 'ARRAY'
+    return None
+
+
+def casts_exactly(arrow_type, col_type):
+    """Return True if Arrow casts values of arrow_type to a property type as the per-cell path converts them.
+
+    The per-cell path converts the text of non-string values, so Arrow's casts of
+    booleans and floats to strings ('true', '1'), of floats to integers, and of
+    strings or numbers to booleans, all of which differ from it, are not used.
+    """
+    types = pyarrow.types
+    if col_type in (Type.STRING, Type.ID_STRING):
+        return types.is_string(arrow_type) or types.is_large_string(arrow_type) or types.is_integer(arrow_type)
+    if col_type == Type.DOUBLE:
+        return types.is_float32(arrow_type) or types.is_float64(arrow_type) or types.is_integer(arrow_type)
+    if col_type == Type.BOOL:
+        return types.is_boolean(arrow_type)
+    return types.is_integer(arrow_type)
+
+
+def cast_type(col_type):
+    """Return the Arrow type that the values of a fixed-width property type are cast to."""
+    if col_type == Type.DOUBLE:
+        return pyarrow.float64()
+    if col_type == Type.BOOL:
+        return pyarrow.bool_()
+    return pyarrow.int64()
+
+
+class ParquetReader(object):
+    """Reader of the rows of a Parquet file, encoding their properties a column at a time.
+
+    The header is made from the file's schema: each column has the type given
+    to it by --field-type, by the 'redisgraph.type' key of its metadata, or
+    else the type matching its Arrow type. Rows are yielded as lists that
+    hold only their identifier and endpoint fields, as strings; after each
+    row is yielded, `binary` holds its encoded properties. line_num is one
+    more than the number of the row, as for a CSV file with a header.
+
+    If start and end are given, only the row groups from start up to end
+    are read, and rows_before is the number of rows in the groups before.
+    """
+    def __init__(self, infile, entity, start=0, end=None, rows_before=0):
+        if pyarrow is None:
+            raise ImportError("Reading Parquet files requires pyarrow to be installed.")
+        self.name = infile.name
+        self.entity = entity
+        self.parquet = pyarrow.parquet.ParquetFile(infile)
+        self.row_count = self.parquet.metadata.num_rows
+        self.row_groups = range(start, end if end is not None else self.parquet.num_row_groups)
+
+        self.line_num = rows_before + 1
+        self.row = None
+        self.binary = None
+        # A chunk of row groups always ends with a complete row.
+        self.split_record = False
+
+    def read_header(self):
+        """Return the header of the file, made from its schema."""
+        entity = self.entity
+        header = []
+        for field in self.parquet.schema_arrow:
+            type_name = entity.config.field_type(entity.entity_str, field.name)
+            if type_name is None and field.metadata and FIELD_TYPE_KEY in field.metadata:
+                type_name = field.metadata[FIELD_TYPE_KEY].decode()
+            if type_name is None:
+                type_name = arrow_type_name(field.type)
+            if type_name is None:
+                raise SchemaError("%s: Column '%s' has Arrow type '%s', which has no property type; give it one with --field-type"
+                                  % (self.name, field.name, field.type))
+            if ':' in field.name:
+                raise SchemaError("%s: Column name '%s' contains a colon" % (self.name, field.name))
+            header.append(field.name + ':' + type_name)
+        return header
+
+    def split_row_groups(self, chunk_size):
+        """Split the row groups of the file into chunks of about chunk_size bytes for parallel workers.
+
+        Returns a list of (first row group, end row group, rows before) triples,
+        in which the last chunk has an end of None.
+        """
+        metadata = self.parquet.metadata
+        chunks = []
+        start = 0
+        rows_before = 0
+        size = 0
+        rows = 0
+        for group in range(metadata.num_row_groups):
+            size += metadata.row_group(group).total_byte_size
+            rows += metadata.row_group(group).num_rows
+            if size >= chunk_size:
+                chunks.append((start, group + 1, rows_before))
+                start = group + 1
+                rows_before += rows
+                size = 0
+                rows = 0
+        if chunks and start == metadata.num_row_groups:
+            # The last chunk ends with the file.
+            chunks[-1] = (chunks[-1][0], None, chunks[-1][2])
+        else:
+            chunks.append((start, None, rows_before))
+        return chunks
+
+    def __iter__(self):
+        entity = self.entity
+        names = self.parquet.schema_arrow.names
+        key_columns = [idx for idx, col_type in enumerate(entity.types) if col_type in KEY_TYPES]
+        prop_columns = [(idx, entity.types[idx]) for idx, convert in entity.prop_converters]
+        columns = [names[idx] for idx in sorted(set(key_columns).union(idx for idx, col_type in prop_columns))]
+        column_count = entity.column_count
+
+        for batch in self.parquet.iter_batches(batch_size=BATCH_SIZE, row_groups=self.row_groups, columns=columns or None):
+            binaries, errors = self.encode_batch(batch, names, prop_columns)
+            # Identifiers are stored and looked up as strings, as they are read from CSV.
+            keys = [(idx, batch.column(names[idx]).cast(pyarrow.string()).fill_null('').to_pylist()) for idx in key_columns]
+            for batch_row, binary in enumerate(binaries):
+                self.line_num += 1
+                if batch_row in errors:
+                    raise SchemaError("%s:%d %s" % (self.name, self.line_num - 1, str(errors[batch_row])))
+                row = [None] * column_count
+                for idx, values in keys:
+                    row[idx] = values[batch_row]
+                self.row = row
+                self.binary = binary
+                yield row
+
+    def encode_batch(self, batch, names, prop_columns):
+        """Return the encoded properties of every row of a batch, and the first error of each row that has one."""
+        errors = {}
+        encoded = []
+        for idx, col_type in prop_columns:
+            column = batch.column(names[idx])
+            values = self.encode_column(column, col_type)
+            if values is None:
+                values = self.encode_cells(column, col_type, errors)
+            encoded.append(values)
+        if not encoded:
+            return [b''] * batch.num_rows, errors
+        if len(encoded) > 1:
+            # Concatenate the encoded values of each row.
+            encoded = [pyarrow.compute.binary_join_element_wise(*encoded, b'')]
+        return encoded[0].to_pylist(), errors
+
+    def encode_column(self, column, col_type):
+        """Return the encoded values of a column as an Arrow binary array, or None if they must be encoded cell by cell."""
+        if pyarrow.types.is_dictionary(column.type):
+            column = column.dictionary_decode()
+        if not casts_exactly(column.type, col_type):
+            return None
+        try:
+            if col_type in (Type.STRING, Type.ID_STRING):
+                values = column.cast(pyarrow.string())
+                if not self.stored_as_is(values):
+                    return None
+                values = values.cast(pyarrow.binary())
+                encoded = pyarrow.compute.binary_join_element_wise(STRING_PREFIX, values, b'\x00', b'')
+            elif col_type in FIXED_WIDTH_TYPES and np is not None:
+                encoded = self.encode_fixed_width(column, col_type)
+            else:
+                return None
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError, ValueError):
+            # Values that cannot be converted are encoded (or rejected) one cell at a time.
+            return None
+        return encoded.fill_null(NULL_BINARY)
+
+    @staticmethod
+    def stored_as_is(strings):
+        """Return True if no string needs the per-cell path, which strips surrounding whitespace and stores empty strings as NULL."""
+        compute = pyarrow.compute
+        if compute.any(compute.equal(compute.utf8_length(strings), 0)).as_py():
+            return False
+        return not compute.any(compute.not_equal(compute.utf8_trim_whitespace(strings), strings)).as_py()
+
+    @staticmethod
+    def encode_fixed_width(column, col_type):
+        tag, value_format = FIXED_WIDTH_TYPES[col_type]
+        values = column.cast(cast_type(col_type))
+        values = values.fill_null(False if col_type == Type.BOOL else 0).to_numpy(zero_copy_only=False)
+        # Non-finite values are rejected by the per-cell path.
+        if col_type == Type.DOUBLE and not np.isfinite(values).all():
+            raise ValueError("non-finite value")
+        # Each value is packed after its type tag, as by struct's unaligned "=" formats.
+        records = np.empty(len(values), dtype=[('tag', 'u1'), ('value', value_format)])
+        records['tag'] = tag
+        records['value'] = values
+        width = records.dtype.itemsize
+        encoded = pyarrow.FixedSizeBinaryArray.from_buffers(pyarrow.binary(width), len(records), [None, pyarrow.py_buffer(records.tobytes())])
+        encoded = encoded.cast(pyarrow.binary())
+        if column.null_count:
+            encoded = pyarrow.compute.if_else(column.is_valid(), encoded, pyarrow.scalar(None, pyarrow.binary()))
+        return encoded
+
+    @staticmethod
+    def encode_cells(column, col_type, errors):
+        convert = typed_value_converter(col_type)
+        encoded = []
+        for batch_row, value in enumerate(column.to_pylist()):
+            try:
+                encoded.append(convert(value))
+            except SchemaError as e:
+                errors.setdefault(batch_row, e)
+                encoded.append(b'')
+        return pyarrow.array(encoded, pyarrow.binary())
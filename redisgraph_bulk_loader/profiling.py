@@ -0,0 +1,86 @@
+import os
+import sys
+import cProfile
+import contextlib
+
+# Before Python 3.12, a profiler only observes the thread that enabled it, so every thread can
+# have its own. Since then, a profiler observes every thread, and only one can be active at a time.
+PER_THREAD = sys.version_info < (3, 12)
+
+# Profile of the stage being run by a worker process, accumulated over the tasks it runs.
+worker_profile = None
+
+
+class Profiler(object):
+    """Profiles the stages of a run with cProfile, writing a STAGE.prof file per stage to a directory.
+
+    The main thread is profiled in the stage entered with stage(). Threads
+    started with a target from thread() are profiled in stages of their own,
+    and worker processes running tasks through run_profiled() write a
+    STAGE-worker-PID.prof file each. Profiles can be read with pstats or
+    tools such as snakeviz.
+
+    From Python 3.12, threads are instead profiled as part of the stage the
+    main thread is running at the time.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.profiles = {} # Profile of every stage, by name
+
+    def profile(self, name):
+        if name not in self.profiles:
+            self.profiles[name] = cProfile.Profile()
+        return self.profiles[name]
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Profile the main thread as the named stage. A stage may be entered more than once."""
+        profile = self.profile(name)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def thread(self, name, target):
+        """Return the target of a thread, profiled as the named stage."""
+        if not PER_THREAD:
+            return target
+        profile = self.profile(name)
+
+        def profiled_target(*args, **kwargs):
+            return profile.runcall(target, *args, **kwargs)
+        return profiled_target
+
+    def worker_path(self, name):
+        """Return the path template of the profiles of the worker processes of the named stage."""
+        return os.path.join(self.directory, '%s-worker-{pid}.prof' % name)
+
+    def dump(self):
+        """Write the profile of every stage, returning the paths written."""
+        paths = []
+        for name, profile in self.profiles.items():
+            path = os.path.join(self.directory, name + '.prof')
+            profile.dump_stats(path)
+            paths.append(path)
+        return paths
+
+
+def run_profiled(path, function, *args):
+    """Run function in a worker process, adding it to the profile of the process written to path."""
+    global worker_profile
+    if worker_profile is None:
+        worker_profile = cProfile.Profile()
+    try:
+        return worker_profile.runcall(function, *args)
+    finally:
+        # Workers are not notified when their pool closes, so the profile is written after every task.
+        worker_profile.dump_stats(path.format(pid=os.getpid()))
+
+
+def profile_stage(profiler, name):
+    """Return a context in which the main thread is profiled as the named stage, if a profiler is given."""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name)
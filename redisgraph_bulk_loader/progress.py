@@ -0,0 +1,47 @@
+import click
+
+# Number of rows between progress bar updates in byte-based progress reporting.
+PROGRESS_INTERVAL = 4096
+
+
+def stream_progressbar(rows, position, label):
+    """Progress bar over the rows of an input stream of unknown size, showing the rows and bytes read so far."""
+    return click.progressbar(rows, label=label, show_pos=True, update_min_steps=PROGRESS_INTERVAL,
+                             item_show_func=lambda row: "%.1f MB read" % (position() / 1_000_000))
+
+
+class ByteProgressBar(object):
+    """Progress bar over the rows of an input file, measured in bytes consumed.
+
+    Rows are yielded unchanged; every PROGRESS_INTERVAL rows the bar is advanced
+    to the current offset of the underlying file, so that sizing the bar does
+    not require reading the file in advance.
+    """
+    def __init__(self, rows, position, length, label):
+        self.rows = rows          # Iterable of rows
+        self.position = position  # Callable returning the number of bytes consumed so far
+        self.length = length      # Total size of the input in bytes
+        self.bar = click.progressbar(length=length, label=label)
+
+    def __enter__(self):
+        self.bar.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return self.bar.__exit__(exc_type, exc_value, tb)
+
+    def __iter__(self):
+        bar = self.bar
+        position = self.position
+        reported = 0
+        countdown = PROGRESS_INTERVAL
+        for row in self.rows:
+            countdown -= 1
+            if countdown == 0:
+                countdown = PROGRESS_INTERVAL
+                current = position()
+                bar.update(current - reported)
+                reported = current
+            yield row
+        # The input has been fully consumed.
+        bar.update(self.length - reported)
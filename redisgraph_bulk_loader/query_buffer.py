@@ -1,12 +1,9 @@
-from pathos.pools import ThreadPool as Pool
-
-def run(client, graphname, args):
-    result = client.execute_command("GRAPH.BULK", graphname, *args)
-    stats = result.split(', '.encode())
-    return stats
+from id_map import IdMap
+from resp import RespConnection
+from sender import BulkSender
 
 class QueryBuffer:
-    def __init__(self, graphname, client, config):
+    def __init__(self, graphname, client, config, connection=None, checkpoint=None, profiler=None):
         self.nodes = None
         self.top_node_id = 0
 
@@ -14,9 +11,9 @@ class QueryBuffer:
         self.client = client
         self.graphname = graphname
 
-        # Create a node dictionary if we're building relations and as such require unique identifiers
+        # Create a node identifier map if we're building relations and as such require unique identifiers
         if config.store_node_identifiers:
-            self.nodes = {}
+            self.nodes = IdMap(config.id_map, config.id_map_dir, config.id_map_memory)
         else:
             self.nodes = None
 
@@ -34,14 +31,33 @@ class QueryBuffer:
         self.labels = [] # List containing all pending Label objects
         self.reltypes = [] # List containing all pending RelationType objects
 
-        self.nodes_created = 0 # Total number of nodes created
-        self.relations_created = 0 # Total number of relations created
-
-        self.pool = Pool(nodes=1)
-        self.tasks = []
-
-    def send_buffer(self):
-        """Send all pending inserts to Redis"""
+        # Progress is saved to the checkpoint, if any, as each query is acknowledged.
+        self.checkpoint = checkpoint
+
+        # Queries are sent by a dedicated thread, with at most max_inflight_size bytes awaiting the server.
+        # Their tokens are written to a connection of the client's pool without being copied,
+        # unless another connection to write them to (such as a bundle file) is given.
+        self.connection = connection if connection is not None else RespConnection(client)
+        self.sender = BulkSender(self.connection, graphname, config.max_inflight_size,
+                                 self.save_checkpoint if checkpoint is not None else None, profiler)
+
+    def resume(self, entities):
+        """Restore the state of an interrupted load of entities from its checkpoint, returning the point to resume from."""
+        state = self.checkpoint.resume(entities, self.nodes)
+        # Node IDs are assigned in order of creation.
+        self.top_node_id = state['nodes_created']
+        self.sender.nodes_created = state['nodes_created']
+        self.sender.relations_created = state['relations_created']
+        # The graph was begun by the interrupted load.
+        self.initial_query = False
+        return state['resume_point']
+
+    def send_buffer(self, resume_point=None):
+        """Send all pending inserts to Redis.
+
+        resume_point is the (input index, line) from which a load resumed after
+        these inserts would continue.
+        """
         # Do nothing if we have no entities
         if self.node_count == 0 and self.relation_count == 0:
             return
@@ -52,8 +68,11 @@ class QueryBuffer:
             args.insert(0, "BEGIN")
             self.initial_query = False
 
-        task = self.pool.apipe(run, self.client, self.graphname, args)
-        self.add_task(task)
+        # The identifiers of all nodes sent must be journaled before the checkpoint is saved.
+        if self.checkpoint is not None:
+            self.checkpoint.sync()
+        self.sender.submit(args, sum(len(token) for token in self.labels) + sum(len(token) for token in self.reltypes),
+                           resume_point)
 
         self.clear_buffer()
 
@@ -67,23 +86,28 @@ class QueryBuffer:
         self.node_count = 0
         self.relation_count = 0
 
-    def add_task(self, task):
-        self.tasks.append(task)
-        if len(self.tasks) == 5:
-            task = self.tasks.pop(0)
-            stats = task.get()
-            self.update_stats(stats)
-
-    def wait_pool(self):
-        for task in self.tasks:
-            stats = task.get()
-            self.update_stats(stats)
-        self.tasks.clear()
+    def wait_sender(self):
+        """Wait until all queries have been sent"""
+        try:
+            self.sender.close()
+        finally:
+            self.connection.close()
 
-    def update_stats(self, stats):
-        self.nodes_created += int(stats[0].split(' '.encode())[0])
-        self.relations_created += int(stats[1].split(' '.encode())[0])
+    def save_checkpoint(self, resume_point):
+        self.checkpoint.save(resume_point, self.sender.nodes_created, self.sender.relations_created)
 
     def report_completion(self, runtime):
-        print("Construction of graph '%s' complete: %d nodes created, %d relations created in %f seconds"
-              % (self.graphname, self.nodes_created, self.relations_created, runtime))
+        self.sender.report_completion(runtime)
+
+    def report_compilation(self, bundle, runtime):
+        sender = self.sender
+        print("Compiled graph '%s' into bundle '%s': %d nodes and %d relations in %d queries (%d bytes) in %f seconds"
+              % (self.graphname, bundle, sender.nodes_created, sender.relations_created, sender.queries_sent, sender.bytes_sent, runtime))
+
+    def report_encoding(self, runtime):
+        sender = self.sender
+        print("Encoded graph '%s' without sending it: %d nodes and %d relations in %d queries (%d bytes) in %f seconds"
+              % (self.graphname, sender.nodes_created, sender.relations_created, sender.queries_sent, sender.bytes_sent, runtime))
+
+    def report_throughput(self, runtime):
+        self.sender.report_throughput(runtime)
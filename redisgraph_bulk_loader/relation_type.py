@@ -1,8 +1,9 @@
 import re
+import csv
 import struct
-import click
 from entity_file import Type, EntityFile
 from exceptions import CSVError, SchemaError
+from parallel import EncodedRows
 
 
 # Handler class for processing relation csv files.
@@ -45,47 +46,130 @@ class RelationType(EntityFile):
         if end_match:
             self.end_namespace = end_match.group(1)
 
-    def process_entities(self):
+    def pack_row(self, row, src, dest):
+        fmt = "=QQ" # 8-byte unsigned ints for src and dest
+        try:
+            return struct.pack(fmt, src, dest) + self.pack_props(row)
+        except SchemaError as e:
+            raise SchemaError("%s:%d %s" % (self.infile.name, self.reader.line_num, str(e)))
+
+    def pack_row_into(self, token, row, src, dest):
+        start = len(token)
+        token += struct.pack("=QQ", src, dest)
+        try:
+            self.pack_props_into(token, row)
+        except SchemaError as e:
+            del token[start:]
+            raise SchemaError("%s:%d %s" % (self.infile.name, self.reader.line_num, str(e)))
+
+    def invalid_endpoint_message(self, row):
+        return ("%s:%d Relationship specified a non-existent identifier. src: %s; dest: %s" %
+                (self.infile.name, self.reader.line_num - 1, row[self.start_id], row[self.end_id]))
+
+    def encode_rows(self, id_map):
+        """Validate and encode every row, returning them as EncodedRows. Used by parallel encoding workers.
+
+        Endpoints are resolved against id_map, the node identifier map inherited from the parent process.
+        """
+        encoded = EncodedRows()
+        start_nodes = id_map.table(self.start_namespace or None)
+        end_nodes = id_map.table(self.end_namespace or None)
+        try:
+            for row in self.reader:
+                self.validate_row(row)
+                try:
+                    src = start_nodes[row[self.start_id]]
+                    dest = end_nodes[row[self.end_id]]
+                except KeyError as e:
+                    encoded.messages.append(self.invalid_endpoint_message(row))
+                    if self.config.skip_invalid_edges is False:
+                        raise e
+                    continue
+                encoded.line_nums.append(self.reader.line_num)
+                encoded.binaries.append(self.pack_row(row, src, dest))
+        except (CSVError, SchemaError, KeyError, csv.Error) as e:
+            encoded.error = e
+        return encoded
+
+    def process_entities(self, chunks=None):
+        """Add all rows to the query buffer, encoding them here unless chunks encoded by worker processes are given."""
+        if chunks is None:
+            entities_created = self.process_rows()
+        else:
+            entities_created = self.process_encoded_rows(chunks)
+        self.query_buffer.reltypes.append(self.to_binary())
+        self.infile.close()
+        print("%d relations created for type '%s'" % (entities_created, self.entity_str))
+        self.report_value_caches("type '%s'" % self.entity_str)
+        return entities_created
+
+    # The identifier tables of the namespaces of the source and destination endpoints.
+    def endpoint_tables(self):
+        nodes = self.query_buffer.nodes
+        return nodes.table(self.start_namespace or None), nodes.table(self.end_namespace or None)
+
+    def process_rows(self):
         entities_created = 0
-        with click.progressbar(self.reader, length=self.entities_count, label=self.entity_str, update_min_steps=100) as reader:
+        # Endpoints are resolved against the identifier tables of their namespaces.
+        start_nodes, end_nodes = self.endpoint_tables()
+        with self.progressbar() as reader:
             for row in reader:
                 self.validate_row(row)
                 try:
-                    start_id = row[self.start_id]
-                    if self.start_namespace:
-                        start_id = self.start_namespace + '.' + str(start_id)
-                    end_id = row[self.end_id]
-                    if self.end_namespace:
-                        end_id = self.end_namespace + '.' + str(end_id)
-
-                    src = self.query_buffer.nodes[start_id]
-                    dest = self.query_buffer.nodes[end_id]
+                    src = start_nodes[row[self.start_id]]
+                    dest = end_nodes[row[self.end_id]]
                 except KeyError as e:
-                    print("%s:%d Relationship specified a non-existent identifier. src: %s; dest: %s" %
-                          (self.infile.name, self.reader.line_num - 1, row[self.start_id], row[self.end_id]))
+                    print(self.invalid_endpoint_message(row))
                     if self.config.skip_invalid_edges is False:
                         raise e
                     continue
-                fmt = "=QQ" # 8-byte unsigned ints for src and dest
-                try:
-                    row_binary = struct.pack(fmt, src, dest) + self.pack_props(row)
-                except SchemaError as e:
-                    raise SchemaError("%s:%d %s" % (self.infile.name, self.reader.line_num, str(e)))
-                row_binary_len = len(row_binary)
-                # If the addition of this entity will make the binary token grow too large,
-                # send the buffer now.
-                added_size = self.binary_size + row_binary_len
-                if added_size >= self.config.max_token_size or self.query_buffer.buffer_size + added_size >= self.config.max_buffer_size:
-                    self.query_buffer.reltypes.append(self.to_binary())
-                    self.query_buffer.send_buffer()
-                    self.reset_partial_binary()
-                    # Push the reltype onto the query buffer again, as there are more entities to process.
-                    self.query_buffer.reltypes.append(self.to_binary())
-
-                self.query_buffer.relation_count += 1
+                # Pack the entity straight onto the binary token.
+                token = self.writable_token()
+                start = len(token)
+                self.pack_row_into(token, row, src, dest)
+                self.commit_entity(start, self.reader.line_num)
                 entities_created += 1
-                self.binary_size += row_binary_len
-                self.binary_entities.append(row_binary)
+        return entities_created
+
+    def process_encoded_rows(self, chunks):
+        entities_created = 0
+        with self.chunk_progressbar() as bar:
+            for encoded in self.join_chunks(chunks, self.query_buffer.nodes):
+                # Rows with invalid endpoints were skipped by the worker, and are reported here.
+                for message in encoded.messages:
+                    print(message)
+                for row_binary, line_num in zip(encoded.binaries, encoded.line_nums):
+                    self.add_entity(row_binary, line_num)
+                entities_created += len(encoded)
+                bar.update(self.chunk_progress(encoded))
+                if encoded.error is not None:
+                    raise encoded.error
+        return entities_created
+
+    def add_entity(self, row_binary, line_num):
+        token = self.writable_token()
+        start = len(token)
+        token += row_binary
+        self.commit_entity(start, line_num)
+
+    # Account for the entity packed onto the binary token from offset start, read from the row ending at line_num.
+    def commit_entity(self, start, line_num):
+        row_binary_len = len(self.token) - start
+        # If the addition of this entity will make the binary token grow too large,
+        # send the buffer now.
+        added_size = self.binary_size + row_binary_len
+        if added_size >= self.config.max_token_size or self.query_buffer.buffer_size + added_size >= self.config.max_buffer_size:
+            # Move the entity out of the token being sent.
+            row_binary = bytes(self.token[start:])
+            del self.token[start:]
             self.query_buffer.reltypes.append(self.to_binary())
-        self.infile.close()
-        print("%d relations created for type '%s'" % (entities_created, self.entity_str))
+            # A load resumed after this query continues from this entity's row.
+            self.query_buffer.send_buffer((self.index, line_num))
+            self.reset_partial_binary()
+            # Push the reltype onto the query buffer again, as there are more entities to process.
+            self.query_buffer.reltypes.append(self.to_binary())
+            self.writable_token().extend(row_binary)
+
+        self.query_buffer.relation_count += 1
+        self.binary_size += row_binary_len
+        self.binary_count += 1
@@ -0,0 +1,119 @@
+import ssl
+import socket
+from redis.exceptions import ConnectionError
+
+# Most buffers passed to a single sendmsg call; POSIX systems accept at least 1024.
+MAX_IOV = 1024
+# Arguments up to this size are copied into the framing around them rather than sent as buffers of their own.
+SMALL_ARG_SIZE = 16 * 1024
+# Size requested for the send buffer of the connection's socket.
+SEND_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def encode_arg(arg):
+    """Return a command argument as a bytes-like object, leaving binary buffers uncopied."""
+    if isinstance(arg, (bytes, bytearray)):
+        return arg
+    if isinstance(arg, memoryview):
+        return arg.cast('B') if arg.format != 'B' or arg.ndim != 1 else arg
+    if isinstance(arg, str):
+        return arg.encode()
+    if isinstance(arg, int):
+        return str(arg).encode()
+    raise TypeError("Invalid command argument of type %s" % type(arg).__name__)
+
+
+def pack_command(args):
+    """Frame a command as a RESP array of bulk strings.
+
+    Returns the list of buffers to send: small arguments are copied into the
+    framing between them, while large ones are referenced as they are.
+    """
+    buffers = []
+    framing = bytearray(b'*%d\r\n' % len(args))
+    for arg in args:
+        arg = encode_arg(arg)
+        framing += b'$%d\r\n' % len(arg)
+        if len(arg) <= SMALL_ARG_SIZE:
+            framing += arg
+        else:
+            buffers.append(framing)
+            buffers.append(arg)
+            framing = bytearray()
+        framing += b'\r\n'
+    buffers.append(framing)
+    return buffers
+
+
+def send_buffers(sock, buffers):
+    """Write buffers to a socket with scatter/gather I/O, resuming after partial writes."""
+    buffers = [memoryview(buf) for buf in buffers]
+    first = 0
+    while first < len(buffers):
+        sent = sock.sendmsg(buffers[first:first + MAX_IOV])
+        # Skip the buffers written in full and trim the one written in part.
+        while first < len(buffers) and sent >= len(buffers[first]):
+            sent -= len(buffers[first])
+            first += 1
+        if sent:
+            buffers[first] = buffers[first][sent:]
+
+
+class RespConnection(object):
+    """Sends commands with large binary arguments to Redis without copying them.
+
+    The connection is taken from a redis-py client's pool, so it is opened with
+    the client's host, port or unix socket, credentials and TLS settings. Each
+    command is framed here and written with sendmsg, passing the arguments'
+    buffers to the kernel as they are. TLS sockets do not support sendmsg, so
+    their buffers are written one at a time instead. Replies are read with the
+    client's parser. The connection is opened on first use.
+    """
+    def __init__(self, client, send_buffer_size=SEND_BUFFER_SIZE):
+        self.client = client
+        self.send_buffer_size = send_buffer_size
+        self.connection = None
+        self.sock = None       # Socket last tuned, replaced whenever the connection is reopened
+        self.scatter = False   # True if the socket supports scatter/gather writes
+
+    def socket(self):
+        """Return the connection's socket, opening the connection if necessary."""
+        if self.connection is None:
+            self.connection = self.client.connection_pool.get_connection('GRAPH.BULK')
+        # redis-py connections are reopened lazily after an error.
+        if self.connection._sock is None:
+            self.connection.connect()
+        sock = self.connection._sock
+        if sock is not self.sock:
+            self.sock = sock
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+            except OSError:
+                pass
+            # TLS sockets encrypt what they are given in records of their own, and do not support sendmsg.
+            self.scatter = hasattr(sock, 'sendmsg') and not isinstance(sock, ssl.SSLSocket)
+        return sock
+
+    def execute_command(self, *args):
+        sock = self.socket()
+        buffers = pack_command(args)
+        try:
+            if self.scatter:
+                send_buffers(sock, buffers)
+            else:
+                for buf in buffers:
+                    sock.sendall(buf)
+        except OSError as e:
+            self.connection.disconnect()
+            raise ConnectionError("Error while writing to Redis: %s" % e)
+        except BaseException:
+            self.connection.disconnect()
+            raise
+        return self.connection.read_response()
+
+    def close(self):
+        """Return the connection to the client's pool."""
+        if self.connection is not None:
+            self.client.connection_pool.release(self.connection)
+            self.connection = None
+            self.sock = None
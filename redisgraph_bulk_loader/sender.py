@@ -0,0 +1,142 @@
+import threading
+import collections
+from timeit import default_timer as timer
+
+
+class BulkSender(object):
+    """Sends GRAPH.BULK queries to Redis from a dedicated thread.
+
+    Queries are sent one at a time in the order they are submitted, so the
+    first query, which carries the BEGIN token, always reaches the server
+    first, and no query is sent after one has failed.
+
+    Submitting a query blocks while the queries that have been submitted but
+    not yet acknowledged hold more than max_inflight bytes, bounding the
+    memory held by encoded data awaiting the network. A query larger than
+    the limit is accepted once all earlier queries have been sent.
+
+    If on_sent is given, it is called from the sender thread with the tag of
+    each query once the query has been acknowledged. If a profiler is given,
+    the sender thread is profiled as its 'sender' stage.
+    """
+    def __init__(self, client, graphname, max_inflight, on_sent=None, profiler=None):
+        self.client = client
+        self.graphname = graphname
+        self.max_inflight = max_inflight
+        self.on_sent = on_sent
+
+        self.condition = threading.Condition()
+        self.queue = collections.deque() # (args, size, tag) of every query not yet acknowledged
+        self.inflight = 0                # Bytes of the queries in the queue
+        self.closed = False
+        self.error = None                # Exception raised by a failed query
+
+        self.nodes_created = 0
+        self.relations_created = 0
+        self.queries_sent = 0
+        self.bytes_sent = 0
+        self.send_time = 0.0      # Seconds spent sending queries and awaiting their replies
+        self.encoder_stall = 0.0  # Seconds the loader waited for room in the queue
+        self.network_stall = 0.0  # Seconds the sender waited for a query to send
+        self.query_sizes = []     # (bytes, entities) of every query sent
+        self.latencies = []       # Seconds from sending every query to receiving its reply
+
+        target = self.run if profiler is None else profiler.thread('sender', self.run)
+        self.thread = threading.Thread(target=target, name='graph-bulk-sender', daemon=True)
+        self.thread.start()
+
+    def submit(self, args, size, tag=None):
+        """Queue the arguments of a GRAPH.BULK query holding size bytes of entities."""
+        with self.condition:
+            start = timer()
+            while self.error is None and self.queue and self.inflight + size > self.max_inflight:
+                self.condition.wait()
+            self.encoder_stall += timer() - start
+            self.raise_error()
+            self.queue.append((args, size, tag))
+            self.inflight += size
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                start = timer()
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                self.network_stall += timer() - start
+                args, size, tag = self.queue[0]
+
+            start = timer()
+            try:
+                result = self.client.execute_command("GRAPH.BULK", self.graphname, *args)
+                elapsed = timer() - start
+                # A reply that cannot be parsed fails the load as an error reply would.
+                stats = result.split(', '.encode())
+                nodes_created = int(stats[0].split(' '.encode())[0])
+                relations_created = int(stats[1].split(' '.encode())[0])
+            except Exception as e:
+                self.fail(e)
+                return
+
+            with self.condition:
+                self.nodes_created += nodes_created
+                self.relations_created += relations_created
+                self.query_sizes.append((size, nodes_created + relations_created))
+                self.queries_sent += 1
+                self.bytes_sent += size
+                self.send_time += elapsed
+                self.latencies.append(elapsed)
+                self.queue.popleft()
+                self.inflight -= size
+                self.condition.notify_all()
+
+            if self.on_sent is not None:
+                try:
+                    self.on_sent(tag)
+                except Exception as e:
+                    self.fail(e)
+                    return
+
+    def fail(self, error):
+        with self.condition:
+            # Later queries are dropped, as they would extend a graph whose construction failed.
+            self.error = error
+            self.queue.clear()
+            self.inflight = 0
+            self.condition.notify_all()
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """Wait for all submitted queries to be sent, raising the error of any query that failed."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.raise_error()
+
+    def report_completion(self, runtime):
+        print("Construction of graph '%s' complete: %d nodes created, %d relations created in %f seconds"
+              % (self.graphname, self.nodes_created, self.relations_created, runtime))
+        print("Sent %d queries (%d bytes) in %f seconds; waited %f seconds for queries to send and %f seconds for queries to encode"
+              % (self.queries_sent, self.bytes_sent, self.send_time, self.encoder_stall, self.network_stall))
+
+    def report_throughput(self, runtime):
+        entities = self.nodes_created + self.relations_created
+        print("Throughput: %d rows/s, %.2f MB/s" % (entities / runtime, self.bytes_sent / 1_000_000 / runtime))
+        if self.query_sizes:
+            print("Query sizes in bytes: %s" % distribution([size for size, _ in self.query_sizes]))
+            print("Query sizes in rows: %s" % distribution([rows for _, rows in self.query_sizes]))
+
+
+def distribution(values):
+    """Summarize values by their minimum, median, 90th percentile, and maximum."""
+    values = sorted(values)
+
+    def percentile(p):
+        return values[min(len(values) - 1, len(values) * p // 100)]
+    return "min %d, p50 %d, p90 %d, max %d" % (values[0], percentile(50), percentile(90), values[-1])
@@ -0,0 +1,55 @@
+import io
+import os
+import sys
+import stat
+
+# Path by which standard input is given as an input file. It may be followed by the
+# extensions of the input's format and compression, as in '-.jsonl.gz'.
+STDIN_PATH = '-'
+
+
+def is_stdin(filename):
+    """Return True if filename names standard input."""
+    return filename.split('.', 1)[0] == STDIN_PATH
+
+
+def is_stream(filename):
+    """Return True if filename is standard input, a named pipe, or another file that can only be read once, in order."""
+    if is_stdin(filename):
+        return True
+    try:
+        return not stat.S_ISREG(os.stat(filename).st_mode)
+    except OSError:
+        # Missing files are reported when they are opened.
+        return False
+
+
+class StreamFile(io.RawIOBase):
+    """Raw binary stream over standard input or a named pipe.
+
+    Streams cannot be sought, so the bytes read are counted instead, and
+    reported by tell() to measure progress through the stream.
+    """
+    def __init__(self, filename):
+        if is_stdin(filename):
+            self.name = '<stdin>'
+            self.file = io.open(sys.stdin.fileno(), 'rb', buffering=0, closefd=False)
+        else:
+            self.name = filename
+            self.file = io.open(filename, 'rb', buffering=0)
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        read = self.file.readinto(buf)
+        self.position += read
+        return read
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        self.file.close()
+        super(StreamFile, self).close()
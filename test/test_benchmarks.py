@@ -0,0 +1,48 @@
+import os
+import sys
+import redis
+import tempfile
+import unittest
+from click.testing import CliRunner
+from redisgraph_bulk_loader.bulk_insert import bulk_insert
+
+# The benchmark scripts are not part of the package, and import each other as top-level modules.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+from generate_graph import GraphSpec  # noqa: E402
+from mock_graph_server import start_server  # noqa: E402
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test01_mock_server_load(self):
+        """Verify that a generated graph loaded into the mock server is decoded into the entities generated."""
+        server = start_server()
+        host, port = server.server_address
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                spec = GraphSpec(500, 2000, labels=2, types=3, node_columns=('string', 'int', 'array'),
+                                 relation_columns=('double', 'bool'), schema=True, namespaces=True)
+                node_paths, relation_paths = spec.write(directory)
+                args = ['--host', host, '--port', port, '--enforce-schema', '--max-token-count', 100]
+                for path in node_paths:
+                    args += ['--nodes', path]
+                for path in relation_paths:
+                    args += ['--relations', path]
+                runner = CliRunner()
+                res = runner.invoke(bulk_insert, args + ['graph'], catch_exceptions=False)
+                self.assertEqual(res.exit_code, 0, res.output)
+                self.assertIn('500 nodes created, 2000 relations created', res.output)
+                stats = server.stats()
+                self.assertEqual(stats['graphs'], {'graph': {'nodes': 500, 'relations': 2000}})
+                self.assertGreater(len(stats['queries']), 1)
+
+                # The server reports the graph as existing, so it cannot be loaded again.
+                res = runner.invoke(bulk_insert, args + ['graph'])
+                self.assertEqual(res.exit_code, 1)
+                self.assertIn('already exists', res.output)
+
+            client = redis.Redis(host=host, port=port)
+            client.flushall()
+            self.assertEqual(server.stats(), {'graphs': {}, 'queries': []})
+        finally:
+            server.shutdown()
+            server.server_close()
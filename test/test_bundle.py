@@ -0,0 +1,98 @@
+import os
+import csv
+import tempfile
+import unittest
+from click.testing import CliRunner
+from redisgraph_bulk_loader.bulk_insert import bulk_insert
+from redisgraph_bulk_loader.bundle import BundleWriter, read_bundle
+
+
+class TestBundle(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.bundle = os.path.join(self.directory.name, 'graph.bundle')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test01_round_trip(self):
+        """Verify that queries written to a bundle are read back unchanged, and replied to as RedisGraph would."""
+        writer = BundleWriter(self.bundle)
+        token = memoryview(bytearray(b'\x01\x02' * 1000))
+        self.assertEqual(writer.execute_command("GRAPH.BULK", "graph", "BEGIN", 3, 0, 1, 0, token),
+                         b'3 nodes created, 0 relations created')
+        self.assertEqual(writer.execute_command("GRAPH.BULK", "graph", 0, 2, 0, 1, b'edges'),
+                         b'0 nodes created, 2 relations created')
+        writer.close()
+
+        # The command and graph name are not stored, so bundles can be replayed under any name.
+        self.assertEqual(list(read_bundle(self.bundle)), [
+            [b'BEGIN', b'3', b'0', b'1', b'0', bytes(token)],
+            [b'0', b'2', b'0', b'1', b'edges'],
+        ])
+
+    def test02_invalid_bundles(self):
+        """Verify that files which are not bundles, or are truncated, are rejected."""
+        with open(self.bundle, 'wb') as bundle:
+            bundle.write(b'id,name\n')
+        with self.assertRaises(Exception) as context:
+            list(read_bundle(self.bundle))
+        self.assertIn("is not a bulk loader bundle", str(context.exception))
+
+        writer = BundleWriter(self.bundle)
+        writer.execute_command("GRAPH.BULK", "graph", "BEGIN", 1, 0, 1, 0, b'node')
+        writer.close()
+        with open(self.bundle, 'r+b') as bundle:
+            bundle.truncate(os.path.getsize(self.bundle) - 1)
+        with self.assertRaises(Exception) as context:
+            list(read_bundle(self.bundle))
+        self.assertIn("is truncated", str(context.exception))
+
+    def test03_compile(self):
+        """Verify that the loader compiles a graph into a bundle without connecting to Redis."""
+        nodes = os.path.join(self.directory.name, 'Person.csv')
+        relations = os.path.join(self.directory.name, 'KNOWS.csv')
+        with open(nodes, mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['name', 'age'])
+            for i in range(10):
+                out.writerow(['person%d' % i, i])
+        with open(relations, mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['src', 'dest'])
+            for i in range(9):
+                out.writerow(['person%d' % i, 'person%d' % (i + 1)])
+
+        # The port is not served, so any attempt to reach Redis would fail.
+        runner = CliRunner()
+        res = runner.invoke(bulk_insert, ['--port', '1', '--nodes', nodes, '--relations', relations,
+                                          '--max-token-count', 1, '--compile', self.bundle, 'graph'])
+        self.assertEqual(res.exit_code, 0, res.output)
+        self.assertIn("10 nodes and 9 relations in 2 queries", res.output)
+
+        queries = list(read_bundle(self.bundle))
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(queries[0][:5], [b'BEGIN', b'10', b'0', b'1', b'0'])
+        self.assertEqual(queries[1][:4], [b'0', b'9', b'0', b'1'])
+
+    def test04_null_sink(self):
+        """Verify that the null sink runs a load without Redis and reports its throughput."""
+        nodes = os.path.join(self.directory.name, 'Person.csv')
+        with open(nodes, mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['name', 'age'])
+            for i in range(10):
+                out.writerow(['person%d' % i, i])
+
+        runner = CliRunner()
+        res = runner.invoke(bulk_insert, ['--port', '1', '--nodes', nodes, '--max-token-count', 1,
+                                          '--sink', 'null', 'graph'])
+        self.assertEqual(res.exit_code, 0, res.output)
+        self.assertIn("10 nodes and 0 relations in 1 queries", res.output)
+        self.assertIn("rows/s", res.output)
+        self.assertIn("Query sizes in rows: min 10, p50 10, p90 10, max 10", res.output)
+
+        # A file sink needs the path of its bundle.
+        res = runner.invoke(bulk_insert, ['--port', '1', '--nodes', nodes, '--sink', 'file', 'graph'])
+        self.assertNotEqual(res.exit_code, 0)
+        self.assertIn("requires the path of the bundle", str(res.exception))
@@ -0,0 +1,81 @@
+import os
+import csv
+import json
+import tempfile
+import unittest
+from redisgraph_bulk_loader.config import Config
+from redisgraph_bulk_loader.label import Label
+from redisgraph_bulk_loader.id_map import IdMap
+from redisgraph_bulk_loader.checkpoint import Checkpoint
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.nodes = os.path.join(self.directory.name, 'Person.csv')
+        with open(self.nodes, mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':ID(Person)', 'bio:STRING'])
+            for i in range(6):
+                # Every other row spans two lines.
+                out.writerow(['p%d' % i, 'line one\nline two' if i % 2 else 'short'])
+        self.path = os.path.join(self.directory.name, 'load.checkpoint')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test01_resume(self):
+        """Verify that a resumed load restores the identifiers of the nodes that were created."""
+        config = Config(enforce_schema=True, store_node_identifiers=True)
+        entities = [Label(None, self.nodes, None, config)]
+        checkpoint = Checkpoint(self.path, 'graph')
+        checkpoint.start(entities)
+        for node_id in range(4):
+            checkpoint.record_node('Person', 'p%d' % node_id, node_id)
+        checkpoint.record_node(None, 'other', 4)
+        checkpoint.sync()
+        # Only the first query, holding three nodes, was acknowledged.
+        checkpoint.save((0, 7), 3, 0)
+        checkpoint.journal.close()
+        with open(self.path) as saved:
+            self.assertEqual(json.load(saved)['resume_point'], [0, 7])
+
+        resumed = Checkpoint(self.path, 'graph')
+        id_map = IdMap('compact')
+        state = resumed.resume(entities, id_map)
+        self.assertEqual(state['nodes_created'], 3)
+        self.assertEqual(len(id_map), 3)
+        self.assertEqual(id_map.table('Person')['p2'], 2)
+        # Identifiers of nodes that were not created are dropped, and new ones are appended.
+        resumed.record_node('Person', 'p3', 3)
+        resumed.sync()
+        self.assertEqual(os.path.getsize(resumed.journal_path), 4 * (14 + len('Person') + len('p0')))
+
+        resumed.remove()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(resumed.journal_path))
+
+    def test02_inputs_changed(self):
+        """Verify that a checkpoint cannot be resumed with other input files."""
+        config = Config(enforce_schema=True)
+        checkpoint = Checkpoint(self.path, 'graph')
+        checkpoint.start([Label(None, self.nodes, None, config)])
+        checkpoint.save((1, 0), 6, 0)
+        checkpoint.journal.close()
+        with self.assertRaises(Exception) as context:
+            Checkpoint(self.path, 'graph').resume([Label(None, self.nodes, 'Renamed', config)], None)
+        self.assertIn("was written by a load of other inputs", str(context.exception))
+
+    def test03_skip_sent_rows(self):
+        """Verify that a resumed file continues from the row ending at the checkpoint's line."""
+        config = Config(enforce_schema=True, quoting=csv.QUOTE_MINIMAL)
+        label = Label(None, self.nodes, None, config)
+        line_nums = {}
+        for row in label.reader:
+            line_nums[row[0]] = label.reader.line_num
+        label.infile.close()
+
+        label = Label(None, self.nodes, None, config)
+        label.skip_to_line(line_nums['p3'])
+        self.assertEqual([row[0] for row in label.reader], ['p3', 'p4', 'p5'])
+        label.infile.close()
@@ -0,0 +1,73 @@
+import os
+import csv
+import unittest
+from redisgraph_bulk_loader.config import Config
+from redisgraph_bulk_loader.label import Label
+from redisgraph_bulk_loader.chunks import split_file, FileRange, ChunkReader
+from redisgraph_bulk_loader.parallel import ParallelEncoder
+
+
+class TestChunks(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        """Delete temporary files"""
+        os.remove('/tmp/chunks.tmp')
+
+    def test01_split_file(self):
+        """Verify that chunks end at newlines and record the lines preceding them."""
+        with open('/tmp/chunks.tmp', mode='w') as outfile:
+            outfile.write(''.join('line %d\n' % i for i in range(1000)) + 'last')
+        with open('/tmp/chunks.tmp', mode='rb') as infile:
+            contents = infile.read()
+
+        chunks, lines = split_file('/tmp/chunks.tmp', 100)
+        self.assertEqual(lines, 1001)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertIsNone(chunks[-1][1])
+        for (start, end, lines_before), following in zip(chunks, chunks[1:]):
+            self.assertEqual(contents[end - 1:end], b'\n')
+            self.assertGreaterEqual(end - start, 100)
+            self.assertEqual(following[0], end)
+            self.assertEqual(following[2], lines_before + contents[start:end].count(b'\n'))
+
+    def test02_split_record(self):
+        """Verify that a record continuing past the end of a chunk is detected."""
+        with open('/tmp/chunks.tmp', mode='w') as outfile:
+            outfile.write('a,b\nc,"d\ne"\nf,g\n')
+
+        reader = ChunkReader(open('/tmp/chunks.tmp'), 0)
+        self.assertEqual(list(reader), [['a', 'b'], ['c', 'd\ne'], ['f', 'g']])
+        self.assertFalse(reader.split_record)
+
+        # The chunk ends within the quoted field of the second record.
+        with FileRange('/tmp/chunks.tmp', 0, 10) as infile:
+            reader = ChunkReader(infile.read().decode().splitlines(True), 0)
+            self.assertEqual(next(reader), ['a', 'b'])
+            self.assertFalse(reader.split_record)
+            next(reader)
+            self.assertTrue(reader.split_record)
+
+    def test03_quoted_newlines(self):
+        """Verify that files with quoted newlines are encoded as in a serial run, whatever the chunk size."""
+        with open('/tmp/chunks.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['id:ID', 'text:STRING'])
+            for i in range(2000):
+                out.writerow([i, 'multi\nline %d' % i if i % 5 == 0 else 'text %d' % i])
+
+        config = Config(enforce_schema=True, store_node_identifiers=True, quoting=csv.QUOTE_MINIMAL)
+        label = Label(None, '/tmp/chunks.tmp', 'L', config)
+        expected = [(label.pack_props(row), label.reader.line_num) for row in label.reader]
+
+        for chunk_size in (0.0001, 0.001, 0.01):
+            config = Config(enforce_schema=True, store_node_identifiers=True, quoting=csv.QUOTE_MINIMAL, workers=2, chunk_size=chunk_size)
+            label = Label(None, '/tmp/chunks.tmp', 'L', config)
+            self.assertEqual(label.entities_count, 2400)
+            encoder = ParallelEncoder(2)
+            try:
+                encoded = list(label.join_chunks(next(encoder.encode([label]))))
+            finally:
+                encoder.close()
+            rows = [row for chunk in encoded for row in zip(chunk.binaries, chunk.line_nums)]
+            self.assertEqual(rows, expected)
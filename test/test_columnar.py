@@ -0,0 +1,99 @@
+import os
+import csv
+import unittest
+from redisgraph_bulk_loader.config import Config
+from redisgraph_bulk_loader.label import Label
+from redisgraph_bulk_loader.entity_file import VALUE_CACHE_SIZE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def encode_rows(label):
+    """Pack the properties of every row the label's reader yields."""
+    return [label.pack_props(row) for row in label.reader]
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestColumnar(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        """Delete temporary files"""
+        os.remove('/tmp/columnar.tmp')
+
+    def write_rows(self, header, rows):
+        with open('/tmp/columnar.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file, delimiter='|')
+            out.writerow(header)
+            for row in rows:
+                out.writerow(row)
+
+    def test01_matches_per_cell_encoding(self):
+        """Verify that columnar encoding produces the same binary as the per-cell path."""
+        header = ['id:ID', 'count:LONG', 'score:DOUBLE', 'flag:BOOL', 'name:STRING', 'skip:IGNORE', 'tags:ARRAY', 'rank:INT']
+        rows = []
+        for i in range(10000):
+            rows.append([i, i * 7 - 5000, i / 3.0, 'True' if i % 2 else ' false', 'name%d' % i, 'x', "['a', %d]" % i, -i])
+        # Include NULL fields, which fall back to the per-cell path.
+        rows.append([10000, '', '', '', 'last', 'x', '[]', ''])
+        self.write_rows(header, rows)
+
+        config = Config(enforce_schema=True, separator='|')
+        expected = encode_rows(Label(None, '/tmp/columnar.tmp', 'L', config))
+
+        config = Config(enforce_schema=True, separator='|', columnar=True)
+        label = Label(None, '/tmp/columnar.tmp', 'L', config)
+        self.assertEqual(encode_rows(label), expected)
+        self.assertEqual(len(expected), 10001)
+
+    def test02_line_numbers(self):
+        """Verify that the reader reports the line of the row being processed."""
+        self.write_rows(['id:ID', 'count:LONG'], [[i, i] for i in range(5000)])
+        config = Config(enforce_schema=True, separator='|')
+        label = Label(None, '/tmp/columnar.tmp', 'L', config)
+        expected = [label.reader.line_num for row in label.reader]
+
+        config = Config(enforce_schema=True, separator='|', columnar=True)
+        label = Label(None, '/tmp/columnar.tmp', 'L', config)
+        self.assertEqual([label.reader.line_num for row in label.reader], expected)
+
+    def test03_invalid_field(self):
+        """Verify that invalid fields raise the same error as the per-cell path."""
+        self.write_rows(['id:ID', 'count:LONG'], [[0, 1], [1, 'strval'], [2, 3]])
+        config = Config(enforce_schema=True, separator='|', columnar=True)
+        label = Label(None, '/tmp/columnar.tmp', 'L', config)
+        with self.assertRaises(Exception) as e:
+            encode_rows(label)
+        self.assertIn("Could not parse 'strval' as a long", str(e.exception))
+
+    def test04_value_caches(self):
+        """Verify that columnar blocks are encoded by the current converters of cached columns."""
+        header = ['id:ID', 'status:STRING', 'name:STRING', 'count:LONG']
+        rows = [[i, ['new', 'open', 'closed'][i % 3], 'name%d' % i, i % 5 if i % 1000 else ''] for i in range(10000)]
+        self.write_rows(header, rows)
+
+        config = Config(enforce_schema=True, separator='|')
+        serial = Label(None, '/tmp/columnar.tmp', 'L', config)
+        expected = encode_rows(serial)
+
+        config = Config(enforce_schema=True, separator='|', columnar=True)
+        label = Label(None, '/tmp/columnar.tmp', 'L', config)
+        self.assertEqual(encode_rows(label), expected)
+        # Blocks with NULL fields are encoded one cell at a time, through the column's cache.
+        stats = label.value_cache_stats()
+        serial_stats = serial.value_cache_stats()
+        self.assertEqual((stats['status'], stats['count']), (serial_stats['status'], serial_stats['count']))
+        # The cache of the column of distinct names was replaced by its converter, and not refilled by the rest of its block.
+        name = label.value_caches[2]
+        self.assertTrue(name.disabled)
+        self.assertEqual(name.values, {})
+        self.assertIs(label.prop_converters[2][1], name.convert)
+        self.assertGreater(stats['name']['lookups'], VALUE_CACHE_SIZE)
+
+    def test05_requires_schema(self):
+        """Verify that the columnar mode cannot be used without an enforced schema."""
+        with self.assertRaises(Exception) as e:
+            Config(columnar=True)
+        self.assertIn("requires --enforce-schema", str(e.exception))
@@ -0,0 +1,74 @@
+import os
+import bz2
+import csv
+import gzip
+import lzma
+import tempfile
+import unittest
+from redisgraph_bulk_loader.config import Config
+from redisgraph_bulk_loader.label import Label
+from redisgraph_bulk_loader.compression import DecompressedFile, zstandard
+
+COMPRESSORS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, extension, rows):
+        path = os.path.join(self.directory.name, 'Person.csv' + extension)
+        with COMPRESSORS[extension](path, 'wt') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['name', 'age'])
+            for i in range(rows):
+                out.writerow(['person%d' % i, i])
+        return path
+
+    def test01_read_compressed(self):
+        """Verify that compressed node files are read as their decompressed contents."""
+        config = Config(store_node_identifiers=True)
+        for extension in COMPRESSORS:
+            path = self.write(extension, 5000)
+            label = Label(None, path, None, config)
+            self.assertEqual(label.entity_str, 'Person')
+            # Compressed files are not counted in advance.
+            self.assertIsNone(label.entities_count)
+            rows = list(label.reader)
+            label.infile.close()
+            self.assertEqual(len(rows), 5000)
+            self.assertEqual(rows[-1], ['person4999', '4999'])
+
+    def test02_decompressed_file(self):
+        """Verify that the decompressed stream reports its compressed position and the errors of corrupt files."""
+        path = self.write('.gz', 200000)
+        decompressed = DecompressedFile(path)
+        data = decompressed.read()
+        self.assertTrue(data.startswith(b'name,age'))
+        self.assertEqual(decompressed.compressed_position(), os.path.getsize(path))
+        self.assertEqual(decompressed.read(), b'')
+        decompressed.close()
+
+        with open(path, 'rb') as compressed:
+            truncated = compressed.read(os.path.getsize(path) // 2)
+        with open(path, 'wb') as compressed:
+            compressed.write(truncated)
+        decompressed = DecompressedFile(path)
+        with self.assertRaises(EOFError):
+            decompressed.read()
+        decompressed.close()
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test03_zstandard(self):
+        """Verify that Zstandard-compressed files of several frames are read in full."""
+        path = os.path.join(self.directory.name, 'Person.csv.zst')
+        compressor = zstandard.ZstdCompressor()
+        with open(path, 'wb') as compressed:
+            compressed.write(compressor.compress(b'name,age\nalice,1\n'))
+            compressed.write(compressor.compress(b'bob,2\n'))
+        decompressed = DecompressedFile(path)
+        self.assertEqual(decompressed.read(), b'name,age\nalice,1\nbob,2\n')
+        decompressed.close()
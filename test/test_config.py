@@ -16,6 +16,8 @@ class TestBulkLoader(unittest.TestCase):
         self.assertEqual(config.store_node_identifiers, False)
         self.assertEqual(config.separator, ',')
         self.assertEqual(config.quoting, 3)
+        self.assertEqual(config.columnar, False)
+        self.assertEqual(config.single_pass, False)
 
     def test02_modified_values(self):
         """Verify that Config_set updates Config class values accordingly."""
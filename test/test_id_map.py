@@ -0,0 +1,59 @@
+import unittest
+from redisgraph_bulk_loader.id_map import IdMap, CompactIdTable, MmapIdTable, MemoryBudget
+
+
+class TestIdMap(unittest.TestCase):
+    def test01_compact_table(self):
+        """Verify that the compact table stores, replaces, and resolves identifiers."""
+        table = CompactIdTable(capacity=8)
+        # Insert enough identifiers to force several resizes.
+        for i in range(10000):
+            self.assertFalse(table.insert('node%d' % i, i))
+        self.assertEqual(len(table), 10000)
+        for i in range(10000):
+            self.assertEqual(table['node%d' % i], i)
+
+        # Reinserting an identifier reports the duplicate and updates its node ID.
+        self.assertTrue(table.insert('node5', 20000))
+        self.assertEqual(table['node5'], 20000)
+        self.assertEqual(len(table), 10000)
+
+        with self.assertRaises(KeyError):
+            table['missing']
+
+    def test02_namespaces(self):
+        """Verify that each namespace has its own table for every backend."""
+        for backend in ('dict', 'compact', 'mmap'):
+            id_map = IdMap(backend)
+            self.assertFalse(id_map.table('User').insert('0', 0))
+            self.assertFalse(id_map.table('Post').insert('0', 1))
+            self.assertFalse(id_map.table(None).insert('User.0', 2))
+            self.assertEqual(id_map.table('User')['0'], 0)
+            self.assertEqual(id_map.table('Post')['0'], 1)
+            self.assertEqual(id_map.table(None)['User.0'], 2)
+            self.assertEqual(len(id_map), 3)
+
+    def test03_reserve(self):
+        """Verify that reserving capacity keeps existing entries."""
+        table = CompactIdTable(capacity=4)
+        table.insert('a', 1)
+        table.insert('ü', 2)
+        table.reserve(1000)
+        self.assertGreaterEqual(table.threshold, 1000)
+        self.assertEqual(table['a'], 1)
+        self.assertEqual(table['ü'], 2)
+
+    def test04_mmap_table(self):
+        """Verify that the memory-mapped table keeps its entries when its pages are released."""
+        # A budget of one byte releases the table's pages on every check.
+        table = MmapIdTable('/tmp', MemoryBudget(1), capacity=8)
+        for i in range(20000):
+            self.assertFalse(table.insert('node%d' % i, i))
+        table.release()
+        self.assertEqual(len(table), 20000)
+        for i in range(20000):
+            self.assertEqual(table['node%d' % i], i)
+        self.assertTrue(table.insert('node5', 30000))
+        self.assertEqual(table['node5'], 30000)
+        with self.assertRaises(KeyError):
+            table['missing']
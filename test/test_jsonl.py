@@ -0,0 +1,78 @@
+import os
+import csv
+import json
+import contextlib
+import tempfile
+import unittest
+from unittest import mock
+from redisgraph_bulk_loader.config import Config
+from redisgraph_bulk_loader.label import Label
+from redisgraph_bulk_loader.relation_type import RelationType
+
+
+def encode_rows(entity):
+    """Pack the properties of every row the entity's reader yields."""
+    return [entity.pack_props(row) for row in entity.reader]
+
+
+class TestJsonLines(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, filename, records):
+        path = os.path.join(self.directory.name, filename)
+        with open(path, 'w') as jsonl_file:
+            for record in records:
+                jsonl_file.write(json.dumps(record) + '\n')
+        return path
+
+    def test01_matches_csv_encoding(self):
+        """Verify that JSON values are encoded as the equivalent CSV fields are, with either decoder."""
+        records = [{'id': i, 'name': 'name%d' % i, 'score': i / 3.0, 'flag': i % 2 == 0, 'tags': [i, 'tag', [1.5]]}
+                   for i in range(1000)]
+        for record in records[1::3]:
+            record['count'] = 7
+        path = self.write('User.jsonl', records)
+        csv_path = os.path.join(self.directory.name, 'User.csv')
+        with open(csv_path, 'w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['id:ID(User)', 'name:STRING', 'score:DOUBLE', 'flag:BOOL', 'tags:ARRAY', 'count:LONG'])
+            for record in records:
+                out.writerow([record['id'], record['name'], repr(record['score']), record['flag'], str(record['tags']), record.get('count', '')])
+        expected_label = Label(None, csv_path, None, Config(enforce_schema=True, quoting=0, store_node_identifiers=True))
+        expected = encode_rows(expected_label)
+
+        config = Config(store_node_identifiers=True, field_types=['id:ID(User)'])
+        # Records are decoded by orjson if it is installed, and by the json module otherwise.
+        for without_orjson in (False, True):
+            with mock.patch('jsonl_reader.orjson', None) if without_orjson else contextlib.nullcontext():
+                label = Label(None, path, None, config)
+                self.assertEqual(label.entity_str, 'User')
+                self.assertEqual(label.fields, ['id', 'name', 'score', 'flag', 'tags', 'count'])
+                self.assertEqual(label.entities_count, 1000)
+                self.assertEqual(label.packed_header, expected_label.packed_header)
+                self.assertEqual(encode_rows(label), expected)
+                self.assertEqual(label.reader.row[label.id], '999')
+
+    def test02_relations(self):
+        """Verify that endpoints are taken from the fields given by --field-type, and that errors name the record's line."""
+        path = self.write('KNOWS.jsonl', [{'src': 'a', 'dst': 1, 'since': None}, {'src': 'b', 'dst': 2, 'since': 'x'}])
+        config = Config(field_types=['KNOWS.src:START_ID(User)', 'dst:END_ID(User)', 'since:LONG'])
+        relation = RelationType(None, path, None, config)
+        self.assertEqual((relation.start_id, relation.end_id), (0, 1))
+        rows = iter(relation.reader)
+        self.assertEqual(next(rows), ['a', '1', None])
+        self.assertEqual(relation.reader.binary, b'\x00')
+        with self.assertRaises(Exception) as context:
+            next(rows)
+        self.assertIn("KNOWS.jsonl:2 Could not parse 'x' as a long", str(context.exception))
+
+        # Fields that were not among the first records of the file are rejected.
+        records = [{'name': 'a'}] * 1000 + [{'name': 'b', 'extra': 1}]
+        label = Label(None, self.write('Item.jsonl', records), None, Config())
+        with self.assertRaises(Exception) as context:
+            list(label.reader)
+        self.assertIn("Item.jsonl:1001 Encountered fields not found in the first 1000 records: extra", str(context.exception))
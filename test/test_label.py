@@ -1,8 +1,13 @@
 import os
 import csv
+import struct
 import unittest
+import itertools
 from redisgraph_bulk_loader.config import Config
 from redisgraph_bulk_loader.label import Label
+from redisgraph_bulk_loader.entity_file import TYPE_SAMPLE_SIZE, VALUE_CACHE_SIZE, VALUE_CACHE_FIELD_SIZE, inferred_prop_to_binary, learned_array_to_binary, array_prop_to_binary, evaluated_array_to_binary, number_vector_to_binary, scan_array_literal
+from redisgraph_bulk_loader.parallel import ParallelEncoder
+from redisgraph_bulk_loader.query_buffer import QueryBuffer
 
 
 class TestBulkLoader(unittest.TestCase):
@@ -48,3 +53,248 @@ class TestBulkLoader(unittest.TestCase):
         self.assertEqual(label.entities_count, 2)
         self.assertEqual(label.types[0].name, 'ID_STRING')
         self.assertEqual(label.types[1].name, 'STRING')
+
+    def test03_pack_props(self):
+        """Verify that rows are packed with the converter of each property column."""
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['id:ID', 'count:INT', 'skipped:IGNORE', 'name:STRING', 'flag:BOOL'])
+            out.writerow(['0', ' 7 ', 'x', 'abc', 'TRUE'])
+
+        config = Config(enforce_schema=True)
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', config)
+        # The ignored column is excluded when the row encoder is compiled.
+        self.assertEqual([idx for idx, convert in label.prop_converters], [0, 1, 3, 4])
+
+        row = next(label.reader)
+        expected = b'\x030\x00' + struct.pack('=Bq', 4, 7) + b'\x03abc\x00' + struct.pack('=B?', 1, True)
+        self.assertEqual(label.pack_props(row), expected)
+
+    def test04_single_pass(self):
+        """Verify that single-pass mode yields the same rows without counting the file."""
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['_ID', 'prop'])
+            for i in range(10000):
+                out.writerow([i, 'prop%d' % i])
+
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', Config())
+        expected = [(row, label.reader.line_num) for row in label.reader]
+
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', Config(single_pass=True))
+        self.assertIsNone(label.entities_count)
+        with label.progressbar() as reader:
+            rows = [(row, label.reader.line_num) for row in reader]
+            self.assertEqual(reader.bar.pos, os.path.getsize('/tmp/labels.tmp'))
+        self.assertEqual(rows, expected)
+
+    def test05_parallel_encoding(self):
+        """Verify that worker processes encode the same rows as a serial run, stopping at the first invalid row."""
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['id:ID', 'count:INT'])
+            for i in range(1000):
+                out.writerow([i, i])
+            out.writerow([1000, 'strval'])
+            out.writerow([1001, 1001])
+
+        config = Config(enforce_schema=True, store_node_identifiers=True)
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', config)
+        expected = []
+        for row in itertools.islice(label.reader, 1000):
+            expected.append((row[0], label.pack_props(row), label.reader.line_num))
+
+        encoder = ParallelEncoder(2)
+        try:
+            # The file is encoded as a single chunk.
+            [encoded] = next(encoder.encode([label]))
+        finally:
+            encoder.close()
+        self.assertEqual(len(encoded), 1000)
+        self.assertEqual(list(zip(encoded.identifiers, encoded.binaries, encoded.line_nums)), expected)
+        # The identifier of the row that failed to encode is still recorded.
+        self.assertEqual(encoded.identifiers[-1], '1000')
+        self.assertIn("labels.tmp:1002 Could not parse 'strval' as a long", str(encoded.error))
+
+    def test06_token_arena(self):
+        """Verify that rows are packed onto the binary token, which is not modified once handed out."""
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':ID', 'count:INT'])
+            out.writerow([0, 10])
+            out.writerow([1, 20])
+
+        config = Config(enforce_schema=True)
+        query_buffer = QueryBuffer('graph', None, config)
+        try:
+            label = Label(query_buffer, '/tmp/labels.tmp', 'LabelTest', config)
+            label.process_rows()
+            label.infile.close()
+        finally:
+            query_buffer.wait_sender()
+        row_binaries = [struct.pack('=Bq', 4, 10), struct.pack('=Bq', 4, 20)]
+        token = label.to_binary()
+        self.assertIsInstance(token, memoryview)
+        self.assertEqual(bytes(token), label.packed_header + b''.join(row_binaries))
+        self.assertEqual(label.binary_count, 2)
+        self.assertEqual(label.binary_size, len(token))
+
+        # Entities added later are packed onto a copy of the token.
+        label.add_entity(struct.pack('=Bq', 4, 30), 5)
+        self.assertEqual(bytes(token), label.packed_header + b''.join(row_binaries))
+        self.assertEqual(bytes(label.to_binary()), bytes(token) + struct.pack('=Bq', 4, 30))
+        self.assertEqual(label.binary_count, 3)
+
+    def test07_learned_column_types(self):
+        """Verify that schemaless columns learn their types from their first fields, encoding every field as inference does."""
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['_ID', 'name', 'score', 'flag', 'mixed'])
+            for i in range(TYPE_SAMPLE_SIZE):
+                out.writerow([i, 'name%d' % i, '%d.5' % i, 'true' if i % 2 else '', i if i % 2 else 'x%d' % i])
+            # Fields of other types than those learned are still inferred.
+            out.writerow([0, '12', '7', 'false', '[1]'])
+            out.writerow([0, 'true', 'inf', 'maybe', ''])
+            out.writerow([0, 'False', '1e3', 'TRUE', '2.5'])
+
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', Config())
+        rows = list(label.reader)
+        binaries = [label.pack_props(row) for row in rows]
+        # Columns of more than one type are inferred after their sample.
+        name, score, flag, mixed = [cache.convert for cache in label.value_caches]
+        self.assertEqual([name.__name__, score.__name__, mixed.__name__],
+                         ['learned_string_to_binary', 'learned_double_to_binary', 'inferred_prop_to_binary'])
+        # Repeated fields are encoded by the value cache, so the flag column's type has not been learned from its few distinct fields.
+        self.assertEqual(label.value_caches[2].misses, 5)
+        self.assertEqual(binaries, [b''.join(inferred_prop_to_binary(field) for field in row[1:]) for row in rows])
+
+        # Types are learned from distinct fields, however often the fields before them were repeated.
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['_ID', 'code'])
+            for i in range(3000):
+                out.writerow([i, ['a', 'b', 'c'][i % 3]])
+            for i in range(TYPE_SAMPLE_SIZE):
+                out.writerow([i, 'code%d' % i])
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', Config())
+        rows = list(label.reader)
+        binaries = [label.pack_props(row) for row in rows[:3000]]
+        cache = label.value_caches[0]
+        self.assertEqual((cache.hits, cache.misses), (2997, 3))
+        self.assertEqual(type(cache.convert).__name__, 'ColumnTypeLearner')
+        binaries += [label.pack_props(row) for row in rows[3000:]]
+        self.assertEqual(cache.convert.__name__, 'learned_string_to_binary')
+        self.assertEqual(binaries, [inferred_prop_to_binary(row[1]) for row in rows])
+
+    def test08_array_literals(self):
+        """Verify that array literals are scanned and encoded as the elements of the evaluated literal are."""
+        literals = ['[]', '[1, 2, -3]', '[1.5, -2.5e-3, .5]', '[1, 2.5]', "['a', '12', \"it's\", '']", '[True, False, None]',
+                    '[[1, [2.5]], [], ["x"]]', '[1,]', '[9223372036854775808]', '[1e999]', "['a\\'b']", '[(1, 2)]', '[1], [2]']
+        for literal in literals:
+            self.assertEqual(array_prop_to_binary('=B', literal), evaluated_array_to_binary('=B', literal), literal)
+        # Arrays of only doubles or integers are converted at once, and others element by element.
+        vector = '[%s]' % ', '.join(repr(i / 7.0) for i in range(64))
+        self.assertEqual(number_vector_to_binary('=B', vector), evaluated_array_to_binary('=B', vector))
+        self.assertIsNone(number_vector_to_binary('=B', '[1, 2.5]'))
+        self.assertIsNotNone(scan_array_literal('=B', '[[1, [2.5]], [], ["x"]]'))
+        # Literals that Python would evaluate differently, or not at all, are not scanned.
+        for literal in ('[1e999]', '[007]', '[1 2]', '[(1, 2)]'):
+            self.assertIsNone(scan_array_literal('=B', literal), literal)
+        with self.assertRaises(SyntaxError):
+            array_prop_to_binary('=B', '[1 2]')
+        # Arrays nested as deeply as Python's parser allows are scanned, and deeper ones are rejected as evaluation rejects them.
+        deepest = '[' * 200 + '1' + ']' * 200
+        self.assertEqual(scan_array_literal('=B', deepest), evaluated_array_to_binary('=B', deepest))
+        too_deep = '[' * 201 + '1' + ']' * 201
+        self.assertIsNone(scan_array_literal('=B', too_deep))
+        with self.assertRaises(SyntaxError):
+            array_prop_to_binary('=B', too_deep)
+        self.assertEqual(inferred_prop_to_binary(too_deep), b'\x03' + too_deep.encode() + b'\x00')
+        # Columns learned to hold arrays store malformed literals as strings, as inference does.
+        for literal in ('[1 2]', '[007]', '[x]', '[1, 2][0]', '[' * 300 + '1j' + ']' * 300, '[{[]: 1}]', '[{{}}]'):
+            self.assertEqual(learned_array_to_binary(literal), inferred_prop_to_binary(literal), literal)
+
+        # Literals that fail to evaluate after a column has learned to hold arrays are stored as strings.
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file, delimiter='|')
+            out.writerow(['_ID', 'tags'])
+            for i in range(3000):
+                out.writerow([i, '[%d, 2]' % i])
+            out.writerow([0, '[{[]: 1}]'])
+            out.writerow([0, '[{{}}]'])
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', Config(separator='|'))
+        rows = list(label.reader)
+        binaries = [label.pack_props(row) for row in rows]
+        self.assertEqual(label.value_caches[0].convert.__name__, 'learned_array_to_binary')
+        self.assertEqual(binaries, [inferred_prop_to_binary(row[1]) for row in rows])
+
+    def test09_value_caches(self):
+        """Verify that the encodings of columns of few distinct fields are cached, and that other columns stop being cached."""
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':ID', 'status:STRING', 'code:INT'])
+            for i in range(3000):
+                out.writerow([i, ['active', 'closed', 'pending'][i % 3], i])
+
+        config = Config(enforce_schema=True, store_node_identifiers=True)
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', config)
+        expected = [b'\x03%s\x00' % ['active', 'closed', 'pending'][i % 3].encode() + struct.pack('=Bq', 4, i) for i in range(3000)]
+        self.assertEqual([label.pack_props(row) for row in label.reader], expected)
+        stats = label.value_cache_stats()
+        self.assertEqual(stats['status'], {'lookups': 3000, 'hits': 2997, 'disabled': False})
+        # The column of distinct values was no longer cached once its cache was full.
+        self.assertTrue(stats['code']['disabled'])
+        self.assertEqual(stats['code']['hits'], 0)
+        self.assertEqual(stats['code']['lookups'], VALUE_CACHE_SIZE + 1)
+        self.assertNotIsInstance(label.prop_converters[1][1], type(label.value_caches[0]))
+
+        # The lookups of chunks encoded by workers are added to the file's counts.
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', config)
+        encoder = ParallelEncoder(2)
+        try:
+            chunks = next(encoder.encode([label]))
+            encoded = [binary for chunk in label.join_chunks(chunks) for binary in chunk.binaries]
+        finally:
+            encoder.close()
+        self.assertEqual(encoded, expected)
+        self.assertEqual(label.value_cache_stats()['status'], {'lookups': 3000, 'hits': 2997, 'disabled': False})
+
+        # Long fields take up room in the cache without being stored.
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':ID', 'note:STRING'])
+            for i in range(3000):
+                out.writerow([i, 'x' * (VALUE_CACHE_FIELD_SIZE + 1) if i % 4 == 0 else 'short'])
+        label = Label(None, '/tmp/labels.tmp', 'LabelTest', config)
+        cache = label.value_caches[0]
+        binaries = [label.pack_props(row) for row in label.reader]
+        self.assertEqual(binaries, [b'\x03%s\x00' % (b'x' * (VALUE_CACHE_FIELD_SIZE + 1) if i % 4 == 0 else b'short') for i in range(3000)])
+        self.assertEqual(list(cache.values), ['short'])
+        self.assertEqual((cache.hits, cache.misses, cache.disabled), (2249, 751, False))
+        self.assertEqual(cache.capacity, VALUE_CACHE_SIZE - 751)
+
+    def test10_parallel_id_maps(self):
+        """Verify that node files are encoded by worker processes into each backend of the identifier map."""
+        with open('/tmp/labels.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':ID', 'count:INT'])
+            for i in range(3000):
+                out.writerow(['n%d' % i, i])
+
+        for id_map in ('dict', 'compact', 'mmap'):
+            with self.subTest(id_map=id_map):
+                config = Config(enforce_schema=True, store_node_identifiers=True, id_map=id_map, workers=2, chunk_size=0.01)
+                query_buffer = QueryBuffer('graph', None, config)
+                encoder = ParallelEncoder(config.workers)
+                try:
+                    label = Label(query_buffer, '/tmp/labels.tmp', 'LabelTest', config)
+                    self.assertGreater(len(label.chunks), 1)
+                    self.assertEqual(label.process_entities(next(encoder.encode([label]))), 3000)
+                finally:
+                    encoder.close()
+                    query_buffer.wait_sender()
+                table = query_buffer.nodes.table(None)
+                self.assertEqual(len(table), 3000)
+                self.assertEqual(table['n2999'], 2999)
+                # The identifier table is not sent to the workers.
+                self.assertNotIn('node_table', label.__getstate__())
@@ -0,0 +1,70 @@
+import os
+import csv
+import json
+import tempfile
+import unittest
+from click.testing import CliRunner
+from redisgraph_bulk_loader.bulk_insert import bulk_insert
+from redisgraph_bulk_loader.metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.nodes = os.path.join(self.directory.name, 'Person.csv')
+        self.relations = os.path.join(self.directory.name, 'KNOWS.csv')
+        with open(self.nodes, mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['name', 'age'])
+            for i in range(10):
+                out.writerow(['person%d' % i, i])
+        with open(self.relations, mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['src', 'dest'])
+            for i in range(9):
+                out.writerow(['person%d' % i, 'person%d' % (i + 1)])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self, metrics_path):
+        runner = CliRunner()
+        res = runner.invoke(bulk_insert, ['--nodes', self.nodes, '--relations', self.relations,
+                                          '--sink', 'null', '--metrics', metrics_path, 'graph'])
+        self.assertEqual(res.exit_code, 0, res.output)
+
+    def test01_exclusive_stages(self):
+        """Verify that time spent in a nested stage is not counted towards the stage enclosing it."""
+        metrics = Metrics(os.path.join(self.directory.name, 'metrics.json'), 'graph')
+        inner = metrics.timed('encode', lambda: sum(range(100000)))
+        outer = metrics.timed('assemble', lambda: inner() and sum(range(1000)))
+        outer()
+        self.assertGreater(metrics.stages['encode'], metrics.stages['assemble'])
+        self.assertEqual(list(metrics.timed_iter([1, 2, 3], 'read')), [1, 2, 3])
+        self.assertGreater(metrics.stages['read'], 0)
+
+    def test02_json(self):
+        """Verify that a load exports the time of each stage, each input file, and each query as JSON."""
+        path = os.path.join(self.directory.name, 'metrics.json')
+        self.load(path)
+        with open(path) as metrics_file:
+            metrics = json.load(metrics_file)
+        for stage in ('read', 'validate', 'encode', 'id_insert', 'id_lookup', 'assemble'):
+            self.assertGreater(metrics['stages'][stage], 0, stage)
+        self.assertEqual([(record['kind'], record['name'], record['rows']) for record in metrics['inputs']],
+                         [('label', 'Person', 10), ('reltype', 'KNOWS', 9)])
+        self.assertEqual(metrics['inputs'][0]['value_cache']['name'], {'lookups': 10, 'hits': 0, 'disabled': False})
+        self.assertEqual(metrics['queries']['count'], 1)
+        self.assertEqual(metrics['queries']['latency_histogram']['buckets'][-1], [60.0, 1])
+
+    def test03_prometheus(self):
+        """Verify that metrics are exported in the Prometheus text format to paths ending in .prom."""
+        path = os.path.join(self.directory.name, 'metrics.prom')
+        self.load(path)
+        with open(path) as metrics_file:
+            lines = metrics_file.read().splitlines()
+        self.assertIn('# TYPE redisgraph_bulk_query_latency_seconds histogram', lines)
+        self.assertIn('redisgraph_bulk_query_latency_seconds_bucket{graph="graph",le="+Inf"} 1', lines)
+        self.assertIn('redisgraph_bulk_entities_created{graph="graph",kind="relation"} 9.0', lines)
+        self.assertIn('redisgraph_bulk_input_rows{graph="graph",kind="label",name="Person",file="%s"} 10.0' % self.nodes, lines)
+        self.assertIn('redisgraph_bulk_value_cache_lookups{graph="graph",kind="label",name="Person",property="age"} 10.0', lines)
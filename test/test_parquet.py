@@ -0,0 +1,138 @@
+import os
+import csv
+import tempfile
+import unittest
+from redisgraph_bulk_loader.config import Config
+from redisgraph_bulk_loader.label import Label
+from redisgraph_bulk_loader.relation_type import RelationType
+from redisgraph_bulk_loader.entity_file import Type, typed_value_converter
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def encode_rows(entity):
+    """Pack the properties of every row the entity's reader yields."""
+    return [entity.pack_props(row) for row in entity.reader]
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TestParquet(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, filename):
+        return os.path.join(self.directory.name, filename)
+
+    def test01_matches_csv_encoding(self):
+        """Verify that Parquet columns are encoded as the equivalent schema-enforced CSV fields are."""
+        ids = list(range(1000))
+        table = pyarrow.table({
+            'id': ids,
+            'name': ['name%d' % i for i in ids],
+            'count': [None if i % 7 == 0 else i * 3 for i in ids],
+            'score': [i / 3.0 for i in ids],
+            'flag': [None if i % 5 == 0 else i % 2 == 0 for i in ids],
+            'tags': [[i, i + 1] for i in ids],
+        })
+        pyarrow.parquet.write_table(table, self.path('User.parquet'), row_group_size=300)
+        with open(self.path('User.csv'), 'w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['id:ID(User)', 'name:STRING', 'count:LONG', 'score:DOUBLE', 'flag:BOOL', 'tags:ARRAY'])
+            for row in table.to_pylist():
+                out.writerow([row['id'], row['name'], '' if row['count'] is None else row['count'], repr(row['score']),
+                              '' if row['flag'] is None else row['flag'], str(row['tags'])])
+
+        expected_label = Label(None, self.path('User.csv'), None, Config(enforce_schema=True, quoting=0, store_node_identifiers=True))
+        expected = encode_rows(expected_label)
+        label = Label(None, self.path('User.parquet'), None, Config(store_node_identifiers=True, field_types=['id:ID(User)']))
+        self.assertEqual(label.entity_str, 'User')
+        self.assertEqual(label.id_namespace, 'User')
+        self.assertEqual(label.entities_count, 1000)
+        self.assertEqual(label.packed_header, expected_label.packed_header)
+        self.assertEqual(encode_rows(label), expected)
+        # Rows hold their identifier as a string.
+        self.assertEqual(label.reader.row[label.id], '999')
+        self.assertEqual(label.reader.line_num, 1001)
+
+    def test02_field_types(self):
+        """Verify that columns are typed by --field-type and metadata, and that invalid values are reported by row."""
+        schema = pyarrow.schema([
+            pyarrow.field('src', pyarrow.string(), metadata={b'redisgraph.type': b'START_ID(User)'}),
+            pyarrow.field('dst', pyarrow.string()),
+            pyarrow.field('since', pyarrow.date32()),
+            pyarrow.field('weight', pyarrow.float64()),
+        ])
+        table = pyarrow.table([['a', 'b'], ['b', 'c'], [0, 1], [0.5, float('nan')]], schema=schema)
+        pyarrow.parquet.write_table(table, self.path('KNOWS.parquet'))
+
+        # Date columns have no property type unless they are given one.
+        with self.assertRaises(Exception) as context:
+            RelationType(None, self.path('KNOWS.parquet'), None, Config())
+        self.assertIn("Column 'since'", str(context.exception))
+
+        config = Config(field_types=['KNOWS.dst:END_ID(User)', 'since:STRING'])
+        relation = RelationType(None, self.path('KNOWS.parquet'), None, config)
+        self.assertEqual((relation.start_id, relation.end_id), (0, 1))
+        self.assertEqual((relation.start_namespace, relation.end_namespace), ('User', 'User'))
+        rows = iter(relation.reader)
+        self.assertEqual(next(rows), ['a', 'b', None, None])
+        with self.assertRaises(Exception) as context:
+            next(rows)
+        self.assertIn("KNOWS.parquet:2", str(context.exception))
+
+    def test03_row_group_chunks(self):
+        """Verify that Parquet files are split into chunks of row groups for parallel workers."""
+        table = pyarrow.table({'name': ['name%d' % i for i in range(1000)]})
+        pyarrow.parquet.write_table(table, self.path('Item.parquet'), row_group_size=100)
+        label = Label(None, self.path('Item.parquet'), None, Config())
+        chunks = label.reader.split_row_groups(1)
+        self.assertEqual(len(chunks), 10)
+        self.assertEqual(chunks[1], (1, 2, 100))
+        self.assertEqual(chunks[-1], (9, None, 900))
+
+        expected = encode_rows(label)
+        encoded = []
+        for chunk in chunks:
+            label.open_chunk(chunk)
+            encoded += encode_rows(label)
+        self.assertEqual(encoded, expected)
+        self.assertEqual(label.reader.line_num, 1001)
+
+    def test04_casts_match_per_cell_encoding(self):
+        """Verify that columns are encoded as by the per-cell path, whichever Arrow type they are declared with."""
+        cases = [
+            ('STRING', pyarrow.array([1.0, 2.5, None])),
+            ('STRING', pyarrow.array([True, False])),
+            ('STRING', pyarrow.array([' padded', 'name', '', None])),
+            ('STRING', pyarrow.array(['name', 'tab\t', '\u3000ideographic space'])),
+            ('STRING', pyarrow.array([1, -2], pyarrow.int16())),
+            ('LONG', pyarrow.array([1.0, 2.0])),
+            ('LONG', pyarrow.array(['1', '2'])),
+            ('DOUBLE', pyarrow.array([True, False])),
+            ('DOUBLE', pyarrow.array([1, 2], pyarrow.int32())),
+            ('BOOL', pyarrow.array(['true', 'False'])),
+            ('BOOL', pyarrow.array(['1', '0'])),
+            ('BOOL', pyarrow.array([1, 0])),
+        ]
+        for type_name, values in cases:
+            with self.subTest(type=type_name, values=values.to_pylist()):
+                pyarrow.parquet.write_table(pyarrow.table({'value': values}), self.path('Item.parquet'))
+                label = Label(None, self.path('Item.parquet'), None, Config(field_types=['value:' + type_name]))
+                convert = typed_value_converter(Type[type_name])
+                expected = []
+                try:
+                    for value in values.to_pylist():
+                        expected.append(convert(value))
+                except Exception as e:
+                    with self.assertRaises(Exception) as context:
+                        encode_rows(label)
+                    self.assertIn("Item.parquet:%d %s" % (len(expected) + 1, e), str(context.exception))
+                    continue
+                self.assertEqual(encode_rows(label), expected)
@@ -0,0 +1,65 @@
+import os
+import csv
+import pstats
+import tempfile
+import threading
+import unittest
+from click.testing import CliRunner
+from redisgraph_bulk_loader.bulk_insert import bulk_insert
+from redisgraph_bulk_loader.profiling import Profiler, run_profiled, PER_THREAD
+
+
+def busy():
+    return sum(range(1000))
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test01_stages_and_threads(self):
+        """Verify that stages and threads are written to profiles of their own."""
+        profiler = Profiler(self.directory.name)
+        with profiler.stage('main'):
+            busy()
+        thread = threading.Thread(target=profiler.thread('thread', busy))
+        thread.start()
+        thread.join()
+        paths = profiler.dump()
+
+        self.assertIn(os.path.join(self.directory.name, 'main.prof'), paths)
+        functions = [function for _, _, function in pstats.Stats(paths[0]).stats]
+        self.assertIn('busy', functions)
+        if PER_THREAD:
+            functions = [function for _, _, function in pstats.Stats(paths[1]).stats]
+            self.assertIn('busy', functions)
+
+    def test02_workers(self):
+        """Verify that workers accumulate the profiles of their tasks in a file named by their process ID."""
+        path = Profiler(self.directory.name).worker_path('nodes')
+        self.assertEqual(run_profiled(path, busy), busy())
+        run_profiled(path, busy)
+        stats = pstats.Stats(path.format(pid=os.getpid())).stats
+        calls = [stat[1] for (_, _, function), stat in stats.items() if function == 'busy']
+        self.assertEqual(calls, [2])
+
+    def test03_bulk_insert(self):
+        """Verify that the loader profiles each of its stages."""
+        nodes = os.path.join(self.directory.name, 'Person.csv')
+        with open(nodes, mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow(['name', 'age'])
+            for i in range(10):
+                out.writerow(['person%d' % i, i])
+        profile_dir = os.path.join(self.directory.name, 'profiles')
+
+        runner = CliRunner()
+        res = runner.invoke(bulk_insert, ['--nodes', nodes, '--sink', 'null', '--profile', profile_dir, 'graph'])
+        self.assertEqual(res.exit_code, 0, res.output)
+        expected = {'schemas.prof', 'nodes.prof', 'relations.prof', 'send.prof'}
+        if PER_THREAD:
+            expected.add('sender.prof')
+        self.assertEqual(set(os.listdir(profile_dir)), expected)
@@ -1,8 +1,13 @@
 import os
 import csv
+import struct
 import unittest
+import multiprocess
 from redisgraph_bulk_loader.config import Config
 from redisgraph_bulk_loader.relation_type import RelationType
+from redisgraph_bulk_loader.id_map import IdMap
+from redisgraph_bulk_loader.parallel import ParallelEncoder
+from redisgraph_bulk_loader.query_buffer import QueryBuffer
 
 
 class TestBulkLoader(unittest.TestCase):
@@ -47,3 +52,83 @@ class TestBulkLoader(unittest.TestCase):
         self.assertEqual(reltype.types[0].name, 'END_ID')
         self.assertEqual(reltype.types[1].name, 'START_ID')
         self.assertEqual(reltype.types[2].name, 'STRING')
+
+    def test03_parallel_encoding(self):
+        """Verify that worker processes resolve endpoints against the parent's identifier map."""
+        with open('/tmp/relations.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':START_ID(User)', ':END_ID(Post)', 'weight:DOUBLE'])
+            out.writerow(['a', 'x', 0.5])
+            out.writerow(['b', 'missing', 1.5])
+            out.writerow(['b', 'y', 2.5])
+
+        id_map = IdMap('compact')
+        for node_id, identifier in enumerate(['a', 'b']):
+            id_map.table('User').insert(identifier, node_id)
+        for node_id, identifier in enumerate(['x', 'y'], 2):
+            id_map.table('Post').insert(identifier, node_id)
+
+        config = Config(enforce_schema=True, store_node_identifiers=True, skip_invalid_edges=True)
+        reltype = RelationType(None, '/tmp/relations.tmp', 'RelationTest', config)
+        encoder = ParallelEncoder(2, id_map)
+        try:
+            [encoded] = next(encoder.encode([reltype]))
+        finally:
+            encoder.close()
+        self.assertIsNone(encoded.error)
+        self.assertEqual(encoded.binaries, [struct.pack('=QQBd', 0, 2, 2, 0.5), struct.pack('=QQBd', 1, 3, 2, 2.5)])
+        self.assertEqual(len(encoded.messages), 1)
+        self.assertIn("src: b; dest: missing", encoded.messages[0])
+
+    @unittest.skipIf(not ParallelEncoder.can_share_id_map(), "worker processes cannot inherit the identifier map")
+    def test04_parallel_id_maps(self):
+        """Verify that relation files are encoded by worker processes against each backend of the identifier map."""
+        with open('/tmp/relations.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':START_ID', ':END_ID', 'weight:INT'])
+            for i in range(3000):
+                out.writerow(['n%d' % i, 'n%d' % ((i + 1) % 3000), i])
+        expected = b''.join(struct.pack('=QQBq', i, (i + 1) % 3000, 4, i) for i in range(3000))
+
+        for id_map in ('dict', 'compact', 'mmap'):
+            with self.subTest(id_map=id_map):
+                config = Config(enforce_schema=True, store_node_identifiers=True, id_map=id_map, workers=2, chunk_size=0.01)
+                query_buffer = QueryBuffer('graph', None, config)
+                table = query_buffer.nodes.table(None)
+                for node_id in range(3000):
+                    table.insert('n%d' % node_id, node_id)
+                encoder = ParallelEncoder(config.workers, query_buffer.nodes)
+                try:
+                    reltype = RelationType(query_buffer, '/tmp/relations.tmp', 'RelationTest', config)
+                    self.assertGreater(len(reltype.chunks), 1)
+                    self.assertEqual(reltype.process_entities(next(encoder.encode([reltype]))), 3000)
+                finally:
+                    encoder.close()
+                    query_buffer.wait_sender()
+                self.assertEqual(bytes(reltype.to_binary()), reltype.packed_header + expected)
+
+    @unittest.skipIf(not ParallelEncoder.can_share_id_map(), "worker processes cannot inherit the identifier map")
+    def test05_forked_workers(self):
+        """Verify that relation workers are forked, and so inherit the identifier map, whatever the default start method."""
+        with open('/tmp/relations.tmp', mode='w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':START_ID', ':END_ID'])
+            out.writerow(['a', 'b'])
+
+        id_map = IdMap('compact')
+        for node_id, identifier in enumerate(['a', 'b']):
+            id_map.table(None).insert(identifier, node_id)
+        config = Config(enforce_schema=True, store_node_identifiers=True)
+        reltype = RelationType(None, '/tmp/relations.tmp', 'RelationTest', config)
+        start_method = multiprocess.get_start_method()
+        multiprocess.set_start_method('spawn', force=True)
+        try:
+            encoder = ParallelEncoder(2, id_map)
+        finally:
+            multiprocess.set_start_method(start_method, force=True)
+        try:
+            [encoded] = next(encoder.encode([reltype]))
+        finally:
+            encoder.close()
+        self.assertIsNone(encoded.error)
+        self.assertEqual(encoded.binaries, [struct.pack('=QQ', 0, 1)])
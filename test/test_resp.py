@@ -0,0 +1,99 @@
+import os
+import redis
+import socket
+import tempfile
+import threading
+import unittest
+from redisgraph_bulk_loader.resp import RespConnection, pack_command, send_buffers
+
+
+class FakeRespServer(object):
+    """Accepts RESP connections, recording the arguments of every command and answering with a fixed reply."""
+    def __init__(self, family=socket.AF_INET, address=('127.0.0.1', 0), reply=b'+OK\r\n'):
+        self.commands = []
+        self.reply = reply
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.bind(address)
+        self.sock.listen(1)
+        self.address = self.sock.getsockname()
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        conn, _ = self.sock.accept()
+        with conn, conn.makefile('rb') as stream:
+            while True:
+                line = stream.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int(stream.readline()[1:])
+                    args.append(stream.read(length))
+                    stream.read(2)
+                self.commands.append(args)
+                conn.sendall(self.reply)
+
+    def close(self):
+        self.sock.close()
+
+
+class PartialSocket(object):
+    """Socket that accepts at most limit bytes per sendmsg call."""
+    def __init__(self, limit):
+        self.limit = limit
+        self.data = bytearray()
+
+    def sendmsg(self, buffers):
+        sent = 0
+        for buf in buffers:
+            take = min(len(buf), self.limit - sent)
+            self.data += buf[:take]
+            sent += take
+        return sent
+
+
+class TestResp(unittest.TestCase):
+    def test01_pack_command(self):
+        """Verify that small arguments are copied into the framing and large ones are left as they are."""
+        token = memoryview(bytearray(b'x' * 100000))
+        buffers = pack_command(["GRAPH.BULK", "graph", 1, token])
+        self.assertEqual(len(buffers), 3)
+        self.assertEqual(bytes(buffers[0]), b'*4\r\n$10\r\nGRAPH.BULK\r\n$5\r\ngraph\r\n$1\r\n1\r\n$100000\r\n')
+        self.assertIs(buffers[1], token)
+        self.assertEqual(bytes(buffers[2]), b'\r\n')
+
+    def test02_partial_writes(self):
+        """Verify that writes resume from wherever sendmsg stopped."""
+        buffers = [b'abc', b'', bytearray(b'defgh'), memoryview(b'ijklmnopq')]
+        sock = PartialSocket(4)
+        send_buffers(sock, buffers)
+        self.assertEqual(bytes(sock.data), b'abcdefghijklmnopq')
+
+    def test03_send_command(self):
+        """Verify that a command with a large token reaches the server intact, and its reply is returned."""
+        reply = b'2 nodes created, 0 relations created'
+        server = FakeRespServer(reply=b'$%d\r\n%s\r\n' % (len(reply), reply))
+        client = redis.Redis(host=server.address[0], port=server.address[1])
+        connection = RespConnection(client)
+        token = memoryview(bytearray(os.urandom(3 * 1000 * 1000)))
+        try:
+            self.assertEqual(connection.execute_command("GRAPH.BULK", "graph", "BEGIN", 2, 0, 1, 0, token), reply)
+        finally:
+            connection.close()
+            server.close()
+        self.assertEqual(server.commands, [[b'GRAPH.BULK', b'graph', b'BEGIN', b'2', b'0', b'1', b'0', bytes(token)]])
+
+    def test04_unix_socket_error_reply(self):
+        """Verify that commands can be sent over a unix socket, and that error replies are raised."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'redis.sock')
+            server = FakeRespServer(socket.AF_UNIX, path, reply=b'-ERR invalid graph\r\n')
+            connection = RespConnection(redis.Redis(unix_socket_path=path))
+            try:
+                with self.assertRaises(redis.exceptions.ResponseError) as context:
+                    connection.execute_command("GRAPH.BULK", "graph", b'\x00' * 50000)
+            finally:
+                connection.close()
+                server.close()
+        self.assertIn("invalid graph", str(context.exception))
+        self.assertEqual(server.commands, [[b'GRAPH.BULK', b'graph', b'\x00' * 50000]])
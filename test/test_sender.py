@@ -0,0 +1,88 @@
+import time
+import threading
+import unittest
+from redisgraph_bulk_loader.sender import BulkSender
+
+
+class FakeClient(object):
+    """Client that records GRAPH.BULK queries, blocking each until it is released."""
+    def __init__(self):
+        self.queries = []
+        self.release = threading.Semaphore(0)
+
+    def execute_command(self, *args):
+        self.release.acquire()
+        if args[2] == 'fail':
+            raise ConnectionError("connection lost")
+        if args[2] == 'malformed':
+            return b'OK'
+        self.queries.append(args[2:])
+        return b'%d nodes created, 0 relations created' % args[2]
+
+
+class TestSender(unittest.TestCase):
+    def test01_order_and_backpressure(self):
+        """Verify that queries are sent in order and that submitting blocks while too many bytes are in flight."""
+        client = FakeClient()
+        sender = BulkSender(client, 'graph', max_inflight=100)
+        sender.submit([1, 'BEGIN'], 60)
+        # A second query would exceed the limit, so it is only queued once the first has been sent.
+        submitted = threading.Event()
+        def submit():
+            sender.submit([2], 60)
+            submitted.set()
+        thread = threading.Thread(target=submit)
+        thread.start()
+        time.sleep(0.1)
+        self.assertFalse(submitted.is_set())
+        client.release.release()
+        self.assertTrue(submitted.wait(5))
+        thread.join()
+
+        client.release.release()
+        sender.close()
+        self.assertEqual(client.queries, [(1, 'BEGIN'), (2,)])
+        self.assertEqual(sender.nodes_created, 3)
+        self.assertEqual(sender.queries_sent, 2)
+        self.assertEqual(sender.bytes_sent, 120)
+        self.assertGreater(sender.encoder_stall, 0)
+
+    def test02_error(self):
+        """Verify that a failed query stops later queries and is raised to the loader."""
+        client = FakeClient()
+        sender = BulkSender(client, 'graph', max_inflight=1000)
+        sender.submit(['fail'], 10)
+        sender.submit([1], 10)
+        client.release.release()
+        with self.assertRaises(ConnectionError):
+            sender.close()
+        self.assertEqual(client.queries, [])
+
+    def test03_acknowledgements(self):
+        """Verify that the tag of each acknowledged query is passed to on_sent, and that no failed query's is."""
+        client = FakeClient()
+        acknowledged = []
+        sender = BulkSender(client, 'graph', max_inflight=1000,
+                            on_sent=lambda tag: acknowledged.append((tag, sender.nodes_created)))
+        sender.submit([1], 10, 'first')
+        sender.submit([2], 10, 'second')
+        sender.submit(['fail'], 10, 'third')
+        for _ in range(3):
+            client.release.release()
+        with self.assertRaises(ConnectionError):
+            sender.close()
+        self.assertEqual(acknowledged, [('first', 1), ('second', 3)])
+
+    def test04_malformed_reply(self):
+        """Verify that a reply that cannot be parsed fails the load rather than the sender thread."""
+        client = FakeClient()
+        sender = BulkSender(client, 'graph', max_inflight=10)
+        sender.submit(['malformed'], 10)
+        client.release.release()
+        # The query's bytes are released, so a later query does not wait for an acknowledgement that never comes.
+        sender.thread.join(5)
+        with self.assertRaises(ValueError):
+            sender.submit([1], 10)
+        with self.assertRaises(ValueError):
+            sender.close()
+        self.assertEqual(sender.queries_sent, 0)
@@ -0,0 +1,83 @@
+import os
+import csv
+import gzip
+import tempfile
+import threading
+import unittest
+from redisgraph_bulk_loader.config import Config
+from redisgraph_bulk_loader.label import Label
+from redisgraph_bulk_loader.streams import is_stdin, is_stream
+
+
+def encode_rows(entity):
+    """Pack the properties of every row the entity's reader yields."""
+    return [entity.pack_props(row) for row in entity.reader]
+
+
+@unittest.skipIf(not hasattr(os, 'mkfifo'), "named pipes are not supported")
+class TestStreams(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, filename):
+        return os.path.join(self.directory.name, filename)
+
+    def pipe(self, filename, data):
+        """Create a named pipe, and write data to it from a thread once it is opened."""
+        path = self.path(filename)
+        os.mkfifo(path)
+
+        def write():
+            with open(path, 'wb') as fifo:
+                fifo.write(data)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.addCleanup(writer.join)
+        return path
+
+    def test01_stream_paths(self):
+        """Verify that standard input, with or without extensions, and named pipes are recognised as streams."""
+        self.assertTrue(is_stdin('-'))
+        self.assertTrue(is_stdin('-.jsonl.gz'))
+        self.assertFalse(is_stdin('data/-.csv'))
+        self.assertTrue(is_stream('-.csv'))
+        os.mkfifo(self.path('Person.csv'))
+        self.assertTrue(is_stream(self.path('Person.csv')))
+        with open(self.path('User.csv'), 'w') as csv_file:
+            csv_file.write('id\n')
+        self.assertFalse(is_stream(self.path('User.csv')))
+        self.assertFalse(is_stream(self.path('Missing.csv')))
+
+    def test02_matches_file_encoding(self):
+        """Verify that CSV rows read from a named pipe, compressed or not, are encoded as those of a file are."""
+        with open(self.path('User.csv'), 'w') as csv_file:
+            out = csv.writer(csv_file)
+            out.writerow([':ID(User)', 'name:STRING', 'age:INT'])
+            for i in range(1000):
+                out.writerow([i, 'name%d' % i, i % 90])
+        with open(self.path('User.csv'), 'rb') as csv_file:
+            data = csv_file.read()
+
+        config = Config(enforce_schema=True, store_node_identifiers=True)
+        expected_label = Label(None, self.path('User.csv'), None, config)
+        expected = encode_rows(expected_label)
+        for filename, contents in (('Pipe.csv', data), ('Pipe.csv.gz', gzip.compress(data))):
+            label = Label(None, self.pipe(filename, contents), 'User', config)
+            self.assertTrue(label.streamed)
+            self.assertIsNone(label.entities_count)
+            self.assertEqual(label.packed_header, expected_label.packed_header)
+            self.assertEqual(encode_rows(label), expected)
+            # Rows are numbered as they are in files.
+            self.assertEqual(label.reader.line_num, expected_label.reader.line_num)
+            self.assertEqual(label.input_size(), len(contents))
+
+    def test03_json_lines(self):
+        """Verify that the records read to find the fields of a JSON Lines stream are not lost."""
+        data = ''.join('{"id": %d, "name": "name%d"}\n' % (i, i) for i in range(1500)).encode()
+        label = Label(None, self.pipe('User.jsonl', data), None, Config(store_node_identifiers=True, field_types=['id:ID(User)']))
+        rows = [row[label.id] for row in label.reader]
+        self.assertEqual(rows, [str(i) for i in range(1500)])